@@ -0,0 +1,279 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity (mapped to HTTP 429)."""
+
+def _init_worker():
+    # Runs once per worker process: load and warm up YOLO and spaCy before the first job
+    from src.pipeline import init_worker
+    init_worker()
+
+def _worker_ready():
+    from src.detection.model_registry import model_info
+    return model_info()
+
+def output_format(filename):
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext == ".pdf":
+        return ".pdf"
+    return ".jpg" if ext in (".jpg", ".jpeg") else ".png"
+
+def _worker_state():
+    from src.detection.cache import detection_cache
+    from src import telemetry
+    # Each worker has its own detection cache and metrics registry; ship both back for /cache and /metrics
+    return os.getpid(), detection_cache.stats(), telemetry.registry.snapshot()
+
+def _run_job(data, output_path, doc_id, mode, fmt, engine, user, layers_dir):
+    from src.pipeline import run_pipeline
+    # output_path None: run on bytes and return the encoded result, no disk I/O
+    # Documents are already spread over the job workers, so PDF pages run in-process
+    result, audit = run_pipeline(data, output_path, doc_id=doc_id, mode=mode, output_format=fmt, pdf_workers=1,
+                                 inpaint_engine=engine, user=user, keep_layers=layers_dir)
+    if output_path:
+        result = {"redacted_path": result, "audit": audit}
+    else:
+        result = {"image": result, "format": fmt, "audit": audit}
+    return (result,) + _worker_state()
+
+def _render_job(layers_dir, output_path, mode, dummies, disabled, user):
+    from src.pipeline import load_layers, render_pipeline
+    # Overlay only: the detections and inpainted base were saved by the original job
+    result, audit = render_pipeline(load_layers(layers_dir), output_path, mode=mode, dummies=dummies, disabled=disabled,
+                                    user=user)
+    return ({"redacted_path": result, "audit": audit},) + _worker_state()
+
+class JobQueue:
+    """
+    Bounded queue of redaction jobs executed on a process pool.
+    At most max_workers jobs run at once and at most max_queued wait behind them;
+    beyond that submit() raises QueueFull. Finished jobs are kept for job_ttl seconds.
+    """
+
+    def __init__(self, max_workers=2, max_queued=8, job_ttl=3600):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.worker_models = None
+        self.worker_cache_stats = {}
+        self.worker_metrics = {}
+        self.executor = self._new_executor()
+
+    def _new_executor(self):
+        # spawn: workers must not inherit the parent's Mongo client or threads
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker)
+
+    def _replace_broken(self, broken):
+        """
+        Swap in a fresh pool once a worker died (OOM kill, segfault in a native
+        library). Every job still on the broken pool fails with BrokenProcessPool and
+        lands here too; only the first one rebuilds. Call with self.lock held.
+        """
+        if self.executor is broken:
+            print("Worker process died; restarting the worker pool")
+            self.executor = self._new_executor()
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self):
+        """
+        Start every worker now (each preloads its models) instead of on the first request.
+        """
+        futures = [self.executor.submit(_worker_ready) for _ in range(self.max_workers)]
+        self.worker_models = [f.result() for f in futures][-1]
+        return self.worker_models
+
+    def submit(self, data, filename, mode, user, in_memory=False, engine="telea", keep_layers=False):
+        """
+        Enqueue one document. Returns the job id.
+        With in_memory the redacted image comes back as bytes in the job result
+        instead of being written under output/. With keep_layers an (on-disk, image)
+        job also saves its detections and inpainted base layer until the job expires,
+        so submit_render can re-render it. Off by default: the layers hold the
+        detected text and the unredacted crops.
+        """
+        job = self._new_job(user, filename=filename, mode=mode, engine=engine)
+        job_id = job["job_id"]
+        fmt = output_format(filename)
+        output_path = None if in_memory else os.path.join("output", f"redacted_{job_id}_{os.path.basename(filename)}")
+        if keep_layers and output_path and fmt != ".pdf":
+            job["layers_dir"] = os.path.join("output", "layers", job_id)
+        self._start(job, _run_job, data, output_path, filename, mode, fmt, engine, user, job["layers_dir"])
+        return job_id
+
+    def submit_render(self, source_job_id, mode, user, dummies=None, disabled=()):
+        """
+        Re-render a finished job with another mode, edited dummies or detections switched
+        off. Only the text overlay is redrawn over the saved base layer.
+        Returns the new job id; raises KeyError for an unknown job and ValueError when the
+        job can't be re-rendered (not done, no keep_layers, PDF, in-memory, or its layers expired).
+        """
+        with self.lock:
+            source = self.jobs.get(source_job_id)
+            if source is None or source["user"] != user:
+                raise KeyError(source_job_id)
+            if source["status"] != "done":
+                raise ValueError(f"Job is {source['status']}")
+            layers_dir = source.get("layers_dir")
+        if not layers_dir or not os.path.isdir(layers_dir):
+            raise ValueError("Job has no saved layers to re-render (submitted without keep_layers, PDF, in-memory or expired)")
+        job = self._new_job(user, filename=source["filename"], mode=mode, engine=source["engine"],
+                            source_job=source_job_id, layers_dir=layers_dir)
+        output_path = os.path.join("output", f"redacted_{job['job_id']}_{os.path.basename(source['filename'])}")
+        self._start(job, _render_job, layers_dir, output_path, mode, dummies, list(disabled), user)
+        return job["job_id"]
+
+    def _new_job(self, user, **fields):
+        with self.lock:
+            self._prune()
+            if self.in_flight >= self.max_workers + self.max_queued:
+                raise QueueFull()
+            self.in_flight += 1
+            job_id = uuid.uuid4().hex
+            job = {
+                "job_id": job_id,
+                "user": user,
+                "filename": None,
+                "mode": None,
+                "engine": None,
+                "source_job": None,
+                "layers_dir": None,
+                "status": "queued",
+                "created": time.time(),
+                "finished": None,
+                "result": None,
+                "error": None
+            }
+            job.update(fields)
+            self.jobs[job_id] = job
+        return job
+
+    def _start(self, job, fn, *args):
+        job_id = job["job_id"]
+        try:
+            with self.lock:
+                executor = self.executor
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # Died between jobs: nothing was lost, retry once on a fresh pool
+                with self.lock:
+                    self._replace_broken(executor)
+                    executor = self.executor
+                future = executor.submit(fn, *args)
+        except Exception:
+            with self.lock:
+                self.in_flight -= 1
+                del self.jobs[job_id]
+            raise
+        job["future"] = future
+        job["executor"] = executor
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+
+    def _finish(self, job, future):
+        with self.lock:
+            self.in_flight -= 1
+            job["finished"] = time.time()
+            if future.cancelled():
+                job["status"] = "cancelled"
+                return
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                job["status"] = "failed"
+                job["error"] = "Worker process died while running this job"
+                self._replace_broken(job["executor"])
+            elif error is not None:
+                job["status"] = "failed"
+                job["error"] = str(error)
+            else:
+                job["status"] = "done"
+                job["result"], pid, cache_stats, metrics = future.result()
+                self.worker_cache_stats[pid] = cache_stats
+                self.worker_metrics[pid] = metrics  # Cumulative per worker, so the latest replaces the previous
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j for j, job in self.jobs.items() if job["finished"] and job["finished"] < cutoff]:
+            self._discard(self.jobs.pop(job_id))
+
+    @staticmethod
+    def _discard(job):
+        # Expired jobs take their output file (and saved layers) with them so output/ doesn't grow forever
+        path = (job["result"] or {}).get("redacted_path")
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if job["layers_dir"] and not job["source_job"]:
+            shutil.rmtree(job["layers_dir"], ignore_errors=True)  # Re-renders share their source job's layers
+
+    async def wait(self, job_id, keep=False):
+        """
+        Await a job and, unless keep, remove it from the store (in_memory jobs).
+        Returns the job result; raises the worker's exception on failure.
+        """
+        with self.lock:
+            future = self.jobs[job_id]["future"]
+        try:
+            result, _, _, _ = await asyncio.wrap_future(future)
+            return result
+        finally:
+            if not keep:
+                with self.lock:
+                    self.jobs.pop(job_id, None)
+
+    def get(self, job_id):
+        """
+        Public view of a job (no future), or None if unknown/expired.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            view = {k: v for k, v in job.items() if k not in ("future", "executor")}
+            if view["result"] and "image" in view["result"]:
+                # In-memory results are streamed by the request that submitted them
+                view["result"] = {k: v for k, v in view["result"].items() if k != "image"}
+        if view["status"] == "queued" and job.get("future") is not None and job["future"].running():
+            view["status"] = "running"
+        return view
+
+    def cache_stats(self):
+        """
+        Detection cache counters summed over all workers.
+        """
+        with self.lock:
+            per_worker = list(self.worker_cache_stats.values())
+        totals = {k: sum(s[k] for s in per_worker) for k in ("hits", "disk_hits", "misses", "entries")}
+        lookups = totals["hits"] + totals["disk_hits"] + totals["misses"]
+        totals["hit_rate"] = (totals["hits"] + totals["disk_hits"]) / lookups if lookups else 0.0
+        totals["workers"] = len(per_worker)
+        return totals
+
+    def metrics_snapshots(self):
+        """
+        Latest metrics registry snapshot of every worker that has finished a job.
+        """
+        with self.lock:
+            return list(self.worker_metrics.values())
+
+    def depth(self):
+        with self.lock:
+            return self.in_flight
+
+    def shutdown(self):
+        with self.lock:
+            executor = self.executor
+        executor.shutdown(wait=False, cancel_futures=True)
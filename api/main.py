@@ -1,10 +1,19 @@
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+from typing import Dict, List
 from fastapi import FastAPI, UploadFile, File, Header, HTTPException
-from fastapi.responses import FileResponse
-from src.pipeline import run_pipeline
-import shutil
+from pydantic import BaseModel
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
+import json
+import uuid
+from api.jobs import JobQueue, QueueFull
+from src import telemetry
+from src.audit import query as audit_query
+from src.resources import get_audits_collection
+
+INPAINT_ENGINES = ["telea", "fill", "downscale"]  # Mirrors src.inpaint.inpaint; not imported to keep OpenCV out of the API process
 
 app = FastAPI(title="MirrorMask API")
 
@@ -13,21 +22,236 @@ API_KEYS = {
     "demo_key_2": "user2"
 }
 
-@app.post("/redact")
-async def redact(file: UploadFile = File(...), api_key: str = Header(None), mode: str = "Standard"):
-    print(f"Received API key: {api_key}")  # Debug print
+# Pipeline work runs in worker processes so the event loop never blocks on it
+job_queue = None
+
+@app.on_event("startup")
+def start_workers():
+    global job_queue
+    job_queue = JobQueue(
+        max_workers=int(os.getenv("MIRRORMASK_WORKERS", "2")),
+        max_queued=int(os.getenv("MIRRORMASK_QUEUE_SIZE", "8"))
+    )
+    # Each worker loads and warms up YOLO once, before the first request
+    info = job_queue.warm_up()
+    print(f"Workers ready: {job_queue.max_workers}, model loaded={info['weights']} fallback={info['fallback']}")
+    # In the background: an unreachable MongoDB must not hold up startup
+    threading.Thread(target=create_audit_indexes, name="audit-indexes", daemon=True).start()
+
+def create_audit_indexes():
+    try:
+        audit_query.ensure_indexes(get_audits_collection())
+    except Exception as e:
+        print(f"Audit index creation failed: {e}")
+
+@app.on_event("shutdown")
+def stop_workers():
+    job_queue.shutdown()
+
+def check_api_key(api_key):
     if api_key not in API_KEYS:
         raise HTTPException(status_code=401, detail="Invalid API key")
+    return API_KEYS[api_key]
+
+@app.get("/models")
+def models():
+    return {"default": job_queue.worker_models}
+
+@app.get("/cache")
+def cache_stats():
+    return job_queue.cache_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus exposition: stage latency histograms, document/detection/cache counters
+    (merged over the workers) and the current queue depth.
+    """
+    snapshots = [telemetry.registry.snapshot()] + job_queue.metrics_snapshots()
+    text = telemetry.render(snapshots, gauges={"mirrormask_queue_depth": job_queue.depth()})
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@app.post("/redact", status_code=202)
+async def redact(file: UploadFile = File(...), api_key: str = Header(None), mode: str = "Standard", engine: str = "telea",
+                 keep_layers: bool = False):
+    """
+    Queue a document for redaction. keep_layers=true saves the job's detections and
+    inpainted base layer (images only) so POST /jobs/{job_id}/render can re-render it.
+    """
+    user = check_api_key(api_key)
     if mode not in ["Standard", "Legal"]:
         raise HTTPException(status_code=400, detail="Invalid mode. Use 'Standard' or 'Legal'.")
+    if engine not in INPAINT_ENGINES:
+        raise HTTPException(status_code=400, detail=f"Invalid engine. Use one of {INPAINT_ENGINES}.")
     
-    input_path = f"temp/{file.filename}"
-    os.makedirs("temp", exist_ok=True)
-    with open(input_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    data = await file.read()
+    try:
+        job_id = job_queue.submit(data, file.filename, mode, user, engine=engine, keep_layers=keep_layers)
+    except QueueFull:
+        raise HTTPException(status_code=429, detail="Too many documents in progress, retry later.",
+                            headers={"Retry-After": "5"})
+    return {"job_id": job_id, "status": "queued", "queue_depth": job_queue.depth()}
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def audit_summary(audit):
+    """
+    Header-safe view of an audit: ids and detection counts per type, never the detected
+    text, boxes or dummies. Headers end up in proxy and access logs, and a full audit
+    (especially a multi-page PDF's) can outgrow header size limits.
+    """
+    pages = audit.get("pages", [audit])
+    counts = {}
+    for page in pages:
+        for det in page["detections"]:
+            if det["type"] != "text":
+                counts[det["type"]] = counts.get(det["type"], 0) + 1
+            for _, pii_type in det["pii"]:
+                counts[pii_type] = counts.get(pii_type, 0) + 1
+    summary = {"doc_id": audit["doc_id"], "redaction_mode": audit["redaction_mode"], "counts": counts}
+    if "pages" in audit:
+        summary["page_count"] = audit["page_count"]
+    return summary
+
+def iter_chunks(*parts):
+    for part in parts:
+        view = memoryview(part)
+        for i in range(0, len(view), STREAM_CHUNK_SIZE):
+            yield bytes(view[i:i + STREAM_CHUNK_SIZE])
+
+@app.post("/redact/stream")
+async def redact_stream(file: UploadFile = File(...), api_key: str = Header(None), mode: str = "Standard",
+                        audit: str = "header", engine: str = "telea"):
+    """
+    Redact in memory and stream the image back as the response body.
+    The upload never touches temp/ and the result never touches output/.
+    audit="header" puts a PII-free audit summary in X-MirrorMask-Audit (the full audit
+    stays in the audit store); audit="multipart" returns multipart/mixed with the full
+    audit JSON part followed by the image part.
+    """
+    user = check_api_key(api_key)
+    if mode not in ["Standard", "Legal"]:
+        raise HTTPException(status_code=400, detail="Invalid mode. Use 'Standard' or 'Legal'.")
+    if engine not in INPAINT_ENGINES:
+        raise HTTPException(status_code=400, detail=f"Invalid engine. Use one of {INPAINT_ENGINES}.")
+    if audit not in ["header", "multipart"]:
+        raise HTTPException(status_code=400, detail="Invalid audit. Use 'header' or 'multipart'.")
+    
+    data = await file.read()  # UploadFile is a spooled buffer; small uploads stay in memory
+    try:
+        job_id = job_queue.submit(data, file.filename, mode, user, in_memory=True, engine=engine)
+    except QueueFull:
+        raise HTTPException(status_code=429, detail="Too many documents in progress, retry later.",
+                            headers={"Retry-After": "5"})
+    del data
+    try:
+        result = await job_queue.wait(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Redaction failed: {e}")
     
-    output_path = f"output/redacted_{file.filename}"
-    redacted_path, audit = run_pipeline(input_path, output_path, doc_id=file.filename, mode=mode)
+    media_type = {".jpg": "image/jpeg", ".pdf": "application/pdf"}.get(result["format"], "image/png")
+    if audit == "header":
+        return StreamingResponse(iter_chunks(result["image"]), media_type=media_type,
+                                 headers={"X-MirrorMask-Audit": json.dumps(audit_summary(result["audit"])),
+                                          "X-MirrorMask-Job": job_id})
     
-    audit["user"] = API_KEYS[api_key]
-    return {"redacted_path": redacted_path, "audit": audit, "file": FileResponse(redacted_path)}
\ No newline at end of file
+    audit_json = json.dumps(result["audit"])
+    boundary = uuid.uuid4().hex
+    head = (f"--{boundary}\r\nContent-Type: application/json\r\n\r\n{audit_json}\r\n"
+            f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+            f"Content-Disposition: attachment; filename=\"redacted_{os.path.basename(file.filename)}\"\r\n\r\n").encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return StreamingResponse(iter_chunks(head, result["image"], tail), media_type=f"multipart/mixed; boundary={boundary}",
+                             headers={"X-MirrorMask-Job": job_id})
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, api_key: str = Header(None)):
+    user = check_api_key(api_key)
+    job = job_queue.get(job_id)
+    if job is None or job["user"] != user:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+class RenderRequest(BaseModel):
+    mode: str = "Standard"
+    dummies: Dict[int, str] = {}  # Detection index -> replacement text, over the generated dummies
+    disabled: List[int] = []      # Detection indices to leave unredacted
+
+@app.post("/jobs/{job_id}/render")
+async def render_job(job_id: str, request: RenderRequest, api_key: str = Header(None)):
+    """
+    Re-render a finished image job (submitted with keep_layers=true) with another mode,
+    edited dummies or detections switched off. Detection and inpainting are not rerun: only the text overlay is
+    redrawn over the job's saved base layer. Returns the new (finished) job.
+    """
+    user = check_api_key(api_key)
+    if request.mode not in ["Standard", "Legal"]:
+        raise HTTPException(status_code=400, detail="Invalid mode. Use 'Standard' or 'Legal'.")
+    try:
+        render_id = job_queue.submit_render(job_id, request.mode, user, request.dummies, request.disabled)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except QueueFull:
+        raise HTTPException(status_code=429, detail="Too many documents in progress, retry later.",
+                            headers={"Retry-After": "5"})
+    try:
+        await job_queue.wait(render_id, keep=True)  # Overlay only: milliseconds, so answer directly
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Render failed: {e}")
+    return job_queue.get(render_id)
+
+@app.get("/jobs/{job_id}/file")
+def get_job_file(job_id: str, api_key: str = Header(None)):
+    user = check_api_key(api_key)
+    job = job_queue.get(job_id)
+    if job is None or job["user"] != user:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return FileResponse(job["result"]["redacted_path"])
+
+def audit_filter(user, doc_id, since, until, pii_type, mode):
+    # Callers only ever see the audits of their own API key
+    try:
+        return audit_query.build_filter(doc_id=doc_id, user=user, since=since, until=until, pii_type=pii_type, mode=mode)
+    except audit_query.InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def audits_collection():
+    # A missing MONGODB_URI is the server's misconfiguration, not a bad request
+    try:
+        return get_audits_collection()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"Audit store unavailable: {e}")
+
+@app.get("/audits")
+def list_audits(api_key: str = Header(None), doc_id: str = None, since: str = None, until: str = None,
+                pii_type: str = None, mode: str = None, fields: str = None, limit: int = 100, cursor: str = None):
+    """
+    Audits of the calling user, newest first, one page at a time.
+    Filters: doc_id (also matches a PDF's page audits), since/until (ISO timestamps),
+    pii_type (e.g. AADHAAR, signature), mode. fields is a comma-separated projection.
+    Pass next_cursor back as cursor for the following page.
+    """
+    user = check_api_key(api_key)
+    filters = audit_filter(user, doc_id, since, until, pii_type, mode)
+    collection = audits_collection()
+    try:
+        records, next_cursor = audit_query.find_page(collection, filters, audit_query.build_projection(fields), limit, cursor)
+    except audit_query.InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"audits": records, "next_cursor": next_cursor}
+
+@app.get("/audits/export")
+def export_audits(api_key: str = Header(None), doc_id: str = None, since: str = None, until: str = None,
+                  pii_type: str = None, mode: str = None, fields: str = None):
+    """
+    Every matching audit (same filters as /audits) streamed as NDJSON.
+    """
+    user = check_api_key(api_key)
+    filters = audit_filter(user, doc_id, since, until, pii_type, mode)
+    lines = audit_query.iter_ndjson(audits_collection(), filters, audit_query.build_projection(fields))
+    return StreamingResponse(lines, media_type="application/x-ndjson",
+                             headers={"Content-Disposition": "attachment; filename=\"audits.ndjson\""})
@@ -1,4 +1,5 @@
 import streamlit as st
+import hashlib
 import os
 import sys
 import cv2
@@ -6,59 +7,129 @@ from PIL import Image
 
 # Adjust Python path to include src/
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.pipeline import run_pipeline
+from src.pipeline import run_pipeline, prepare_layers, render_pipeline
 from src.detection.pii_detection_pipeline import detect_and_link_pii
+from src.detection.model_registry import preload, DEFAULT_MODEL_PATH
+from src.detection.cache import detection_cache
+from src.resources import get_nlp
+from src.pdf import is_pdf
 
 st.title("MirrorMask - Smarter PII Redaction")
 
+@st.cache_resource
+def load_models():
+    # Runs once per server process; every session shares the same YOLO and spaCy instances
+    get_nlp()
+    return preload()
+
+model_status = load_models()[DEFAULT_MODEL_PATH]
+if model_status["fallback"]:
+    st.warning(f"Fine-tuned weights not found, using fallback {model_status['weights']}")
+else:
+    st.caption(f"Model: {model_status['weights']}")
+
 # Simulate multi-user with session state
 if 'user_id' not in st.session_state:
     st.session_state.user_id = os.urandom(16).hex()
 st.write(f"User Session: {st.session_state.user_id[:8]}...")
 
 # File upload
-uploaded_file = st.file_uploader("Upload Document", type=['png', 'jpg'])
+uploaded_file = st.file_uploader("Upload Document", type=['png', 'jpg', 'pdf'])
 if uploaded_file:
     input_path = f"temp/{uploaded_file.name}"
     os.makedirs("temp", exist_ok=True)
     with open(input_path, "wb") as f:
         f.write(uploaded_file.getvalue())
     
-    # Preview detected PII
-    detections, _, _, _ = detect_and_link_pii(input_path)
-    img_cv = cv2.imread(input_path)
-    for det in detections:
-        x1, y1, x2, y2 = det['abs_bbox']
-        cv2.rectangle(img_cv, (x1, y1), (x2, y2), (0, 255, 0), 2)  # Green boxes
-        cv2.putText(img_cv, det['type'], (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-    preview_path = f"temp/preview_{uploaded_file.name}"
-    cv2.imwrite(preview_path, img_cv)
-    st.subheader("Detected PII")
-    st.image(preview_path)
+    if is_pdf(input_path):
+        # Multi-page PDF: pages are redacted in parallel with bounded memory, no per-page preview
+        mode = st.selectbox("Redaction Mode", ["Standard", "Legal"])
+        if st.button("Redact"):
+            output_path = f"output/redacted_{uploaded_file.name}"
+            with st.spinner("Redacting pages..."):
+                redacted_path, audit = run_pipeline(input_path, output_path, doc_id=uploaded_file.name, mode=mode)
+            st.success(f"Redacted {audit['page_count']} pages")
+            with open(redacted_path, "rb") as f:
+                st.download_button("Download Redacted", data=f, file_name=f"redacted_{uploaded_file.name}")
+            st.subheader("Audit Log")
+            st.json(audit)
+    else:
+        # Preview detected PII
+        detections, _, _, page = detect_and_link_pii(input_path)
+        img_cv = page.copy()  # Reuse the decoded page instead of reading the file again
+        for det in detections:
+            x1, y1, x2, y2 = det['abs_bbox']
+            cv2.rectangle(img_cv, (x1, y1), (x2, y2), (0, 255, 0), 2)  # Green boxes
+            cv2.putText(img_cv, det['type'], (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        preview_path = f"temp/preview_{uploaded_file.name}"
+        cv2.imwrite(preview_path, img_cv)
+        st.subheader("Detected PII")
+        st.image(preview_path)
     
-    # Redaction mode
-    mode = st.selectbox("Redaction Mode", ["Standard", "Legal"])
+        # Redaction mode
+        mode = st.selectbox("Redaction Mode", ["Standard", "Legal"])
+        upload_key = hashlib.sha1(uploaded_file.getvalue()).hexdigest()
     
-    if st.button("Redact"):
-        output_path = f"output/redacted_{uploaded_file.name}"
-        redacted_path, audit = run_pipeline(input_path, output_path, doc_id=uploaded_file.name, mode=mode)
+        if st.button("Redact"):
+            st.session_state.redact_key = upload_key
+        
+        if st.session_state.get("redact_key") == upload_key:
+            # Detection and inpainting run once per upload; mode switches, dummy edits and
+            # toggles below only redraw the overlay on the kept base layer
+            if st.session_state.get("layers_key") != upload_key:
+                with st.spinner("Redacting..."):
+                    st.session_state.layers = prepare_layers(page, doc_id=uploaded_file.name)
+                st.session_state.layers_key = upload_key
+                st.session_state.rendered = None
+                st.session_state.dummy_edits = {}
+            layers = st.session_state.layers
+            # Streamlit drops a widget's state on runs where it isn't drawn (the text inputs
+            # are hidden in Legal mode), so the edits themselves live in dummy_edits
+            saved_edits = st.session_state.dummy_edits
+            
+            disabled = []
+            with st.expander("Edit redactions"):
+                for idx, det in enumerate(layers["detections"]):
+                    if not st.checkbox(f"#{idx} {det['type']}: {det['text']}", value=True, key=f"det_{upload_key}_{idx}"):
+                        disabled.append(idx)
+                    elif idx in layers["dummies"] and mode == "Standard":
+                        value = st.text_input(f"Replacement for #{idx}", saved_edits.get(idx, layers["dummies"][idx]),
+                                              key=f"dummy_{upload_key}_{idx}")
+                        if value != layers["dummies"][idx]:
+                            saved_edits[idx] = value
+                        else:
+                            saved_edits.pop(idx, None)
+            edits = dict(saved_edits) if mode == "Standard" else {}
+            
+            output_path = f"output/redacted_{uploaded_file.name}"
+            render_params = (mode, tuple(sorted(edits.items())), tuple(disabled))
+            if st.session_state.rendered != render_params:
+                # Only a changed rendering is written and audited, not every Streamlit rerun
+                _, st.session_state.audit = render_pipeline(layers, output_path, mode=mode, dummies=edits, disabled=disabled,
+                                                            rerender=st.session_state.rendered is not None)
+                st.session_state.rendered = render_params
+            audit = st.session_state.audit
+        
+            # Side-by-side display
+            col1, col2 = st.columns(2)
+            with col1:
+                st.subheader("Original")
+                st.image(input_path)
+            with col2:
+                st.subheader("Redacted")
+                st.image(output_path)
         
-        # Side-by-side display
-        col1, col2 = st.columns(2)
-        with col1:
-            st.subheader("Original")
-            st.image(input_path)
-        with col2:
-            st.subheader("Redacted")
-            st.image(redacted_path)
+            # Download button
+            with open(output_path, "rb") as f:
+                st.download_button("Download Redacted", data=f, file_name=f"redacted_{uploaded_file.name}")
         
-        # Download button
-        with open(redacted_path, "rb") as f:
-            st.download_button("Download Redacted", data=f, file_name=f"redacted_{uploaded_file.name}")
+            # Show audit
+            st.subheader("Audit Log")
+            st.json(audit)
         
-        # Show audit
-        st.subheader("Audit Log")
-        st.json(audit)
+            # Preview already ran detection, so Redact should show a cache hit here
+            st.sidebar.subheader("Detection cache")
+            st.sidebar.json(detection_cache.stats())
     
     if st.button("Clear"):
         st.session_state.clear()
\ No newline at end of file
@@ -0,0 +1,169 @@
+import sys
+import os
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import random
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+os.environ.setdefault("MIRRORMASK_CACHE_SIZE", "0")  # Every run must do the full work, not hit the detection cache
+os.environ["MIRRORMASK_TELEMETRY"] = "1"  # Stage latencies are read from the spans
+import numpy as np
+
+DEFAULT_OUT = os.path.join(ROOT, "benchmark_metrics.json")  # Next to inference_metrics.json
+BASE_SIZE = (800, 1200)  # generate_document page size
+SCALES = [1.0, 2.0, 3.0]  # 3.0 ~ A4 at 260 DPI
+DENSITIES = [1, 2]  # Documents per page side: 2 -> a 2x2 grid, four times the PII per page
+
+class NullSink:
+    # Stands in for the MongoDB audit sink so the benchmark measures the pipeline only
+    def submit(self, audit):
+        pass
+
+def build_corpus(out_dir, docs, seed):
+    """
+    Fixed-seed pages for every (scale, density) combination.
+    Returns:
+        {config name: [encoded PNG bytes, ...]}
+    """
+    import cv2
+    from src.detection import generate_synthetics
+    random.seed(seed)
+    generate_synthetics.fake.seed_instance(seed)
+    width, height = BASE_SIZE
+    corpus = {}
+    for density in DENSITIES:
+        for scale in SCALES:
+            pages = []
+            for i in range(docs):
+                tiles = []
+                for j in range(density * density):
+                    path = os.path.join(out_dir, f"d{density}_s{scale}_{i}_{j}.png")
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        _, pil = generate_synthetics.generate_document(path)
+                    tiles.append(np.asarray(pil.convert("RGB"))[:, :, ::-1])
+                rows = [np.hstack(tiles[r * density:(r + 1) * density]) for r in range(density)]
+                page = cv2.resize(np.vstack(rows), (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+                pages.append(cv2.imencode(".png", page)[1].tobytes())
+            corpus[f"{int(width * scale)}x{int(height * scale)}_density{density}"] = pages
+    return corpus
+
+def install_stubs():
+    # Replace the audit sink with NullSink; stage timings come from the pipeline's own spans
+    import src.pipeline
+    src.pipeline.audit_sink = NullSink()
+
+def _init_bench_worker(model_path):
+    from src.pipeline import init_worker
+    install_stubs()
+    init_worker(model_path)
+
+def _redact(data, model_path):
+    from src.pipeline import run_pipeline
+    run_pipeline(data, mode="Standard", model_path=model_path)
+
+def percentiles(values):
+    ms = np.array(values) * 1000
+    return {"p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)),
+            "p99": float(np.percentile(ms, 99)), "n": len(ms)}
+
+def stage_latencies(corpus, model_path):
+    # In-process pass; each audit carries its span timings (src/telemetry.py).
+    # The first page of each config is a warm-up run
+    from src.pipeline import run_pipeline, init_worker
+    install_stubs()
+    init_worker(model_path)
+    report = {}
+    for config, pages in corpus.items():
+        run_pipeline(pages[0], model_path=model_path)
+        timings = {}
+        for data in pages:
+            _, audit = run_pipeline(data, model_path=model_path)
+            for stage, ms in audit["timings_ms"].items():
+                timings.setdefault(stage, []).append(ms / 1000)
+        report[config] = {stage: percentiles(values) for stage, values in timings.items()}
+    return report
+
+def throughput(pages, model_path, max_workers):
+    # Docs/s over the whole corpus with 1..max_workers spawned worker processes
+    report = {}
+    ctx = multiprocessing.get_context("spawn")
+    for workers in range(1, max_workers + 1):
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_bench_worker,
+                                 initargs=(model_path,)) as executor:
+            list(executor.map(_redact, pages[:workers], [model_path] * workers))  # Warm every worker
+            start = time.perf_counter()
+            list(executor.map(_redact, pages, [model_path] * len(pages)))
+            elapsed = time.perf_counter() - start
+        report[str(workers)] = {"docs_per_s": len(pages) / elapsed, "seconds": elapsed}
+    return report
+
+def compare(report, baseline, tolerance):
+    """
+    Flag regressions against an earlier report: p95 latency up or docs/s down by more than tolerance.
+    """
+    regressions = []
+    for config, stages in report["stages"].items():
+        for stage, stats in stages.items():
+            old = baseline.get("stages", {}).get(config, {}).get(stage)
+            if old and old["p95"] > 0 and stats["p95"] > old["p95"] * (1 + tolerance):
+                regressions.append(f"{config} {stage} p95 {old['p95']:.1f} -> {stats['p95']:.1f} ms")
+    for workers, stats in report["throughput"].items():
+        old = baseline.get("throughput", {}).get(workers)
+        if old and stats["docs_per_s"] < old["docs_per_s"] * (1 - tolerance):
+            regressions.append(f"{workers} workers {old['docs_per_s']:.2f} -> {stats['docs_per_s']:.2f} docs/s")
+    return regressions
+
+if __name__ == "__main__":
+    from src.detection.model_registry import DEFAULT_MODEL_PATH
+    parser = argparse.ArgumentParser(description="Per-stage latency, throughput and memory of run_pipeline on a fixed-seed corpus.")
+    parser.add_argument("--docs", type=int, default=5, help="Pages per (resolution, density) config")
+    parser.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)), help="Measure 1..N workers")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--baseline", help="Earlier report to diff against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = build_corpus(tmp, args.docs, args.seed)
+    print(f"Corpus: {', '.join(f'{k} x{len(v)}' for k, v in corpus.items())}")
+
+    report = {
+        "seed": args.seed,
+        "docs_per_config": args.docs,
+        "model": args.model,
+        "stages": stage_latencies(corpus, args.model),
+        "throughput": throughput([p for pages in corpus.values() for p in pages], args.model, args.workers)
+    }
+    # ru_maxrss is KiB on Linux; children = the largest worker process
+    report["peak_rss_mb"] = {
+        "main": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "worker": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    }
+
+    for config, stages in report["stages"].items():
+        print(config)
+        for stage, s in stages.items():
+            print(f"  {stage:<11} p50 {s['p50']:8.1f}  p95 {s['p95']:8.1f}  p99 {s['p99']:8.1f} ms")
+    for workers, s in report["throughput"].items():
+        print(f"{workers} worker(s): {s['docs_per_s']:.2f} docs/s")
+    print(f"Peak RSS: main {report['peak_rss_mb']['main']:.0f} MB, worker {report['peak_rss_mb']['worker']:.0f} MB")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Report saved to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        sys.exit(1 if regressions else 0)
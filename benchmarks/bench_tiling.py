@@ -0,0 +1,78 @@
+import sys
+import os
+import argparse
+import glob
+import json
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import cv2
+import numpy as np
+from src.detection.model_registry import get_model, DEFAULT_MODEL_PATH
+from src.detection.tiling import predict_boxes, auto_tile_size
+from src.detection.evaluation import CLASS_NAMES, label_path, load_labels, match
+
+def run(images, labels_dir, model, upscale, modes):
+    stats = {mode: {"latencies": [], "found": {}, "total": {}} for mode in modes}
+    for image_path in images:
+        img = cv2.imread(image_path)
+        if img is None:
+            continue
+        if upscale != 1.0:
+            # Simulate a high-DPI scan of the same page
+            img = cv2.resize(img, None, fx=upscale, fy=upscale, interpolation=cv2.INTER_CUBIC)
+        height, width = img.shape[:2]
+        gt_boxes, gt_classes = load_labels(label_path(image_path, labels_dir), width, height)
+        for mode, tile_size in modes.items():
+            start = time.perf_counter()
+            boxes, classes, confs, _ = predict_boxes(model, img, tile_size=tile_size)
+            stats[mode]["latencies"].append(time.perf_counter() - start)
+            hits = match(boxes, classes, confs, gt_boxes, gt_classes)
+            for cls in gt_classes:
+                stats[mode]["total"][cls] = stats[mode]["total"].get(cls, 0) + 1
+            for cls in np.asarray(classes)[hits].astype(int):
+                stats[mode]["found"][cls] = stats[mode]["found"].get(cls, 0) + 1
+    return stats
+
+def summarize(stats):
+    report = {}
+    for mode, s in stats.items():
+        lat = np.array(s["latencies"]) * 1000
+        found, total = sum(s["found"].values()), sum(s["total"].values())
+        report[mode] = {
+            "images": len(lat),
+            "latency_ms_mean": float(lat.mean()) if len(lat) else 0.0,
+            "latency_ms_p95": float(np.percentile(lat, 95)) if len(lat) else 0.0,
+            "recall": found / total if total else 0.0,
+            "per_class_recall": {
+                CLASS_NAMES[cls] if cls < len(CLASS_NAMES) else str(cls): s["found"].get(cls, 0) / n
+                for cls, n in sorted(s["total"].items())
+            }
+        }
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency/recall of whole-page vs tiled YOLO inference.")
+    parser.add_argument("--images", default="data/dataset/val/images")
+    parser.add_argument("--labels", default="data/dataset/val/labels")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--upscale", type=float, default=3.0, help="Resize factor to emulate 300-600 DPI scans")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--out", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    images = sorted(glob.glob(os.path.join(args.images, "*.png")) + glob.glob(os.path.join(args.images, "*.jpg")))[:args.limit]
+    if not images:
+        sys.exit(f"No images found in {args.images}")
+    model = get_model(args.model, warmup=True)
+    sample = cv2.imread(images[0])
+    sample_shape = (int(sample.shape[0] * args.upscale), int(sample.shape[1] * args.upscale))
+    print(f"{len(images)} images at ~{sample_shape[1]}x{sample_shape[0]}, auto tile size: {auto_tile_size(sample_shape)}")
+
+    report = summarize(run(images, args.labels, model, args.upscale, {"whole_page": None, "tiled": "auto"}))
+    for mode, r in report.items():
+        classes = "  ".join(f"{k}={v:.2f}" for k, v in r["per_class_recall"].items())
+        print(f"{mode:<11} mean {r['latency_ms_mean']:7.1f} ms  p95 {r['latency_ms_p95']:7.1f} ms  recall {r['recall']:.3f}  {classes}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Report saved to {args.out}")
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules that must stay lazy: loading any of them at import time costs seconds or
+# opens connections before the process has any work to do
+HEAVY_MODULES = ["spacy", "ultralytics", "torch", "onnxruntime", "pymongo", "cv2", "faker", "scipy", "pytesseract"]
+
+# Cold import budget per entry point, in milliseconds
+DEFAULT_BUDGETS = {
+    "src.pipeline": 250,
+    "api.main": 1500  # FastAPI/pydantic dominate; the pipeline itself must add almost nothing
+}
+
+def profile_import(module):
+    """
+    Import module in a fresh interpreter with -X importtime.
+    Returns (cumulative import time in ms, heavy modules that got loaded).
+    """
+    code = f"import sys, json, {module}; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            total_us = int(parts[1].strip())
+    return total_us / 1000, json.loads(proc.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if entry-point import time or eager heavy imports regress.")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS",
+                        help="Override a budget, e.g. --budget src.pipeline=300")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module; the fastest counts")
+    args = parser.parse_args()
+
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in args.budget:
+        module, ms = item.split("=")
+        budgets[module] = float(ms)
+
+    failed = False
+    for module, budget in budgets.items():
+        runs = [profile_import(module) for _ in range(args.repeat)]
+        best = min(ms for ms, _ in runs)
+        heavy = runs[0][1]
+        status = "OK"
+        if best > budget:
+            status = "OVER BUDGET"
+            failed = True
+        if heavy:
+            status = f"EAGER IMPORTS: {', '.join(heavy)}"
+            failed = True
+        print(f"{module:<16} {best:8.1f} ms (budget {budget:.0f} ms)  {status}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,126 @@
+import base64
+import json
+from datetime import datetime
+
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 500
+OBJECT_ID_HEX_LEN = 24  # Audits inserted before the sink set string _ids carry MongoDB ObjectIds
+
+class InvalidQuery(ValueError):
+    """Malformed audit query parameter (mapped to HTTP 400)."""
+
+# Every list query sorts newest first on (timestamp, _id); the filters lead each compound
+# index so a filtered page is an index range scan, never an in-memory sort
+AUDIT_INDEXES = [
+    [("timestamp", -1), ("_id", -1)],
+    [("doc_id", 1), ("timestamp", -1)],
+    [("source_doc_id", 1), ("timestamp", -1)],  # Page audits of a PDF
+    [("user", 1), ("timestamp", -1), ("_id", -1)],
+    [("redaction_mode", 1), ("timestamp", -1), ("_id", -1)],
+    [("pii_types", 1), ("timestamp", -1), ("_id", -1)]
+]
+
+def ensure_indexes(collection):
+    """
+    Create the audit indexes (no-op for the ones that already exist).
+    """
+    from pymongo import IndexModel
+    return collection.create_indexes([IndexModel(keys) for keys in AUDIT_INDEXES])
+
+def _timestamp(value, name):
+    # Audits store datetime.isoformat() strings, which compare correctly as strings
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise InvalidQuery(f"Invalid {name}: expected an ISO 8601 timestamp")
+
+def build_filter(doc_id=None, user=None, since=None, until=None, pii_type=None, mode=None):
+    """
+    MongoDB filter for audit queries. doc_id also matches the page audits of a PDF;
+    since is inclusive, until exclusive.
+    """
+    clauses = []
+    if doc_id:
+        clauses.append({"$or": [{"doc_id": doc_id}, {"source_doc_id": doc_id}]})
+    if user:
+        clauses.append({"user": user})
+    if since or until:
+        window = {}
+        if since:
+            window["$gte"] = _timestamp(since, "since")
+        if until:
+            window["$lt"] = _timestamp(until, "until")
+        clauses.append({"timestamp": window})
+    if pii_type:
+        clauses.append({"pii_types": pii_type})
+    if mode:
+        clauses.append({"redaction_mode": mode})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def build_projection(fields):
+    """
+    Projection for a comma-separated field list (None: whole records). _id and
+    timestamp are always returned since the page cursor is built from them.
+    """
+    if not fields:
+        return None
+    projection = {field.strip(): 1 for field in fields.split(",") if field.strip()}
+    projection.update({"_id": 1, "timestamp": 1})
+    return projection
+
+def _object_id(record_id):
+    # Back to the stored type, so the _id comparison matches (MongoDB compares same-type values only)
+    if len(record_id) == OBJECT_ID_HEX_LEN:
+        try:
+            from bson import ObjectId
+            return ObjectId(record_id)
+        except Exception:
+            pass  # Not hex: a plain string id
+    return record_id
+
+def encode_cursor(record):
+    raw = json.dumps([record["timestamp"], str(record["_id"])]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        timestamp, record_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        record_id = _object_id(str(record_id))
+    except Exception:
+        raise InvalidQuery("Invalid cursor")
+    # Strictly after the last record of the previous page in (timestamp, _id) descending order
+    return {"$or": [{"timestamp": {"$lt": timestamp}}, {"timestamp": timestamp, "_id": {"$lt": record_id}}]}
+
+def find_page(collection, filters, projection=None, limit=100, cursor=None):
+    """
+    One page of audits, newest first. Keyset pagination: the cursor encodes the last
+    record's (timestamp, _id), so every page costs the same however deep it is.
+    Raises InvalidQuery for a malformed cursor.
+    Returns:
+        (records with _id as a string, next cursor or None when this is the last page)
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        after = decode_cursor(cursor)
+        filters = {"$and": [filters, after]} if filters else after
+    records = list(collection.find(filters, projection).sort([("timestamp", -1), ("_id", -1)]).limit(limit + 1))
+    for record in records:
+        record["_id"] = str(record["_id"])  # ObjectId isn't JSON-serializable
+    if len(records) <= limit:
+        return records, None
+    records = records[:limit]
+    return records, encode_cursor(records[-1])
+
+def iter_ndjson(collection, filters, projection=None):
+    """
+    Every matching audit as one JSON line, read in batches off the server cursor so
+    an export never holds more than one batch in memory.
+    """
+    cursor = collection.find(filters, projection).sort([("timestamp", -1), ("_id", -1)]).batch_size(EXPORT_BATCH_SIZE)
+    try:
+        for record in cursor:
+            yield (json.dumps(record, default=str) + "\n").encode()
+    finally:
+        cursor.close()
@@ -0,0 +1,226 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from src import telemetry
+from src.audit.store import AuditLog
+
+class AuditSink:
+    """
+    Background audit writer.
+    Records are queued by submit() and written by one daemon thread: batched into
+    insert_many, with exponential backoff while MongoDB is unreachable. Batches that
+    can't be inserted are appended to a local JSONL spool, which is replayed once
+    MongoDB answers again. The local backup (a segmented AuditLog under
+    <audit_dir>/log) is written here too, so none of this sits on the request's
+    critical path.
+    """
+
+    def __init__(self, collection_factory, audit_dir="audit", batch_size=100, flush_interval=1.0,
+                 max_backoff=60.0, orphan_age=600, local_backup=True):
+        self.collection_factory = collection_factory
+        self.audit_dir = audit_dir
+        self.spool_dir = os.path.join(audit_dir, "spool")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.orphan_age = orphan_age  # Other processes' spools untouched this long are replayed too
+        self.local_log = AuditLog(os.path.join(audit_dir, "log")) if local_backup else None  # Bulk writers keep their own
+        self.queue = queue.Queue()
+        self.thread = None
+        self.thread_lock = threading.Lock()
+        self.collection = None
+        self.backoff = 0.0
+        self.retry_at = 0.0
+        self.stats = {"submitted": 0, "inserted": 0, "spooled": 0, "replayed": 0, "failures": 0}
+
+    @property
+    def spool_path(self):
+        # One spool per process, so worker processes never interleave writes
+        return os.path.join(self.spool_dir, f"spool-{os.getpid()}.jsonl")
+
+    def submit(self, audit):
+        """
+        Queue one audit record; returns immediately.
+        """
+        self.submit_many([audit])
+
+    def submit_many(self, audits):
+        self._ensure_thread()
+        for audit in audits:
+            record = dict(audit)
+            record.setdefault("_id", uuid.uuid4().hex)  # Stable id makes replays idempotent
+            self.stats["submitted"] += 1
+            self.queue.put(record)
+
+    def flush(self, timeout=None):
+        """
+        Block until every queued record is in MongoDB or the spool.
+        """
+        if self.thread is None:
+            return True
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """
+        Flush, then close (and compress) the local log's active segment.
+        """
+        flushed = self.flush(timeout)
+        if self.local_log:
+            self.local_log.close()
+        return flushed
+
+    def _ensure_thread(self):
+        with self.thread_lock:
+            if self.thread is None or not self.thread.is_alive():
+                if self.thread is None:
+                    atexit.register(self.close, 10)  # Don't drop queued audits on interpreter exit
+                self.thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            batch, waiters = self._next_batch()
+            if batch:
+                if self.local_log:
+                    self._write_local(batch)
+                self._write(batch)
+            elif self.retry_at <= time.time():
+                self._replay()
+            for done in waiters:
+                done.set()
+
+    def _next_batch(self):
+        batch, waiters = [], []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                break
+            batch.append(item)
+        return batch, waiters
+
+    def _write_local(self, batch):
+        # Appended with their _id, so local records can be matched to MongoDB ones
+        try:
+            self.local_log.append_many(batch)
+        except Exception as e:
+            print(f"Failed to write local audit log: {e}")
+
+    def _get_collection(self):
+        if self.collection is None:
+            self.collection = self.collection_factory()
+        return self.collection
+
+    def _insert(self, records):
+        from pymongo.errors import BulkWriteError
+        start = time.perf_counter()
+        try:
+            self._get_collection().insert_many([dict(r) for r in records], ordered=False)
+        except BulkWriteError as e:
+            # Duplicate _id means an earlier attempt already stored that record
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+        finally:
+            telemetry.observe("mirrormask_audit_write_seconds", time.perf_counter() - start)
+
+    def _write(self, batch):
+        if time.time() < self.retry_at:
+            self._spool(batch)  # Still backing off: don't wait on a dead server
+            return
+        try:
+            self._insert(batch)
+            self.stats["inserted"] += len(batch)
+            self.backoff = 0.0
+            self.retry_at = 0.0
+        except Exception as e:
+            self._fail(e)
+            self._spool(batch)
+            return
+        self._replay()
+
+    def _fail(self, error):
+        self.stats["failures"] += 1
+        self.backoff = min(self.max_backoff, self.backoff * 2 if self.backoff else 1.0)
+        self.retry_at = time.time() + self.backoff
+        print(f"MongoDB audit write failed: {error}. Spooling locally, retry in {self.backoff:.0f}s.")
+
+    def _spool(self, batch):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        lines = "".join(json.dumps(record) + "\n" for record in batch)
+        with open(self.spool_path, "a") as f:
+            f.write(lines)
+        self.stats["spooled"] += len(batch)
+
+    def _spool_files(self):
+        own = self.spool_path
+        cutoff = time.time() - self.orphan_age
+        files = []
+        # Also picks up claimed files left behind by a process that died mid-replay
+        for path in glob.glob(os.path.join(self.spool_dir, "spool-*.jsonl*")):
+            try:
+                if path != own and (os.path.getmtime(path) >= cutoff or _claimed_by_live_process(path)):
+                    continue
+                files.append(path)
+            except OSError:
+                continue
+        return files
+
+    def _replay(self):
+        """
+        Push spooled records to MongoDB. A spool file is claimed by renaming it, so
+        records appended meanwhile go to a fresh spool and are replayed next time.
+        Another process may claim or finish the same file first; that file is skipped.
+        """
+        for path in self._spool_files():
+            claimed = f"{path}.replay-{os.getpid()}"
+            try:
+                os.replace(path, claimed)
+                os.utime(claimed)  # Fresh mtime: not an orphan while this process replays it
+                with open(claimed) as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+            except OSError:
+                continue  # e.g. FileNotFoundError: another process claimed it first
+            try:
+                for i in range(0, len(records), self.batch_size):
+                    self._insert(records[i:i + self.batch_size])
+                    os.utime(claimed)
+            except Exception as e:
+                self._fail(e)
+                self._spool(records[i:])
+                _remove(claimed)
+                return
+            _remove(claimed)
+            self.backoff = 0.0
+            self.retry_at = 0.0
+            self.stats["replayed"] += len(records)
+            print(f"Replayed {len(records)} spooled audits to MongoDB")
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _claimed_by_live_process(path):
+    # spool-<pid>.jsonl.replay-<pid>: the last pid is the process replaying it
+    _, sep, pid = path.rpartition(".replay-")
+    if not sep or not pid.isdigit() or int(pid) == os.getpid() or os.name != "posix":
+        return False  # os.kill(pid, 0) would terminate the process on Windows; rely on the mtime there
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    return True
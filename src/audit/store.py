@@ -0,0 +1,264 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+
+SEGMENT_BYTES = int(os.getenv("MIRRORMASK_AUDIT_SEGMENT_MB", "64")) << 20
+SEGMENT_AGE = float(os.getenv("MIRRORMASK_AUDIT_SEGMENT_AGE", "3600"))  # Seconds before an active segment is rotated
+COMPRESSION = os.getenv("MIRRORMASK_AUDIT_COMPRESSION", "gzip")  # "gzip", "zstd" or "none"
+BLOCK_BYTES = 1 << 20  # Closed segments are compressed in independent blocks of about this much JSONL
+EXTENSIONS = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+def _codec(compression):
+    """
+    (compress, decompress) functions for one block.
+    """
+    if compression == "gzip":
+        return (lambda data: gzip.compress(data, compresslevel=6)), gzip.decompress
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Audit compression 'zstd' needs the zstandard package; install it or use 'gzip'")
+        return zstandard.ZstdCompressor(level=10).compress, (lambda data: zstandard.ZstdDecompressor().decompress(data))
+    raise ValueError(f"Unknown audit compression: {compression}. Use one of {list(EXTENSIONS)}.")
+
+def _compression_of(segment):
+    for compression, ext in EXTENSIONS.items():
+        if compression != "none" and segment.endswith(ext):
+            return compression
+    return "none"
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _read_index(index_path):
+    """
+    Sidecar index: a header line {"segment": file name}, then one line per record:
+    [doc_id, block offset, block length, offset, length]. Active (uncompressed)
+    segments use block length 0 and a plain file offset.
+    """
+    header, entries = None, []
+    with open(index_path) as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from a killed process
+            if header is None:
+                header = item
+            else:
+                entries.append(item)
+    return header, entries
+
+class AuditLog:
+    """
+    Local append-only audit store. Records go to segmented JSONL files, one active
+    segment per process, so concurrent workers never interleave writes. A segment is
+    rotated once it passes max_bytes or max_age; closed segments are compressed in
+    independent blocks. Each segment has a sidecar index mapping doc_id to its block
+    and offset, so find() reads one block instead of scanning the log. Nothing is ever
+    overwritten: a doc_id written twice keeps both records.
+    """
+
+    def __init__(self, directory, max_bytes=SEGMENT_BYTES, max_age=SEGMENT_AGE, compression=COMPRESSION,
+                 orphan_age=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compression = compression
+        # Other processes' raw segments idle this long get closed; their owner would rotate them before writing again
+        self.orphan_age = 2 * max_age if orphan_age is None else orphan_age
+        self.lock = threading.Lock()
+        self.file = None
+        self.index_file = None
+        self.stem = None
+        self.opened = 0.0
+        self.size = 0
+        self.sequence = 0
+        self.index_cache = {}
+        if compression != "none":
+            _codec(compression)  # Fail at startup, not at the first rotation
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            self.sequence += 1
+            self.stem = os.path.join(self.directory, f"audit-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.sequence:04d}")
+            try:
+                # The index outlives the raw file, so claiming it never reuses a closed segment's name
+                self.index_file = open(self.stem + ".idx", "x")
+                break
+            except FileExistsError:
+                continue
+        self.file = open(self.stem + ".jsonl", "wb")
+        self.index_file.write(json.dumps({"segment": os.path.basename(self.stem) + ".jsonl"}) + "\n")
+        self.opened = time.time()
+        self.size = 0
+        self._close_orphans()
+
+    def append_many(self, records):
+        """
+        Append records (dicts with a doc_id) to the active segment.
+        """
+        with self.lock:
+            if self.file is not None and (self.size >= self.max_bytes or time.time() - self.opened >= self.max_age):
+                self._rotate()
+            if self.file is None:
+                self._open_segment()
+            lines, entries = [], []
+            for record in records:
+                line = (json.dumps(record) + "\n").encode()
+                entries.append(json.dumps([record.get("doc_id"), 0, 0, self.size, len(line)]) + "\n")
+                lines.append(line)
+                self.size += len(line)
+            # Records before their index entries: a crash in between leaves an unindexed record, never a dangling entry
+            self.file.write(b"".join(lines))
+            self.file.flush()
+            self.index_file.write("".join(entries))
+            self.index_file.flush()
+
+    def append(self, record):
+        self.append_many([record])
+
+    def _rotate(self):
+        stem = self.stem
+        self.file.close()
+        self.index_file.close()
+        self.file = self.index_file = None
+        self.close_segment(stem)
+
+    def close(self):
+        """
+        Close and compress the active segment (call at shutdown).
+        """
+        with self.lock:
+            if self.file is not None:
+                self._rotate()
+
+    def close_segment(self, stem):
+        """
+        Compress a finished raw segment block by block and rewrite its index to point
+        into the compressed file. Safe to rerun after a crash at any step.
+        """
+        raw_path, index_path = stem + ".jsonl", stem + ".idx"
+        header, entries = _read_index(index_path)
+        if self.compression == "none" or (header and header["segment"] != os.path.basename(raw_path)):
+            if header and header["segment"] != os.path.basename(raw_path):
+                _remove(raw_path)  # Already compressed and re-indexed; only the raw file was left behind
+            return
+        compress, _ = _codec(self.compression)
+        out_path = stem + EXTENSIONS[self.compression]
+        new_entries, block, block_entries = [], [], []
+        block_size = 0
+
+        tmp = f".tmp-{os.getpid()}"  # The owner and an orphan sweep may race; os.replace settles it
+        with open(raw_path, "rb") as raw, open(out_path + tmp, "wb") as out:
+            def flush_block():
+                data = compress(b"".join(block))
+                start = out.tell()
+                out.write(data)
+                new_entries.extend([doc_id, start, len(data), offset, length] for doc_id, offset, length in block_entries)
+
+            for doc_id, _, _, offset, length in entries:
+                raw.seek(offset)
+                line = raw.read(length)
+                if len(line) != length:
+                    continue  # Index entry past a torn write
+                block_entries.append((doc_id, block_size, length))
+                block.append(line)
+                block_size += length
+                if block_size >= BLOCK_BYTES:
+                    flush_block()
+                    block, block_entries, block_size = [], [], 0
+            if block:
+                flush_block()
+        os.replace(out_path + tmp, out_path)
+        with open(index_path + tmp, "w") as f:
+            f.write(json.dumps({"segment": os.path.basename(out_path)}) + "\n")
+            f.write("".join(json.dumps(entry) + "\n" for entry in new_entries))
+        os.replace(index_path + tmp, index_path)
+        _remove(raw_path)
+
+    def _close_orphans(self):
+        # Raw segments of processes that exited without close() (killed workers, crashes)
+        cutoff = time.time() - self.orphan_age
+        own = f"-{os.getpid()}-"
+        for raw_path in glob.glob(os.path.join(self.directory, "audit-*.jsonl")):
+            try:
+                if own in os.path.basename(raw_path) or os.path.getmtime(raw_path) >= cutoff:
+                    continue
+                self.close_segment(raw_path[:-len(".jsonl")])
+            except Exception as e:
+                print(f"Failed to close audit segment {raw_path}: {e}")
+
+    def _index(self, index_path):
+        stat = os.stat(index_path)
+        cached = self.index_cache.get(index_path)
+        if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1], cached[2]
+        header, entries = _read_index(index_path)
+        by_doc = {}
+        for entry in entries:
+            by_doc.setdefault(entry[0], []).append(entry)
+        segment = os.path.join(self.directory, header["segment"]) if header else None
+        self.index_cache[index_path] = ((stat.st_mtime_ns, stat.st_size), segment, by_doc)
+        return segment, by_doc
+
+    def _read(self, segment, entries):
+        records = []
+        compression = _compression_of(segment)
+        decompress = _codec(compression)[1] if compression != "none" else None
+        blocks = {}
+        with open(segment, "rb") as f:
+            for _, block, block_length, offset, length in entries:
+                if decompress is None:
+                    f.seek(offset)
+                    records.append(json.loads(f.read(length)))
+                    continue
+                if block not in blocks:
+                    f.seek(block)
+                    blocks[block] = decompress(f.read(block_length))
+                records.append(json.loads(blocks[block][offset:offset + length]))
+        return records
+
+    def find(self, doc_id):
+        """
+        Every record stored for doc_id, oldest first. Reads only the sidecar indexes
+        and the blocks that hold matches.
+        """
+        records = []
+        for index_path in sorted(glob.glob(os.path.join(self.directory, "audit-*.idx"))):
+            try:
+                segment, by_doc = self._index(index_path)
+                if segment and doc_id in by_doc:
+                    records.extend(self._read(segment, by_doc[doc_id]))
+            except (OSError, ValueError) as e:
+                print(f"Skipping audit segment {index_path}: {e}")  # e.g. rotated between listing and reading
+        return records
+
+    def iter_records(self):
+        """
+        Every record in the log, segment by segment.
+        """
+        for index_path in sorted(glob.glob(os.path.join(self.directory, "audit-*.idx"))):
+            segment, by_doc = self._index(index_path)
+            if not segment:
+                continue
+            entries = sorted((entry for entries in by_doc.values() for entry in entries), key=lambda e: (e[1], e[3]))
+            yield from self._read(segment, entries)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read the local audit log.")
+    parser.add_argument("doc_id", nargs="?", help="Print the audits of this document (default: every audit)")
+    parser.add_argument("--dir", default=os.path.join("audit", "log"))
+    args = parser.parse_args()
+    log = AuditLog(args.dir, compression="none")
+    for record in (log.find(args.doc_id) if args.doc_id else log.iter_records()):
+        print(json.dumps(record))
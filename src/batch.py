@@ -0,0 +1,216 @@
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.detection.model_registry import DEFAULT_MODEL_PATH
+
+INPUT_EXTENSIONS = (".png", ".jpg", ".jpeg", ".pdf")
+HASH_CHUNK = 1 << 20
+
+def find_inputs(patterns):
+    """
+    Expand directories (recursively) and globs into (path, relative output name) pairs.
+    Names are relative to the common root, so same-named files in different folders don't collide.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        paths.extend(p for p in matches if os.path.isfile(p) and p.lower().endswith(INPUT_EXTENSIONS))
+    paths = sorted(set(os.path.abspath(p) for p in paths))
+    if not paths:
+        return []
+    root = os.path.commonpath([os.path.dirname(p) for p in paths])
+    return [(p, os.path.relpath(p, root)) for p in paths]
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class Manifest:
+    """
+    Append-only JSONL of finished documents, keyed by content hash. A rerun skips
+    every hash recorded as done, so an interrupted batch resumes where it stopped
+    (and renamed or duplicated files aren't redone). Failed documents are retried.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line from a killed run
+                    if entry.get("status") == "done":
+                        self.done.add(entry["hash"])
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a")
+
+    def record(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        if entry["status"] == "done":
+            self.done.add(entry["hash"])
+
+    def close(self):
+        self.file.close()
+
+class AuditWriter:
+    """
+    Bulk audit output for a batch run: a segmented, compressed AuditLog instead of one
+    JSON file per document, plus MongoDB inserts in large insert_many batches.
+    """
+
+    def __init__(self, audit_dir, mongo=True, batch_size=500):
+        from src.audit.store import AuditLog
+        self.log = AuditLog(audit_dir)
+        self.sink = None
+        if mongo:
+            from src.audit.sink import AuditSink
+            from src.resources import get_audits_collection
+            self.sink = AuditSink(get_audits_collection, batch_size=batch_size, local_backup=False)
+
+    def write(self, audits):
+        self.log.append_many(audits)
+        if self.sink:
+            self.sink.submit_many(audits)
+
+    def close(self):
+        self.log.close()
+        if self.sink:
+            self.sink.flush()
+
+def _init_worker(model_path):
+    from src.pipeline import init_worker
+    init_worker(model_path)
+
+def _process(path, output_path, doc_id, mode, engine, model_path):
+    # Worker: redact one document; audits go back to the parent instead of the sink
+    from src.pipeline import run_pipeline
+    _, audit = run_pipeline(path, output_path, doc_id=doc_id, mode=mode, model_path=model_path,
+                            pdf_workers=1, inpaint_engine=engine, log_audit=False)
+    return audit.get("pages") or [audit]
+
+class Progress:
+    def __init__(self, total, interval=2.0):
+        self.total = total
+        self.interval = interval
+        self.start = time.time()
+        self.last = 0.0
+        self.docs = self.pages = self.failed = self.skipped = 0
+
+    def update(self, pages=0, failed=False, skipped=False):
+        if skipped:
+            self.skipped += 1
+        elif failed:
+            self.failed += 1
+        else:
+            self.docs += 1
+            self.pages += pages
+        self.report()
+
+    def report(self, force=False):
+        now = time.time()
+        if not force and now - self.last < self.interval:
+            return
+        self.last = now
+        elapsed = max(now - self.start, 1e-9)
+        rate = self.docs / elapsed
+        remaining = self.total - self.docs - self.failed - self.skipped
+        eta = remaining / rate if rate else float("inf")
+        sys.stderr.write(f"\r{self.total - remaining}/{self.total} docs ({self.skipped} skipped, {self.failed} failed)  "
+                         f"{rate:.2f} docs/s  {self.pages / elapsed:.2f} pages/s  ETA {eta / 60:.1f} min   ")
+        sys.stderr.flush()
+
+def run_batch(inputs, out_dir, workers=None, mode="Standard", engine="telea", model_path=DEFAULT_MODEL_PATH,
+              manifest_path=None, mongo=True):
+    """
+    Redact every input on a process pool (models load once per worker).
+    Returns:
+        Dict with counts of done, skipped and failed documents.
+    """
+    workers = workers or max(1, min(4, os.cpu_count() or 1))
+    manifest = Manifest(manifest_path or os.path.join(out_dir, "manifest.jsonl"))
+    inputs = find_inputs(inputs)
+    print(f"{len(inputs)} documents, {len(manifest.done)} hashes already done, {workers} workers")
+
+    audits = AuditWriter(os.path.join(out_dir, "audits"), mongo=mongo)
+    progress = Progress(len(inputs))
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(model_path,))
+    pending = {}
+    queue = iter(inputs)
+    try:
+        while True:
+            # At most 2 x workers documents in flight, so a 100k-file run doesn't queue 100k futures.
+            # Hashing happens here rather than up front, so work starts right away
+            while len(pending) < 2 * workers:
+                item = next(queue, None)
+                if item is None:
+                    break
+                path, rel = item
+                digest = file_hash(path)
+                if digest in manifest.done:
+                    progress.update(skipped=True)
+                    continue
+                output_path = os.path.join(out_dir, "redacted", rel)
+                future = executor.submit(_process, path, output_path, rel, mode, engine, model_path)
+                pending[future] = (path, digest, output_path)
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path, digest, output_path = pending.pop(future)
+                entry = {"hash": digest, "source": path, "output": output_path, "finished": time.time()}
+                try:
+                    records = future.result()
+                except Exception as e:
+                    manifest.record(dict(entry, status="failed", error=str(e)))
+                    progress.update(failed=True)
+                    continue
+                audits.write(records)
+                manifest.record(dict(entry, status="done", pages=len(records)))
+                progress.update(pages=len(records))
+    finally:
+        executor.shutdown(cancel_futures=True)
+        audits.close()
+        manifest.close()
+        progress.report(force=True)
+        sys.stderr.write("\n")
+    return {"done": progress.docs, "skipped": progress.skipped, "failed": progress.failed, "pages": progress.pages,
+            "seconds": time.time() - progress.start}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Redact a directory or glob of documents in bulk.")
+    parser.add_argument("inputs", nargs="+", help="Directories (searched recursively) or glob patterns")
+    parser.add_argument("--out", default="output/batch", help="Redacted files, audits and manifest go here")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--mode", choices=["Standard", "Legal"], default="Standard")
+    parser.add_argument("--engine", choices=["telea", "fill", "downscale"], default="telea")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--manifest", help="Default: <out>/manifest.jsonl")
+    parser.add_argument("--no-mongo", action="store_true", help="Write audits to the local audit log only")
+    parser.add_argument("--pseudonym-key", help="Secret that keeps dummies stable across the whole batch "
+                                                "(default: MIRRORMASK_PSEUDONYM_KEY, else per document)")
+    args = parser.parse_args()
+    if args.pseudonym_key:
+        os.environ["MIRRORMASK_PSEUDONYM_KEY"] = args.pseudonym_key  # Inherited by the spawned workers
+
+    summary = run_batch(args.inputs, args.out, args.workers, args.mode, args.engine, args.model,
+                        args.manifest, mongo=not args.no_mongo)
+    print(f"Done: {summary['done']} redacted ({summary['pages']} pages), {summary['skipped']} skipped, "
+          f"{summary['failed']} failed in {summary['seconds']:.0f}s")
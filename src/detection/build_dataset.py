@@ -0,0 +1,220 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import pandas as pd
+import yaml
+from src.detection.evaluation import CLASS_NAMES
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+LINK_MODES = ["hardlink", "symlink", "copy"]
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1 << 20
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode(), digest_size=20).hexdigest()
+
+def signverod_records(base_dir):
+    """
+    YOLO labels for SignVerOD (train.csv -> train, test.csv -> val), computed column-wise.
+    bbox in the CSVs is normalized [x_min, y_min, w, h]; category_id is 1-based.
+    Returns:
+        DataFrame with columns split, name, source, label.
+    """
+    image_ids = pd.read_csv(os.path.join(base_dir, 'image_ids.csv'), usecols=['id', 'file_name'])
+    frames = []
+    for csv_name, split in (('train.csv', 'train'), ('test.csv', 'val')):
+        df = pd.read_csv(os.path.join(base_dir, csv_name), usecols=['image_id', 'bbox', 'category_id'])
+        coords = df['bbox'].str.strip('[] ').str.split(',', expand=True).astype(float)
+        x, y, w, h = coords[0], coords[1], coords[2], coords[3]
+        lines = ((df['category_id'].astype(int) - 1).astype(str) + " " + (x + w / 2).astype(str) + " "
+                 + (y + h / 2).astype(str) + " " + w.astype(str) + " " + h.astype(str) + "\n")
+        labels = lines.groupby(df['image_id'], sort=False).sum().rename('label').reset_index()
+        labels = labels.merge(image_ids, left_on='image_id', right_on='id', how='left')
+        missing = labels['file_name'].isna()
+        if missing.any():
+            print(f"Warning: {missing.sum()} image IDs in {csv_name} not found in image_ids.csv")
+        labels = labels[~missing]
+        frames.append(pd.DataFrame({
+            'split': split,
+            'name': labels['file_name'].values,
+            'source': (os.path.join(base_dir, 'images') + os.sep + labels['file_name']).values,
+            'label': labels['label'].values
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def synthetic_records(images_dir, labels_dir, val_ratio=0.2):
+    """
+    Synthetic PNGs and their YOLO label files (see generate_synthetics.py). The split is
+    a hash of the file name, so adding samples never moves existing ones between splits.
+    Returns:
+        DataFrame with columns split, name, source, label.
+    """
+    names = sorted(f for f in os.listdir(images_dir) if f.endswith('.png'))
+    df = pd.DataFrame({'name': names})
+    df['source'] = images_dir + os.sep + df['name']
+    bucket = df['name'].map(lambda n: int(hashlib.blake2b(n.encode(), digest_size=8).hexdigest(), 16) / 2 ** 64)
+    df['split'] = (bucket < val_ratio).map({True: 'val', False: 'train'})
+
+    def read_label(name):
+        path = os.path.join(labels_dir, name[:-len('.png')] + '.txt')
+        if not os.path.exists(path):
+            return ""  # No boxes: YOLO treats an empty label file as a background image
+        with open(path) as f:
+            return f.read()
+    df['label'] = df['name'].map(read_label)
+    return df[['split', 'name', 'source', 'label']]
+
+def place(source, target, link):
+    """
+    Put source at target without copying bytes where possible: hardlink, then symlink
+    (other filesystem, or no hardlink support), then copy as the last resort.
+    Returns:
+        The method actually used.
+    """
+    if os.path.lexists(target):
+        os.remove(target)
+    if link == "hardlink":
+        try:
+            os.link(source, target)
+            return "hardlink"
+        except OSError:
+            link = "symlink"
+    if link == "symlink":
+        try:
+            os.symlink(os.path.abspath(source), target)
+            return "symlink"
+        except OSError:
+            pass  # e.g. Windows without symlink privilege
+    shutil.copy2(source, target)
+    return "copy"
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+def write_data_yaml(yaml_path, out_dir, counts):
+    # Paths relative to the yaml, like the hand-written one (export_onnx.val_images reads it the same way)
+    yaml_dir = os.path.dirname(os.path.abspath(yaml_path))
+    config = {
+        'train': os.path.relpath(os.path.join(out_dir, 'train', 'images'), yaml_dir).replace(os.sep, '/'),
+        'val': os.path.relpath(os.path.join(out_dir, 'val', 'images'), yaml_dir).replace(os.sep, '/'),
+        'nc': len(CLASS_NAMES),
+        'names': CLASS_NAMES
+    }
+    with open(yaml_path, 'w') as f:
+        f.write(f"# Generated by build_dataset.py: {counts['train']} train / {counts['val']} val images\n")
+        yaml.safe_dump(config, f, sort_keys=False, default_flow_style=None)
+
+def build_dataset(records, out_dir, link="hardlink", yaml_path=None):
+    """
+    Lay out records as <out_dir>/{train,val}/{images,labels}. Images are linked, labels
+    written. A content-hashed manifest (<out_dir>/manifest.json) makes rebuilds incremental:
+    only new or changed images and labels are touched, and files no longer in the
+    records are removed. Sources whose size and mtime are unchanged are not re-hashed.
+    Returns:
+        Dict of counts (linked, labels_written, unchanged, removed, train, val).
+    """
+    duplicates = records.duplicated(['split', 'name'])
+    if duplicates.any():
+        raise ValueError(f"Duplicate image names across sources: {sorted(records.loc[duplicates, 'name'])[:5]}")
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    manifest = load_manifest(manifest_path)
+    old = manifest.get("files", {})
+    same_link = manifest.get("link") == link  # Switching link modes re-places every image
+    files = {}
+    stats = {"linked": 0, "labels_written": 0, "unchanged": 0, "removed": 0}
+    for split in ('train', 'val'):
+        os.makedirs(os.path.join(out_dir, split, 'images'), exist_ok=True)
+        os.makedirs(os.path.join(out_dir, split, 'labels'), exist_ok=True)
+
+    records = records.assign(
+        image_rel=records['split'] + '/images/' + records['name'],
+        label_rel=records['split'] + '/labels/' + records['name'].str.rsplit('.', n=1).str[0] + '.txt'
+    )
+    for rec in records.itertuples(index=False):
+        try:
+            st = os.stat(rec.source)
+        except OSError:
+            print(f"Warning: Image {rec.source} not found")
+            continue
+        prev = old.get(rec.image_rel)
+        target = os.path.join(out_dir, rec.image_rel)
+        if prev and prev["source"] == rec.source and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns:
+            digest = prev["hash"]
+        else:
+            digest = file_hash(rec.source)
+        if same_link and prev and prev["hash"] == digest and prev["source"] == rec.source and os.path.lexists(target):
+            method = prev["link"]
+            stats["unchanged"] += 1
+        else:
+            method = place(rec.source, target, link)
+            stats["linked"] += 1
+        files[rec.image_rel] = {"source": rec.source, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                "hash": digest, "link": method}
+
+        label_digest = text_hash(rec.label)
+        label_target = os.path.join(out_dir, rec.label_rel)
+        prev = old.get(rec.label_rel)
+        if not (prev and prev["hash"] == label_digest and os.path.exists(label_target)):
+            with open(label_target, 'w') as f:
+                f.write(rec.label)
+            stats["labels_written"] += 1
+        files[rec.label_rel] = {"hash": label_digest}
+
+    for rel in set(old) - set(files):
+        path = os.path.join(out_dir, rel)
+        if os.path.lexists(path):
+            os.remove(path)
+        stats["removed"] += 1
+
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": MANIFEST_VERSION, "link": link, "files": files}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+    for split in ('train', 'val'):
+        stats[split] = sum(1 for rel in files if rel.startswith(f"{split}/images/"))
+    if yaml_path:
+        write_data_yaml(yaml_path, out_dir, stats)
+    return stats
+
+if __name__ == "__main__":
+    data_dir = os.path.join(ROOT_DIR, 'data')
+    parser = argparse.ArgumentParser(description="Build the YOLO training set (SignVerOD + synthetics) without copying images.")
+    parser.add_argument("--signverod", default=os.path.join(data_dir, 'signverod'), help="Extracted Kaggle SignVerOD folder")
+    parser.add_argument("--synthetics", default=os.path.join(data_dir, 'test_samples'), help="Folder with images/ and labels/")
+    parser.add_argument("--val-ratio", type=float, default=0.2, help="Share of synthetics put in val")
+    parser.add_argument("--out", default=os.path.join(data_dir, 'dataset'))
+    parser.add_argument("--link", choices=LINK_MODES, default="hardlink")
+    parser.add_argument("--data-yaml", default=os.path.join(os.path.dirname(__file__), 'data.yaml'))
+    args = parser.parse_args()
+
+    frames = []
+    if os.path.exists(os.path.join(args.signverod, 'image_ids.csv')):
+        frames.append(signverod_records(args.signverod))
+    else:
+        print(f"Warning: SignVerOD not found at {args.signverod}")
+    if os.path.exists(os.path.join(args.synthetics, 'images')):
+        frames.append(synthetic_records(os.path.join(args.synthetics, 'images'), os.path.join(args.synthetics, 'labels'), args.val_ratio))
+    else:
+        print(f"Warning: Synthetics not found at {args.synthetics}")
+    if not frames:
+        sys.exit("Nothing to build")
+
+    stats = build_dataset(pd.concat(frames, ignore_index=True), os.path.abspath(args.out), args.link, args.data_yaml)
+    print(f"Final dataset: Train images = {stats['train']}, Val images = {stats['val']} "
+          f"({stats['linked']} linked, {stats['labels_written']} labels written, {stats['unchanged']} unchanged, {stats['removed']} removed)")
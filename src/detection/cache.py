@@ -0,0 +1,159 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+class DetectionCache:
+    """
+    Content-addressed cache of detect_and_link_pii results.
+    Keys hash the decoded pixels plus the model/config version, so the same page
+    hits whether it arrives as a path, bytes or an array. Entries live in an
+    in-memory LRU and, if disk_dir is set, in JSON files that survive restarts.
+    The disk tier holds at most disk_max_entries files; the least recently used
+    (by mtime, refreshed on every disk hit) are evicted first.
+
+    Entries hold the OCR text of detections, i.e. raw PII: disk_dir is created
+    owner-only (0700) and its files 0600. Point it at storage with the same
+    protection as the uploads themselves.
+    """
+
+    def __init__(self, max_entries=128, disk_dir=None, disk_max_entries=10000):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self.disk_count = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, mode=0o700, exist_ok=True)
+            self.disk_count = len(self._disk_files())
+
+    @staticmethod
+    def key(img, version):
+        """
+        Cache key for a decoded BGR page and a model/config version string.
+        """
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{img.shape}|{img.dtype}|{version}".encode())
+        h.update(memoryview(img if img.flags['C_CONTIGUOUS'] else img.copy()).cast('B'))
+        return h.hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def get(self, key):
+        """
+        Return a copy of (detections, links, dummies) for key, or None on a miss.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self.entries[key])
+        value = self._read_disk(key) if self.disk_dir else None
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, value)
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        value = copy.deepcopy(value)
+        with self.lock:
+            self._insert(key, value)
+        if self.disk_dir:
+            self._write_disk(key, value)
+
+    def _insert(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            os.utime(path)  # mtime is the disk tier's LRU clock
+        except (OSError, ValueError):
+            return None
+        # JSON turns int dict keys into strings and tuples into lists; restore them
+        for det in data["detections"]:
+            det["pii"] = [tuple(p) for p in det.get("pii", [])]
+        links = {int(k): v for k, v in data["links"].items()}
+        dummies = {int(k): v for k, v in data["dummies"].items()}
+        return data["detections"], links, dummies
+
+    def _write_disk(self, key, value):
+        detections, links, dummies = value
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            new = not os.path.exists(path)
+            with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+                json.dump({"detections": detections, "links": links, "dummies": dummies}, f)
+            os.replace(tmp_path, path)  # Atomic, so readers never see a partial file
+        except (OSError, TypeError) as e:
+            print(f"Detection cache write failed: {e}")
+            return
+        with self.lock:
+            self.disk_count += new
+            if self.disk_count <= self.disk_max_entries:
+                return
+            self._evict_disk()
+
+    def _disk_files(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".json"):
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue  # Evicted by another process meanwhile
+        return files
+
+    def _evict_disk(self):
+        # Down to 90% of the cap, so the directory isn't rescanned on every write.
+        # Other processes may share the directory: the rescan corrects the running count.
+        files = sorted(self._disk_files())
+        excess = len(files) - int(self.disk_max_entries * 0.9)
+        for _, path in files[:max(0, excess)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.disk_count = len(files) - max(0, excess)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "disk_dir": self.disk_dir,
+                "disk_entries": self.disk_count,
+                "disk_max_entries": self.disk_max_entries
+            }
+
+# Process-wide instance used by detect_and_link_pii
+detection_cache = DetectionCache(
+    max_entries=int(os.getenv("MIRRORMASK_CACHE_SIZE", "128")),
+    disk_dir=os.getenv("MIRRORMASK_CACHE_DIR") or None,  # Holds detected text (PII); see DetectionCache
+    disk_max_entries=int(os.getenv("MIRRORMASK_CACHE_DISK_SIZE", "10000"))
+)
@@ -0,0 +1,92 @@
+import os
+import numpy as np
+
+CLASS_NAMES = ['signature', 'initials', 'phone', 'date', 'aadhar', 'photo']  # data.yaml order
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+def label_path(image_path, labels_dir=None):
+    """
+    YOLO label file of an image: in labels_dir, or the sibling labels/ of its images/ folder.
+    """
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    if labels_dir is None:
+        labels_dir = os.path.join(os.path.dirname(os.path.dirname(image_path)), "labels")
+    return os.path.join(labels_dir, stem + ".txt")
+
+def load_labels(path, width, height):
+    """
+    YOLO labels (class cx cy w h, normalized) in pixels.
+    Returns:
+        (xyxy boxes (N, 4), class ids (N,)); empty arrays when the file is missing.
+    """
+    rows = []
+    if os.path.exists(path):
+        with open(path) as f:
+            rows = [line.split() for line in f]
+    rows = np.array([[float(v) for v in row] for row in rows if len(row) == 5]).reshape(-1, 5)
+    cx, cy, w, h = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    return np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1), rows[:, 0].astype(int)
+
+def box_iou(a, b):
+    """
+    Pairwise IoU of xyxy boxes a (N, 4) and b (M, 4) -> (N, M).
+    """
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+def match(pred_boxes, pred_classes, pred_confs, gt_boxes, gt_classes, threshold=0.5):
+    """
+    Greedy one-to-one matching, highest confidence first, same class only.
+    Returns:
+        Bool array over the predictions (in their given order): True for true positives.
+    """
+    matched = np.zeros(len(pred_boxes), dtype=bool)
+    if not len(pred_boxes) or not len(gt_boxes):
+        return matched
+    ious = box_iou(np.asarray(pred_boxes, dtype=float), np.asarray(gt_boxes, dtype=float))
+    ious[np.asarray(pred_classes).astype(int)[:, None] != np.asarray(gt_classes)[None, :]] = 0
+    taken = np.zeros(len(gt_boxes), dtype=bool)
+    for i in np.argsort(-np.asarray(pred_confs), kind="stable"):
+        candidates = np.where(~taken & (ious[i] >= threshold))[0]
+        if len(candidates):
+            j = candidates[np.argmax(ious[i, candidates])]
+            taken[j] = matched[i] = True
+    return matched
+
+def average_precision(hits, confs, n_gt):
+    """
+    101-point interpolated AP (COCO/ultralytics style) from per-prediction hits.
+    """
+    if not len(hits):
+        return 0.0
+    order = np.argsort(-confs, kind="stable")
+    tp = np.cumsum(hits[order])
+    recall = tp / n_gt
+    precision = tp / np.arange(1, len(tp) + 1)
+    envelope = np.maximum.accumulate(precision[::-1])[::-1]
+    idx = np.searchsorted(recall, np.linspace(0, 1, 101), side="left")
+    return float(np.mean([envelope[i] if i < len(envelope) else 0.0 for i in idx]))
+
+def detection_map(predictions, truths):
+    """
+    mAP@0.5 and mAP@0.5:0.95 over images. predictions are per-image (boxes, classes,
+    confs), truths per-image (boxes, classes); classes without ground truth are left out.
+    """
+    classes = sorted({int(c) for _, gt_classes in truths for c in gt_classes})
+    if not classes:
+        return {"mAP_0.5": 0.0, "mAP_0.5:0.95": 0.0}
+    aps = np.zeros((len(classes), len(IOU_THRESHOLDS)))
+    for ci, cls in enumerate(classes):
+        n_gt = sum(int((gt_classes == cls).sum()) for _, gt_classes in truths)
+        for ti, threshold in enumerate(IOU_THRESHOLDS):
+            hits, confs = [], []
+            for (boxes, pred_classes, pred_confs), (gt_boxes, gt_classes) in zip(predictions, truths):
+                mask, gt_mask = pred_classes == cls, gt_classes == cls
+                hits.append(match(boxes[mask], pred_classes[mask], pred_confs[mask], gt_boxes[gt_mask], gt_classes[gt_mask], threshold))
+                confs.append(pred_confs[mask])
+            aps[ci, ti] = average_precision(np.concatenate(hits), np.concatenate(confs), n_gt)
+    return {"mAP_0.5": float(aps[:, 0].mean()), "mAP_0.5:0.95": float(aps.mean())}
@@ -0,0 +1,97 @@
+import argparse
+import glob
+import os
+import random
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import cv2
+import yaml
+from src.detection.model_registry import TRAINED_WEIGHTS, backend_weights
+from src.detection.onnx_backend import letterbox, to_input
+
+def export_onnx(weights=TRAINED_WEIGHTS, imgsz=640, opset=12):
+    """
+    Export fine-tuned YOLO weights to ONNX next to the .pt (best.pt -> best.onnx).
+    Static batch-1 shapes: what onnxruntime CPU and static quantization handle best.
+    """
+    from ultralytics import YOLO
+    path = YOLO(weights).export(format="onnx", imgsz=imgsz, opset=opset, dynamic=False, simplify=True)
+    print(f"Exported {weights} -> {path}")
+    return path
+
+def val_images(data_yaml):
+    with open(data_yaml) as f:
+        cfg = yaml.safe_load(f)
+    val_dir = os.path.join(os.path.dirname(os.path.abspath(data_yaml)), cfg["val"])
+    return sorted(glob.glob(os.path.join(val_dir, "*.png")) + glob.glob(os.path.join(val_dir, "*.jpg")))
+
+class CalibrationReader:
+    """
+    Feeds letterboxed validation images to onnxruntime's static quantizer, so
+    activation ranges come from real documents rather than random input.
+    """
+
+    def __init__(self, images, input_name, imgsz):
+        self.images = iter(images)
+        self.input_name = input_name
+        self.imgsz = imgsz
+
+    def get_next(self):
+        for path in self.images:
+            img = cv2.imread(path)
+            if img is not None:
+                return {self.input_name: to_input(letterbox(img, self.imgsz)[0])}
+        return None
+
+def quantize_int8(onnx_path, data_yaml, calib_count=200, imgsz=640, seed=0):
+    """
+    Statically quantize an exported model to INT8 (QDQ, per-channel weights),
+    calibrated on up to calib_count validation images. Writes best-int8.onnx.
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import quantize_static, QuantFormat, QuantType, CalibrationMethod
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    images = val_images(data_yaml)
+    if not images:
+        raise ValueError(f"No validation images found for calibration (data: {data_yaml})")
+    random.Random(seed).shuffle(images)
+    images = images[:calib_count]
+
+    output_path = onnx_path[:-len(".onnx")] + "-int8.onnx"
+    prepared_path = onnx_path[:-len(".onnx")] + "-prep.onnx"
+    quant_pre_process(onnx_path, prepared_path)
+    input_name = ort.InferenceSession(prepared_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    try:
+        quantize_static(prepared_path, output_path, CalibrationReader(images, input_name, imgsz),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                        calibrate_method=CalibrationMethod.MinMax)
+    finally:
+        os.remove(prepared_path)
+    _copy_metadata(onnx_path, output_path)
+    print(f"Quantized {onnx_path} -> {output_path} ({len(images)} calibration images)")
+    return output_path
+
+def _copy_metadata(source, target):
+    # quantize_static drops the ultralytics metadata (names, imgsz) the serving backend reads
+    import onnx
+    src_model, dst_model = onnx.load(source), onnx.load(target)
+    del dst_model.metadata_props[:]
+    dst_model.metadata_props.extend(src_model.metadata_props)
+    onnx.save(dst_model, target)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export fine-tuned YOLO weights to ONNX, optionally INT8-quantized.")
+    parser.add_argument("--weights", default=TRAINED_WEIGHTS)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true", help="Also write a statically quantized INT8 model")
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(__file__), "data.yaml"), help="Calibration set = its val split")
+    parser.add_argument("--calib-count", type=int, default=200)
+    args = parser.parse_args()
+
+    onnx_path = export_onnx(args.weights, args.imgsz)
+    if onnx_path != backend_weights(args.weights, "onnx"):
+        print(f"Note: serving expects {backend_weights(args.weights, 'onnx')}")
+    if args.int8:
+        quantize_int8(onnx_path, args.data, args.calib_count, args.imgsz)
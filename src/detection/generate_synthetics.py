@@ -2,170 +2,176 @@ from faker import Faker
 from PIL import Image, ImageDraw, ImageFont, ImageEnhance
 import random
 import os
+import io
+import json
+import tarfile
+import argparse
+import hashlib
+import multiprocessing
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 import img2pdf
 
 fake = Faker()
 
-def generate_document(filename, make_pdf=False):
-    # Image size (simulate A4: wider for docs)
-    width, height = 800, 1200
-    img = Image.new('RGB', (width, height), color=(255, 255, 255))
-    draw = ImageDraw.Draw(img)
-    
-    # In generate_document function
-    assets_dir = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')), 'data', 'assets')
-    signature_files = [
-        os.path.join(assets_dir, 'signature1.png'),
-        os.path.join(assets_dir, 'signature2.png'),
-        os.path.join(assets_dir, 'signature3.png')
-    ]
-    photo_files = [
-        os.path.join(assets_dir, 'photo1.png'),
-        os.path.join(assets_dir, 'photo2.png'),
-        os.path.join(assets_dir, 'photo3.png')
-    ]
-    font_path = os.path.join(assets_dir, 'IndieFlower-Regular.ttf')
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+ASSETS_DIR = os.path.join(ROOT_DIR, 'data', 'assets')
+SIGNATURE_FILES = [os.path.join(ASSETS_DIR, f'signature{i}.png') for i in (1, 2, 3)]
+PHOTO_FILES = [os.path.join(ASSETS_DIR, f'photo{i}.png') for i in (1, 2, 3)]
+FONT_PATH = os.path.join(ASSETS_DIR, 'IndieFlower-Regular.ttf')
+PNG_COMPRESS_LEVEL = 3  # Much faster than PIL's default 6 for nearly the same size on white pages
+
+@lru_cache(maxsize=None)
+def _asset(path, mode):
+    # Decoded once per process; callers get the cached image and must not modify it
+    return Image.open(path).convert(mode)
+
+@lru_cache(maxsize=512)
+def _scaled(path, size):
+    # Signature sizes come from a small set of integer sizes, so resized copies are reused
+    return _asset(path, 'RGBA').resize(size, Image.Resampling.LANCZOS)
+
+@lru_cache(maxsize=None)
+def _photo(path):
+    return _asset(path, 'RGB').resize((100, 100))
+
+@lru_cache(maxsize=None)
+def load_fonts():
+    """
+    (handwritten font, default font), loaded once per process.
+    """
     try:
-        font = ImageFont.truetype(font_path, 20)  # Handwritten font, size 20
+        font = ImageFont.truetype(FONT_PATH, 20)  # Handwritten font, size 20
     except Exception as e:
         print(f"Font error: {e}, using default font")
         font = ImageFont.load_default()
+    return font, ImageFont.load_default()
+
+def _label(cls, bbox, width, height):
+    center_x = (bbox[0] + bbox[2]) / 2 / width
+    center_y = (bbox[1] + bbox[3]) / 2 / height
+    w_norm = (bbox[2] - bbox[0]) / width
+    h_norm = (bbox[3] - bbox[1]) / height
+    return f"{cls} {center_x} {center_y} {w_norm} {h_norm}"
+
+def render_document(rng=random, faker=None):
+    """
+    Draw one synthetic document.
+    Args:
+        rng: random.Random (or the random module) for layout; seeded per document for reproducible corpora.
+        faker: Faker instance for the PII values (defaults to the module-level one).
+    Returns:
+        (YOLO label lines, PIL RGB image)
+    """
+    faker = faker or fake
+    # Image size (simulate A4: wider for docs)
+    width, height = 800, 1200
+    img = Image.new('RGB', (width, height), color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    font, default_font = load_fonts()
 
     # List to collect ground truth bboxes (for YOLO .txt)
     labels = []
 
     # Add fake name
-    name = fake.name()
-    name_x = random.randint(50, 150)
-    name_y = random.randint(50, 150)
+    name = faker.name()
+    name_x = rng.randint(50, 150)
+    name_y = rng.randint(50, 150)
     name_text = f"Name: {name}"
-    draw.text((name_x, name_y), name_text, fill=(0, 0, 0), font=ImageFont.load_default())
+    draw.text((name_x, name_y), name_text, fill=(0, 0, 0), font=default_font)
 
     # Add handwritten initials
     initials = ''.join([n[0] for n in name.split() if n])
-    initials_x = random.randint(50, 150)
-    initials_y = name_y + random.randint(40, 60)
+    initials_x = rng.randint(50, 150)
+    initials_y = name_y + rng.randint(40, 60)
     draw.text((initials_x, initials_y), f"Initials: {initials}", fill=(0, 0, 0), font=font)
-    text_bbox = draw.textbbox((initials_x, initials_y), f"Initials: {initials}", font=font)
-    bbox = [text_bbox[0], text_bbox[1], text_bbox[2], text_bbox[3]]
-    center_x = (bbox[0] + bbox[2]) / 2 / width
-    center_y = (bbox[1] + bbox[3]) / 2 / height
-    w_norm = (bbox[2] - bbox[0]) / width
-    h_norm = (bbox[3] - bbox[1]) / height
-    labels.append(f"1 {center_x} {center_y} {w_norm} {h_norm}")  # Class 1: initials
+    bbox = draw.textbbox((initials_x, initials_y), f"Initials: {initials}", font=font)
+    labels.append(_label(1, bbox, width, height))  # Class 1: initials
 
     # Add fake address
-    address = fake.address().replace('\n', ', ')
-    address_x = random.randint(50, 150)
-    address_y = initials_y + random.randint(40, 60)
-    draw.text((address_x, address_y), f"Address: {address}", fill=(0, 0, 0), font=ImageFont.load_default())
+    address = faker.address().replace('\n', ', ')
+    address_x = rng.randint(50, 150)
+    address_y = initials_y + rng.randint(40, 60)
+    draw.text((address_x, address_y), f"Address: {address}", fill=(0, 0, 0), font=default_font)
 
     # Add fake Aadhaar
-    aadhaar = fake.numerify('#### #### ####')
-    aadhaar_x = random.randint(50, 150)
-    aadhaar_y = address_y + random.randint(40, 60)
-    draw.text((aadhaar_x, aadhaar_y), f"Aadhaar: {aadhaar}", fill=(0, 0, 0), font=ImageFont.load_default())
-    # Label Aadhaar (class 4)
-    text_bbox = draw.textbbox((aadhaar_x, aadhaar_y), f"Aadhaar: {aadhaar}", font=ImageFont.load_default())
-    bbox = [text_bbox[0], text_bbox[1], text_bbox[2], text_bbox[3]]
-    center_x = (bbox[0] + bbox[2]) / 2 / width
-    center_y = (bbox[1] + bbox[3]) / 2 / height
-    w_norm = (bbox[2] - bbox[0]) / width
-    h_norm = (bbox[3] - bbox[1]) / height
-    labels.append(f"4 {center_x} {center_y} {w_norm} {h_norm}")  # Class 4: aadhar
+    aadhaar = faker.numerify('#### #### ####')
+    aadhaar_x = rng.randint(50, 150)
+    aadhaar_y = address_y + rng.randint(40, 60)
+    draw.text((aadhaar_x, aadhaar_y), f"Aadhaar: {aadhaar}", fill=(0, 0, 0), font=default_font)
+    bbox = draw.textbbox((aadhaar_x, aadhaar_y), f"Aadhaar: {aadhaar}", font=default_font)
+    labels.append(_label(4, bbox, width, height))  # Class 4: aadhar
 
     # Add fake phone
-    phone = fake.numerify('##########')  # 10-digit phone
-    phone_x = random.randint(50, 150)
-    phone_y = aadhaar_y + random.randint(40, 60)
-    draw.text((phone_x, phone_y), f"Phone: {phone}", fill=(0, 0, 0), font=ImageFont.load_default())
-    # Label phone (class 2)
-    text_bbox = draw.textbbox((phone_x, phone_y), f"Phone: {phone}", font=ImageFont.load_default())
-    bbox = [text_bbox[0], text_bbox[1], text_bbox[2], text_bbox[3]]
-    center_x = (bbox[0] + bbox[2]) / 2 / width
-    center_y = (bbox[1] + bbox[3]) / 2 / height
-    w_norm = (bbox[2] - bbox[0]) / width
-    h_norm = (bbox[3] - bbox[1]) / height
-    labels.append(f"2 {center_x} {center_y} {w_norm} {h_norm}")  # Class 2: phone
+    phone = faker.numerify('##########')  # 10-digit phone
+    phone_x = rng.randint(50, 150)
+    phone_y = aadhaar_y + rng.randint(40, 60)
+    draw.text((phone_x, phone_y), f"Phone: {phone}", fill=(0, 0, 0), font=default_font)
+    bbox = draw.textbbox((phone_x, phone_y), f"Phone: {phone}", font=default_font)
+    labels.append(_label(2, bbox, width, height))  # Class 2: phone
 
     # Add handwritten date
-    date = fake.date(pattern='%d-%m-%Y')
-    date_x = random.randint(50, 150)
-    date_y = phone_y + random.randint(40, 60)
+    date = faker.date(pattern='%d-%m-%Y')
+    date_x = rng.randint(50, 150)
+    date_y = phone_y + rng.randint(40, 60)
     draw.text((date_x, date_y), f"Date: {date}", fill=(0, 0, 0), font=font)
-    text_bbox = draw.textbbox((date_x, date_y), f"Date: {date}", font=font)
-    bbox = [text_bbox[0], text_bbox[1], text_bbox[2], text_bbox[3]]
-    center_x = (bbox[0] + bbox[2]) / 2 / width
-    center_y = (bbox[1] + bbox[3]) / 2 / height
-    w_norm = (bbox[2] - bbox[0]) / width
-    h_norm = (bbox[3] - bbox[1]) / height
-    labels.append(f"3 {center_x} {center_y} {w_norm} {h_norm}")  # Class 3: date
+    bbox = draw.textbbox((date_x, date_y), f"Date: {date}", font=font)
+    labels.append(_label(3, bbox, width, height))  # Class 3: date
 
     # Add 1-2 signatures with random positions and overlap chance
-    num_sigs = random.randint(1, 2)
-    overlap_chance = random.random() < 0.6
+    num_sigs = rng.randint(1, 2)
+    overlap_chance = rng.random() < 0.6
     for i in range(num_sigs):
-        sig_file = random.choice(signature_files)
+        sig_file = rng.choice(SIGNATURE_FILES)
         try:
-            sig_img = Image.open(sig_file).convert('RGBA')
-            scale = random.uniform(0.8, 1.2)
+            scale = rng.uniform(0.8, 1.2)
             sig_size = (int(200 * scale), int(50 * scale))
-            sig_img = sig_img.resize(sig_size, Image.Resampling.LANCZOS)
-            sig_x = random.randint(100, 300)
+            sig_img = _scaled(sig_file, sig_size)
+            sig_x = rng.randint(100, 300)
             if i == 0 and overlap_chance:
-                sig_y = random.randint(90, 110)
+                sig_y = rng.randint(90, 110)
             else:
-                sig_y = random.randint(250, 350)
+                sig_y = rng.randint(250, 350)
             img.paste(sig_img, (sig_x, sig_y), sig_img)
             bbox = [sig_x, sig_y, sig_x + sig_size[0], sig_y + sig_size[1]]
-            center_x = (bbox[0] + bbox[2]) / 2 / width
-            center_y = (bbox[1] + bbox[3]) / 2 / height
-            w_norm = (bbox[2] - bbox[0]) / width
-            h_norm = (bbox[3] - bbox[1]) / height
-            labels.append(f"0 {center_x} {center_y} {w_norm} {h_norm}")  # Class 0: signature
+            labels.append(_label(0, bbox, width, height))  # Class 0: signature
         except Exception as e:
             print(f"Signature error: {sig_file} - {e}")
             continue
 
     # Add isolated bottom-right signature (75% chance)
-    if random.random() < 0.75:
-        iso_sig_file = random.choice(signature_files)
+    if rng.random() < 0.75:
+        iso_sig_file = rng.choice(SIGNATURE_FILES)
         try:
-            iso_sig = Image.open(iso_sig_file).convert('RGBA')
-            angle = random.uniform(-15, 15)
-            scale = random.uniform(0.8, 1.2)
+            angle = rng.uniform(-15, 15)
+            scale = rng.uniform(0.8, 1.2)
             iso_size = (int(150 * scale), int(40 * scale))
-            iso_sig = iso_sig.resize(iso_size, Image.Resampling.LANCZOS).rotate(angle, expand=True)
+            iso_sig = _scaled(iso_sig_file, iso_size).rotate(angle, expand=True)
             iso_x, iso_y = 600, 1000
             img.paste(iso_sig, (iso_x, iso_y), iso_sig)
             bbox = [iso_x, iso_y, iso_x + iso_size[0], iso_y + iso_size[1]]
-            center_x = (bbox[0] + bbox[2]) / 2 / width
-            center_y = (bbox[1] + bbox[3]) / 2 / height
-            w_norm = (bbox[2] - bbox[0]) / width
-            h_norm = (bbox[3] - bbox[1]) / height
-            labels.append(f"0 {center_x} {center_y} {w_norm} {h_norm}")
+            labels.append(_label(0, bbox, width, height))
         except Exception as e:
             print(f"Isolated signature error: {iso_sig_file} - {e}")
 
     # Add photo (for later face detection)
-    photo_file = random.choice(photo_files)
-    photo_x = random.randint(100, 200)
-    photo_y = random.randint(400, 450)
+    photo_file = rng.choice(PHOTO_FILES)
+    photo_x = rng.randint(100, 200)
+    photo_y = rng.randint(400, 450)
     try:
-        photo_img = Image.open(photo_file).convert('RGB').resize((100, 100))
-        img.paste(photo_img, (photo_x, photo_y))
-        draw.text((photo_x, photo_y + 110), "Photo", fill=(0, 0, 0), font=ImageFont.load_default())
+        img.paste(_photo(photo_file), (photo_x, photo_y))
+        draw.text((photo_x, photo_y + 110), "Photo", fill=(0, 0, 0), font=default_font)
     except Exception as e:
         print(f"Photo error: {photo_file} - {e}")
         draw.rectangle([(photo_x, photo_y), (photo_x + 100, photo_y + 100)], outline=(255, 0, 0), width=2)
-        draw.text((photo_x, photo_y + 110), "Photo", fill=(0, 0, 0), font=ImageFont.load_default())
+        draw.text((photo_x, photo_y + 110), "Photo", fill=(0, 0, 0), font=default_font)
     # Label photo (class 5)
-    photo_bbox = [photo_x, photo_y, photo_x + 100, photo_y + 100]
-    center_x = (photo_bbox[0] + photo_bbox[2]) / 2 / width
-    center_y = (photo_bbox[1] + photo_bbox[3]) / 2 / height
-    w_norm = (photo_bbox[2] - photo_bbox[0]) / width
-    h_norm = (photo_bbox[3] - photo_bbox[1]) / height
-    labels.append(f"5 {center_x} {center_y} {w_norm} {h_norm}")  # Class 5: photo
+    labels.append(_label(5, [photo_x, photo_y, photo_x + 100, photo_y + 100], width, height))  # Class 5: photo
+
+    return labels, img
+
+def generate_document(filename, make_pdf=False):
+    labels, img = render_document()
 
     # Save PNG
     os.makedirs(os.path.dirname(filename), exist_ok=True)
@@ -174,24 +180,101 @@ def generate_document(filename, make_pdf=False):
 
     return labels, img
 
+def document_seed(seed, index):
+    # Depends only on (seed, index): the corpus is identical whatever the worker count
+    return int.from_bytes(hashlib.blake2b(f"{seed}:{index}".encode(), digest_size=8).digest(), "big")
+
+def encode_sample(index, seed, pdf_every):
+    """
+    Render document `index` deterministically and encode it.
+    Returns:
+        Dict of file extension -> bytes (png, txt and, every pdf_every documents, pdf).
+    """
+    doc_seed = document_seed(seed, index)
+    faker = _worker_faker()
+    faker.seed_instance(doc_seed)
+    labels, img = render_document(random.Random(doc_seed), faker)
+    buf = io.BytesIO()
+    img.save(buf, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+    files = {"png": buf.getvalue(), "txt": "\n".join(labels).encode()}
+    if pdf_every and index % pdf_every == 0:
+        files["pdf"] = img2pdf.convert(files["png"], nodate=True)  # No timestamp: same seed, same bytes
+    return files
+
+@lru_cache(maxsize=None)
+def _worker_faker():
+    return Faker()
+
+def write_shard(out_dir, shard, start, count, seed, pdf_every, prefix="synth"):
+    """
+    Write documents [start, start + count) into one WebDataset-style tar shard:
+    <key>.png, <key>.txt (YOLO labels) and optionally <key>.pdf per sample.
+    """
+    path = os.path.join(out_dir, f"{prefix}-{shard:06d}.tar")
+    tmp_path = path + ".tmp"
+    with tarfile.open(tmp_path, "w") as tar:
+        for index in range(start, start + count):
+            key = f"{prefix}_{index:08d}"
+            for ext, data in encode_sample(index, seed, pdf_every).items():
+                info = tarfile.TarInfo(f"{key}.{ext}")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    os.replace(tmp_path, path)  # A killed run never leaves a half-written shard behind
+    return path, count
+
+def write_yolo_files(out_dir, shard, start, count, seed, pdf_every, prefix="sample"):
+    """
+    Write documents [start, start + count) as images/<key>.png + labels/<key>.txt
+    (the layout the YOLO training and split scripts read); PDFs go next to the images.
+    """
+    images_dir, labels_dir = os.path.join(out_dir, 'images'), os.path.join(out_dir, 'labels')
+    for index in range(start, start + count):
+        key = f"{prefix}_{index + 1}"
+        files = encode_sample(index, seed, pdf_every)
+        with open(os.path.join(images_dir, f"{key}.png"), 'wb') as f:
+            f.write(files["png"])
+        with open(os.path.join(labels_dir, f"{key}.txt"), 'wb') as f:
+            f.write(files["txt"])
+        if "pdf" in files:
+            with open(os.path.join(images_dir, f"{key}.pdf"), 'wb') as f:
+                f.write(files["pdf"])
+    return out_dir, count
+
+def generate_corpus(out_dir, count, workers=None, seed=0, shard_size=1000, output_format="shards", pdf_every=4):
+    """
+    Generate `count` documents on a process pool. Each task renders one shard's worth
+    of documents; assets and fonts are decoded once per worker process. Shards hold
+    count / workers documents, capped at shard_size, so small runs still use every worker.
+    """
+    workers = workers or os.cpu_count() or 1
+    shard_size = max(1, min(shard_size, -(-count // workers)))
+    os.makedirs(out_dir, exist_ok=True)
+    if output_format == "yolo":
+        os.makedirs(os.path.join(out_dir, 'images'), exist_ok=True)
+        os.makedirs(os.path.join(out_dir, 'labels'), exist_ok=True)
+    writer = write_shard if output_format == "shards" else write_yolo_files
+    tasks = [(shard, start, min(shard_size, count - start)) for shard, start in enumerate(range(0, count, shard_size))]
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(writer, out_dir, shard, start, n, seed, pdf_every) for shard, start, n in tasks]
+        for future in futures:
+            path, n = future.result()
+            done += n
+            print(f"{done}/{count} documents ({path})")
+    with open(os.path.join(out_dir, "corpus.json"), "w") as f:
+        json.dump({"count": count, "seed": seed, "shard_size": shard_size, "format": output_format,
+                   "pdf_every": pdf_every, "shards": len(tasks)}, f, indent=4)
+    return len(tasks)
+
 if __name__ == "__main__":
-    root_dir = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')), 'data')
-    images_dir = os.path.join(root_dir, 'test_samples', 'images')
-    labels_dir = os.path.join(root_dir, 'test_samples', 'labels')
-    os.makedirs(images_dir, exist_ok=True)
-    os.makedirs(labels_dir, exist_ok=True)
-    for i in range(50):  # Generate 50 samples
-        filename = os.path.join(images_dir, f'sample_{i+1}.png')
-        make_pdf = (i % 4 == 0)  # PDF every 4th sample
-        labels, generated_img = generate_document(filename, make_pdf)
-        label_filename = os.path.join(labels_dir, f'sample_{i+1}.txt')
-        with open(label_filename, 'w') as f:
-            f.write('\n'.join(labels))
-        print(f"Generated labels: {label_filename}")
-        if make_pdf:
-            pdf_filename = filename.replace('.png', '.pdf')
-            # FIXED AGAIN: Save temp PNG and use path for img2pdf
-            temp_png = filename  # Already saved by generate_document
-            with open(pdf_filename, 'wb') as f:
-                f.write(img2pdf.convert(temp_png))  # Use file path
-            print(f"Generated PDF: {pdf_filename}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate a synthetic PII document corpus.")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--out", default=os.path.join(ROOT_DIR, 'data', 'test_samples'))
+    parser.add_argument("--format", choices=["yolo", "shards"], default="yolo",
+                        help="yolo: images/ + labels/ files; shards: tar shards of png/txt/pdf samples")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=1000, help="Max documents per shard / per worker task")
+    parser.add_argument("--pdf-every", type=int, default=4, help="Also emit a PDF every N documents (0 = never)")
+    args = parser.parse_args()
+    generate_corpus(args.out, args.count, args.workers, args.seed, args.shard_size, args.format, args.pdf_every)
@@ -0,0 +1,47 @@
+import numpy as np
+
+VISUAL_TYPES = ['signature', 'initials', 'photo']
+TEXT_TYPES = ['text', 'name', 'phone', 'aadhaar', 'date']
+
+def centers(detections):
+    """
+    (n, 2) array of bbox centres for a list of detections.
+    """
+    if not detections:
+        return np.empty((0, 2), dtype=np.float64)
+    boxes = np.asarray([det['abs_bbox'] for det in detections], dtype=np.float64)
+    return np.column_stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2))
+
+def link_detections(detections, max_dist=200, max_dy=50):
+    """
+    Link visual PII (signature, initials, photo) to nearby text PII.
+    A pair is linked when the centre distance is below max_dist or the centres are
+    vertically aligned (|dy| below max_dy). All visual x text pairs are evaluated at
+    once with NumPy broadcasting.
+    Args:
+        detections: List of detections with 'type' and 'abs_bbox'.
+        max_dist: Centre distance threshold in pixels.
+        max_dy: Vertical alignment threshold in pixels.
+    Returns:
+        Dict mapping detection index to list of linked indices (both directions),
+        in the same order the pairwise loop produced.
+    """
+    visual_idx = np.array([i for i, det in enumerate(detections) if det['type'] in VISUAL_TYPES], dtype=np.intp)
+    text_idx = np.array([i for i, det in enumerate(detections) if det['type'] in TEXT_TYPES], dtype=np.intp)
+    links = {}
+    if len(visual_idx) == 0 or len(text_idx) == 0:
+        return links
+
+    all_centers = centers(detections)
+    vc = all_centers[visual_idx]
+    tc = all_centers[text_idx]
+    dx = vc[:, None, 0] - tc[None, :, 0]
+    dy = vc[:, None, 1] - tc[None, :, 1]
+    linked = (dx * dx + dy * dy < max_dist * max_dist) | (np.abs(dy) < max_dy)
+
+    # Row-major nonzero keeps the (visual, text) order of the old nested loop
+    rows, cols = np.nonzero(linked)
+    for i, j in zip(visual_idx[rows].tolist(), text_idx[cols].tolist()):
+        links.setdefault(i, []).append(j)
+        links.setdefault(j, []).append(i)
+    return links
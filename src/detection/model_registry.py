@@ -0,0 +1,110 @@
+import os
+import threading
+
+TRAINED_WEIGHTS = "runs/detect/signverod_finetune4/weights/best.pt"
+FALLBACK_MODEL_PATH = "yolov8n.pt"
+
+# Inference backends and the file each one loads, derived from the trained .pt
+# (see export_onnx.py): torch = ultralytics/PyTorch, onnx = onnxruntime FP32,
+# onnx-int8 = onnxruntime with the statically quantized model
+BACKENDS = {"torch": ".pt", "onnx": ".onnx", "onnx-int8": "-int8.onnx"}
+DEFAULT_BACKEND = os.getenv("MIRRORMASK_BACKEND", "torch")
+
+# One YOLO instance per requested weights path, shared by the whole process
+_models = {}
+_model_info = {}
+_lock = threading.Lock()
+
+def backend_weights(model_path, backend):
+    """
+    Weights file serving model_path on the given backend, e.g. best.pt -> best-int8.onnx.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; use one of {list(BACKENDS)}")
+    stem = model_path[:-len(".pt")] if model_path.endswith(".pt") else os.path.splitext(model_path)[0]
+    return stem + BACKENDS[backend]
+
+def backend_of(model_path):
+    if model_path.endswith(BACKENDS["onnx-int8"]):
+        return "onnx-int8"
+    return "onnx" if model_path.endswith(".onnx") else "torch"
+
+# Default weights for the configured backend; the .pt stays the source of truth
+DEFAULT_MODEL_PATH = backend_weights(TRAINED_WEIGHTS, DEFAULT_BACKEND)
+
+def _load(model_path):
+    if model_path.endswith(".onnx"):
+        from src.detection.onnx_backend import OnnxModel  # onnxruntime only; no torch import
+        try:
+            return OnnxModel(model_path), model_path
+        except Exception as e:
+            torch_weights = model_path[:-len(BACKENDS[backend_of(model_path)])] + BACKENDS["torch"]
+            print(f"WARNING: failed to load ONNX model {model_path} ({e}). Falling back to {torch_weights}.")
+            return _load(torch_weights)
+    from ultralytics import YOLO  # Heavy (torch); imported on first model load, not at import time
+    try:
+        return YOLO(model_path), model_path
+    except Exception as e:
+        print(f"WARNING: failed to load weights {model_path} ({e}). Falling back to {FALLBACK_MODEL_PATH}.")
+        return YOLO(FALLBACK_MODEL_PATH), FALLBACK_MODEL_PATH
+
+def weights_version(weights):
+    # Path plus size/mtime, so retrained weights at the same path get a new version
+    try:
+        st = os.stat(weights)
+        return f"{weights}:{st.st_size}:{int(st.st_mtime)}"
+    except OSError:
+        return weights
+
+def warm_up(model, imgsz=640):
+    """
+    Run one inference on a blank page so the first real request doesn't pay for
+    lazy layer fusing and allocator setup inside ultralytics.
+    """
+    import numpy as np
+    blank = np.full((imgsz, imgsz, 3), 255, dtype=np.uint8)
+    model.predict(blank, conf=0.25, iou=0.45, verbose=False)
+
+def get_model(model_path=DEFAULT_MODEL_PATH, warmup=False):
+    """
+    Return the shared YOLO model for model_path, loading it on first use.
+    Args:
+        model_path: Requested weights file.
+        warmup: Run a warm-up inference if this model hasn't had one yet.
+    Returns:
+        The loaded YOLO model (possibly the fallback; see model_info).
+    """
+    with _lock:
+        if model_path not in _models:
+            model, weights = _load(model_path)
+            _models[model_path] = model
+            _model_info[model_path] = {
+                "requested": model_path,
+                "weights": weights,
+                "fallback": weights != model_path,
+                "backend": backend_of(weights),
+                "version": weights_version(weights),
+                "warmed_up": False
+            }
+        model = _models[model_path]
+        if warmup and not _model_info[model_path]["warmed_up"]:
+            warm_up(model)
+            _model_info[model_path]["warmed_up"] = True
+    return model
+
+def preload(model_paths=(DEFAULT_MODEL_PATH,)):
+    """
+    Load and warm up every model in model_paths. Call once at process startup.
+    Returns:
+        Dict of model_info for the preloaded models.
+    """
+    for model_path in model_paths:
+        get_model(model_path, warmup=True)
+    return {p: model_info(p) for p in model_paths}
+
+def model_info(model_path=DEFAULT_MODEL_PATH):
+    """
+    Report which weights actually back model_path, or None if it isn't loaded.
+    """
+    info = _model_info.get(model_path)
+    return dict(info) if info else None
@@ -0,0 +1,97 @@
+import ast
+import os
+import cv2
+import numpy as np
+from src.detection.tiling import merge_boxes
+
+LETTERBOX_COLOR = (114, 114, 114)  # Same padding ultralytics uses in training/export
+
+def letterbox(img, size):
+    """
+    Resize keeping aspect ratio and pad to size x size.
+    Returns:
+        (padded BGR image, scale ratio, (pad_x, pad_y))
+    """
+    height, width = img.shape[:2]
+    ratio = min(size / height, size / width)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR) if (new_w, new_h) != (width, height) else img
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    padded = cv2.copyMakeBorder(resized, pad_y, size - new_h - pad_y, pad_x, size - new_w - pad_x,
+                                cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return padded, ratio, (pad_x, pad_y)
+
+def to_input(padded):
+    # BGR HWC uint8 -> RGB NCHW float32 in [0, 1]
+    return np.ascontiguousarray(padded[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+class OnnxBoxes:
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = xyxy
+        self.cls = cls
+        self.conf = conf
+
+class OnnxResult:
+    # Just the parts of an ultralytics Results object that tiling.predict_boxes reads
+    def __init__(self, boxes, names):
+        self.boxes = boxes
+        self.names = names
+
+class OnnxModel:
+    """
+    YOLOv8 detector exported to ONNX (FP32 or INT8), served with onnxruntime on CPU.
+    Has the same predict() call as an ultralytics model but needs neither torch nor
+    ultralytics at runtime. Class names and input size come from the export metadata.
+    """
+
+    def __init__(self, path, threads=None):
+        import onnxruntime as ort  # Optional dependency, only needed for the onnx backends
+        options = ort.SessionOptions()
+        threads = threads or int(os.getenv("MIRRORMASK_ONNX_THREADS", "0"))
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        imgsz = ast.literal_eval(meta["imgsz"]) if "imgsz" in meta else [640, 640]
+        self.imgsz = int(imgsz[0])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None  # None = dynamic
+
+    def _decode(self, output, ratio, pad, shape, conf, iou):
+        # YOLOv8 head: (4 + classes, anchors) with cx, cy, w, h in letterboxed pixels
+        preds = output.T
+        scores = preds[:, 4:]
+        classes = scores.argmax(axis=1)
+        confs = scores[np.arange(len(scores)), classes]
+        keep = confs >= conf
+        preds, classes, confs = preds[keep], classes[keep], confs[keep]
+        cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        boxes = (boxes - np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)) / ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+        # Plain class-wise NMS (containment=1.0 disables the tile-seam rule)
+        order, _ = merge_boxes(boxes, classes, confs, iou=iou, containment=1.0)
+        return OnnxBoxes(boxes[order], classes[order].astype(np.float32), confs[order])
+
+    def predict(self, source, conf=0.25, iou=0.45, verbose=False):
+        """
+        Args:
+            source: BGR ndarray or list of them.
+        Returns:
+            List of OnnxResult, one per image.
+        """
+        images = source if isinstance(source, list) else [source]
+        prepared = [letterbox(img, self.imgsz) for img in images]
+        batch = np.concatenate([to_input(padded) for padded, _, _ in prepared])
+        step = self.batch or len(images)
+        if len(batch) % step:
+            # Static batch: pad the last chunk with blank frames, their outputs are dropped below
+            filler = np.zeros((step - len(batch) % step,) + batch.shape[1:], dtype=batch.dtype)
+            batch = np.concatenate([batch, filler])
+        outputs = np.concatenate([self.session.run(None, {self.input_name: batch[i:i + step]})[0]
+                                  for i in range(0, len(batch), step)])[:len(images)]
+        return [OnnxResult(self._decode(output, ratio, pad, img.shape, conf, iou), self.names)
+                for output, img, (_, ratio, pad) in zip(outputs, images, prepared)]
@@ -0,0 +1,99 @@
+import pytesseract
+from PIL import Image
+from pytesseract import Output
+
+MIN_WORD_CONF = 30  # Words below this tesseract confidence count as unreadable
+
+class PageOCR:
+    """
+    Word boxes from one full-page tesseract pass, bucketed into a uniform grid so
+    any region (e.g. a YOLO box) can pull its words without another OCR call.
+    """
+
+    def __init__(self, ocr_data, cell_size=64):
+        self.cell_size = cell_size
+        self.words = []
+        self.grid = {}
+        for i in range(len(ocr_data['text'])):
+            text = ocr_data['text'][i].strip()
+            if not text:
+                continue
+            x1, y1 = ocr_data['left'][i], ocr_data['top'][i]
+            word = {
+                "text": text,
+                "abs_bbox": [x1, y1, x1 + ocr_data['width'][i], y1 + ocr_data['height'][i]],
+                "conf": float(ocr_data['conf'][i]),
+                "line_key": (ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i]),
+                "word_num": ocr_data['word_num'][i]
+            }
+            idx = len(self.words)
+            self.words.append(word)
+            for cell in self._cells(word['abs_bbox']):
+                self.grid.setdefault(cell, []).append(idx)
+
+    def _cells(self, box):
+        x1, y1, x2, y2 = box
+        c = self.cell_size
+        for cy in range(int(y1) // c, int(y2) // c + 1):
+            for cx in range(int(x1) // c, int(x2) // c + 1):
+                yield (cx, cy)
+
+    def words_in_box(self, box, min_overlap=0.5):
+        """
+        Words whose area lies at least min_overlap inside box, in reading order.
+        """
+        x1, y1, x2, y2 = box
+        candidates = set()
+        for cell in self._cells(box):
+            candidates.update(self.grid.get(cell, ()))
+        found = []
+        for idx in candidates:
+            wx1, wy1, wx2, wy2 = self.words[idx]['abs_bbox']
+            iw = min(x2, wx2) - max(x1, wx1)
+            ih = min(y2, wy2) - max(y1, wy1)
+            area = max(1, (wx2 - wx1) * (wy2 - wy1))
+            if iw > 0 and ih > 0 and iw * ih / area >= min_overlap:
+                found.append(idx)
+        found.sort(key=lambda i: (self.words[i]['line_key'], self.words[i]['word_num']))
+        return [self.words[i] for i in found]
+
+    def text_in_box(self, box):
+        """
+        Text inside box with one line per OCR line (like image_to_string), plus a flag
+        telling whether the page pass could read anything there.
+        """
+        lines = {}
+        readable = False
+        for word in self.words_in_box(box):
+            lines.setdefault(word['line_key'], []).append(word['text'])
+            readable = readable or word['conf'] >= MIN_WORD_CONF
+        return "\n".join(" ".join(ws) for ws in lines.values()), readable
+
+    def lines(self):
+        """
+        Words regrouped into OCR lines, in reading order. Each line has its joined
+        text, its words and each word's (start, end) character offsets in that text.
+        """
+        grouped = {}
+        for word in sorted(self.words, key=lambda w: (w['line_key'], w['word_num'])):
+            grouped.setdefault(word['line_key'], []).append(word)
+        lines = []
+        for words in grouped.values():
+            offsets = []
+            pos = 0
+            for word in words:
+                offsets.append((pos, pos + len(word['text'])))
+                pos += len(word['text']) + 1
+            lines.append({
+                "text": " ".join(w['text'] for w in words),
+                "words": words,
+                "offsets": offsets
+            })
+        return lines
+
+def run_page_ocr(preprocessed_img):
+    """
+    Run the single page-level tesseract pass on a preprocessed (binarized) page.
+    """
+    ocr_data = pytesseract.image_to_data(Image.fromarray(preprocessed_img), output_type=Output.DICT)
+    return PageOCR(ocr_data)
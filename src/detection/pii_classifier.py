@@ -0,0 +1,63 @@
+import re
+from src.resources import get_nlp
+from src.detection.recognizers import scan, PAN_STRICT_RE as PAN_RE
+
+ENTITY_TYPES = {"PERSON": "NAME", "GPE": "ADDRESS", "DATE": "DATE"}
+
+# Structured PII fast path: these never go through spaCy (see recognizers.py)
+HAS_ALPHA_RE = re.compile(r"[^\W\d_]")
+
+def is_aadhaar(text):
+    # Whole string is one Aadhaar number, under the same acceptance rule as scan()
+    text = text.strip()
+    return any(pii_type == "AADHAAR" and start == 0 and end == len(text) for _, pii_type, start, end in scan(text))
+
+def structured_pii(text):
+    """
+    Regex-only PII checks (Aadhaar, PAN, phone, dates, pincode) anywhere in text.
+    Returns (matched text, type, start_char, end_char) tuples.
+    """
+    return scan(text)
+
+def needs_ner(text):
+    # Strings without letters (numbers, dates, IDs) or full PAN matches can't hold
+    # PERSON/GPE entities, so spaCy is skipped for them
+    return bool(HAS_ALPHA_RE.search(text)) and not PAN_RE.match(text.strip())
+
+def classify_batch(texts, with_spans=False, batch_size=256):
+    """
+    Classify many candidate strings (words, lines, region texts) at once.
+    Each distinct string is checked once; strings needing NER go through a single
+    nlp.pipe call, the rest are handled by the regex fast path only.
+    Args:
+        texts: List of candidate strings.
+        with_spans: Also return start/end character offsets of each hit.
+        batch_size: spaCy batch size.
+    Returns:
+        List of PII lists aligned with texts: [(text, type), ...], or
+        [(text, type, start_char, end_char), ...] with with_spans. spaCy entities
+        come first, as in detect_pii.
+    """
+    unique = {}
+    for text in texts:
+        if text not in unique:
+            unique[text] = structured_pii(text)
+    ner_texts = [t for t in unique if needs_ner(t)]
+    if not ner_texts:
+        return _format(texts, unique, with_spans)  # Nothing needs NER: spaCy is never loaded
+    for text, doc in zip(ner_texts, get_nlp().pipe(ner_texts, batch_size=batch_size)):
+        ents = [(ent.text, ENTITY_TYPES[ent.label_], ent.start_char, ent.end_char)
+                for ent in doc.ents if ent.label_ in ENTITY_TYPES]
+        unique[text] = ents + unique[text]
+    return _format(texts, unique, with_spans)
+
+def _format(texts, unique, with_spans):
+    if with_spans:
+        return [list(unique[text]) for text in texts]
+    return [[(hit[0], hit[1]) for hit in unique[text]] for text in texts]
+
+def detect_pii(text):
+    """
+    Single-string convenience wrapper around classify_batch.
+    """
+    return classify_batch([text])[0]
@@ -1,130 +1,137 @@
-import cv2
-import numpy as np
 import pytesseract
-from PIL import Image, ImageDraw, ImageFont
-import spacy
-from ultralytics import YOLO
-import os
-from pytesseract import Output
-from faker import Faker
-from scipy.spatial.distance import euclidean
+from PIL import Image
+from src.detection.model_registry import get_model, model_info, backend_weights, DEFAULT_MODEL_PATH
+from src.detection.cache import detection_cache
+from src.image_io import load_image
+from src.pseudonym import generate_dummy, default_pseudonymizer
+from src.detection.page_ocr import run_page_ocr
+from src.detection.preprocess import preprocess_page, DEFAULT_PRESET, DEFAULT_DENOISE_SCALE
+from src.detection.linker import link_detections
+from src.detection.recognizers import AADHAAR_CHECK
+from src.detection.tiling import predict_boxes
+from src.telemetry import span, count
+from src.detection.pii_classifier import classify_batch, detect_pii  # detect_pii re-exported for callers
+from src.detection.recognizers import line_spans
 
-fake = Faker()
-nlp = spacy.load("en_core_web_sm")  # Use sm for speed in prototype
+NON_TEXT_CLASSES = ['photo']  # YOLO classes with no text worth re-OCRing
+DETECTION_CONFIG_VERSION = "4"  # Bump when detection settings change, invalidates cached results
 
-def is_aadhaar(text):
-    text = text.replace(" ", "")
-    return text.isdigit() and len(text) == 12
-
-def detect_pii(text):
-    doc = nlp(text)
-    pii = []
-    for ent in doc.ents:
-        if ent.label_ in ["PERSON", "GPE"]:
-            pii.append((ent.text, "NAME" if ent.label_ == "PERSON" else "ADDRESS"))
-        elif ent.label_ == "DATE":
-            pii.append((ent.text, "DATE"))
-    # Phone custom
-    digits = ''.join(c for c in text if c.isdigit())
-    if len(digits) == 10:
-        pii.append((text, "PHONE"))
-    # Aadhaar
-    if is_aadhaar(text):
-        pii.append((text, "AADHAAR"))
-    return pii
-
-def generate_dummy(pii_type):
-    if pii_type == "NAME":
-        return fake.name()
-    elif pii_type == "ADDRESS":
-        return fake.address().replace('\n', ', ')
-    elif pii_type == "PHONE":
-        return fake.numerify('##########')
-    elif pii_type == "DATE":
-        return fake.date(pattern='%d-%m-%Y')
-    elif pii_type == "AADHAAR":
-        return fake.numerify('#### #### ####')
-    return "[Redacted]"
-
-def preprocess_region(region):
-    gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
-    gray = cv2.fastNlMeansDenoising(gray, h=10)
-    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-
-def detect_and_link_pii(image_path, model_path="runs/detect/signverod_finetune4/weights/best.pt"):  # Use your latest model
-    try:
-        model = YOLO(model_path)
-    except:
-        model = YOLO("yolov8n.pt")
+def detect_and_link_pii(image, model_path=DEFAULT_MODEL_PATH, use_cache=True, tile_size="auto",
+                        preprocess=DEFAULT_PRESET, denoise_scale=DEFAULT_DENOISE_SCALE, backend=None,
+                        pseudonymizer=None):
+    """
+    Detect visual and text PII, link related detections and generate dummies.
+    Args:
+        image: Image path, encoded bytes or decoded BGR ndarray. Arrays are used
+               as-is, so callers that already decoded the page don't decode it again.
+        model_path: YOLO weights (shared via model_registry). A .onnx path is served by onnxruntime.
+        use_cache: Look up / store results in the content-addressed detection cache.
+        tile_size: "auto" picks tiled YOLO inference from the page resolution; None forces
+                   whole-page prediction; an int forces that tile size (see tiling.py).
+        preprocess: OCR denoising preset, "auto" picks one from the page noise (see preprocess.py).
+        denoise_scale: Denoise a downscaled copy of the page (1.0 = full resolution).
+        backend: "torch", "onnx" or "onnx-int8" to serve the exported sibling of model_path
+                 instead (see model_registry.BACKENDS); None uses model_path as given.
+        pseudonymizer: Maps real values to dummies (see src/pseudonym.py). Defaults to a
+                       fresh per-document mapping, or the shared keyed one when
+                       MIRRORMASK_PSEUDONYM_KEY is set.
+    Returns:
+        Tuple of (detections, links, dummies, decoded BGR image).
+    """
+    if backend:
+        model_path = backend_weights(model_path, backend)
+    model = get_model(model_path)  # Shared per-process instance, see model_registry
+    pseudonymizer = pseudonymizer or default_pseudonymizer()
+    with span("decode"):
+        img = load_image(image)
     
-    img = cv2.imread(image_path)
-    if img is None:
-        raise ValueError("Image not found")
+    if not use_cache:
+        detections, links, dummies = _detect(img, model, tile_size, preprocess, denoise_scale, pseudonymizer)
+        return detections, links, dummies, img
     
+    # Same pixels + same weights + same detection config -> reuse the earlier result
+    with span("cache"):
+        key = detection_cache.key(img, f"{model_info(model_path)['version']}|{DETECTION_CONFIG_VERSION}|{AADHAAR_CHECK}|{tile_size}|{preprocess}|{denoise_scale}|{pseudonymizer.scope}")
+        cached = detection_cache.get(key)
+    count("mirrormask_cache_lookups_total", result="miss" if cached is None else "hit")
+    if cached is not None:
+        detections, links, dummies = cached
+        return detections, links, dummies, img
+    detections, links, dummies = _detect(img, model, tile_size, preprocess, denoise_scale, pseudonymizer)
+    detection_cache.put(key, (detections, links, dummies))
+    return detections, links, dummies, img  # Return img for pipeline
+
+def _detect(img, model, tile_size, preprocess, denoise_scale, pseudonymizer):
     height, width = img.shape[:2]
     
-    # YOLO detections
-    results = model.predict(image_path, conf=0.25, iou=0.45)  # Higher conf for prototype
+    # One page-level preprocessing + OCR pass; YOLO regions and the text PII search both read from it
+    with span("preprocess"):
+        preprocessed_img, _ = preprocess_page(img, preprocess, denoise_scale)
+    with span("ocr"):
+        page_ocr = run_page_ocr(preprocessed_img)
+    
+    # YOLO detections (on the decoded array, so ultralytics doesn't re-read the file)
+    # High-resolution scans are tiled so small initials/dates survive the resize to 640
+    with span("yolo"):
+        boxes, classes, confs, names = predict_boxes(model, img, conf=0.25, iou=0.45, tile_size=tile_size)  # Higher conf for prototype
     detections = []
-    for result in results:
-        boxes = result.boxes.xyxy.cpu().numpy()
-        classes = result.boxes.cls.cpu().numpy()
-        confs = result.boxes.conf.cpu().numpy()
-        names = result.names
-        for box, cls, conf in zip(boxes, classes, confs):
-            x1, y1, x2, y2 = map(int, box)
-            class_name = names[int(cls)]
-            region = img[y1:y2, x1:x2]
-            preprocessed = preprocess_region(region)
-            text = pytesseract.image_to_string(Image.fromarray(preprocessed), config='--psm 6').strip()
-            pii_list = detect_pii(text)
-            det = {
-                "type": class_name,
-                "bbox": [x1/width, y1/height, (x2-x1)/width, (y2-y1)/height],  # Normalized for YOLO-style
-                "abs_bbox": [x1, y1, x2, y2],
-                "confidence": float(conf),
-                "text": text,
-                "pii": pii_list
-            }
-            detections.append(det)
+    for box, cls, conf in zip(boxes, classes, confs):
+        x1, y1, x2, y2 = map(int, box)
+        class_name = names[int(cls)]
+        text, readable = page_ocr.text_in_box([x1, y1, x2, y2])
+        if not readable and class_name not in NON_TEXT_CLASSES:
+            # Page pass couldn't read it (e.g. handwriting): targeted re-OCR of the
+            # already preprocessed crop, so its pixels aren't denoised a second time
+            region = preprocessed_img[y1:y2, x1:x2]
+            if region.size:
+                with span("region_ocr"):
+                    text = pytesseract.image_to_string(Image.fromarray(region), config='--psm 6').strip()
+        det = {
+            "type": class_name,
+            "bbox": [x1/width, y1/height, (x2-x1)/width, (y2-y1)/height],  # Normalized for YOLO-style
+            "abs_bbox": [x1, y1, x2, y2],
+            "confidence": float(conf),
+            "text": text,
+            "pii": []
+        }
+        detections.append(det)
     
-    # Full-image OCR for missed text PII
-    preprocessed_img = preprocess_region(img)
-    ocr_data = pytesseract.image_to_data(Image.fromarray(preprocessed_img), output_type=Output.DICT)
-    for i in range(len(ocr_data['text'])):
-        text = ocr_data['text'][i].strip()
-        if text:
-            pii_list = detect_pii(text)
-            if pii_list:
-                x1, y1, w, h = ocr_data['left'][i], ocr_data['top'][i], ocr_data['width'][i], ocr_data['height'][i]
-                det = {
-                    "type": "text",
-                    "bbox": [x1/width, y1/height, w/width, h/height],
-                    "abs_bbox": [x1, y1, x1+w, y1+h],
-                    "confidence": 0.8,  # Arbitrary
-                    "text": text,
-                    "pii": pii_list
-                }
-                detections.append(det)
+    # Classify region texts and page lines in one batch: structured IDs via one recognizer
+    # scan per string, NER via one spaCy pipe over the strings with letters. Lines (not
+    # single words) are scanned, so IDs OCR split on spaces still match
+    lines = page_ocr.lines()
+    texts = [det['text'] for det in detections] + [l['text'] for l in lines]
+    with span("classify"):
+        pii_lists = classify_batch(texts, with_spans=True)
+    region_pii = pii_lists[:len(detections)]
+    line_pii = pii_lists[len(detections):]
+    for det, pii_list in zip(detections, region_pii):
+        det['pii'] = [(t, pii_type) for t, pii_type, _, _ in pii_list]
+    
+    # Full-page text PII: each line hit becomes one detection over the words it covers
+    for line, hits in zip(lines, line_pii):
+        for hit in line_spans(line, hits):
+            x1, y1, x2, y2 = hit['abs_bbox']
+            detections.append({
+                "type": "text",
+                "bbox": [x1/width, y1/height, (x2-x1)/width, (y2-y1)/height],
+                "abs_bbox": [x1, y1, x2, y2],
+                "confidence": 0.8,  # Arbitrary
+                "text": hit['text'],
+                "pii": [(hit['text'], hit['type'])]
+            })
     
     # Link PII (heuristic: distance < 200px or same y)
-    links = {}
-    for i, det1 in enumerate(detections):
-        center1 = ((det1['abs_bbox'][0] + det1['abs_bbox'][2])/2, (det1['abs_bbox'][1] + det1['abs_bbox'][3])/2)
-        for j, det2 in enumerate(detections):
-            if i != j and det1['type'] in ['signature', 'initials', 'photo'] and det2['type'] in ['text', 'name', 'phone', 'aadhaar', 'date']:
-                center2 = ((det2['abs_bbox'][0] + det2['abs_bbox'][2])/2, (det2['abs_bbox'][1] + det2['abs_bbox'][3])/2)
-                dist = euclidean(center1, center2)
-                if dist < 200 or abs(center1[1] - center2[1]) < 50:  # Vertical align
-                    links.setdefault(i, []).append(j)
-                    links.setdefault(j, []).append(i)
+    with span("link"):
+        links = link_detections(detections, max_dist=200, max_dy=50)
     
-    # Generate dummies for text PII
+    # Generate dummies for text PII: repeats of the same real value get the same dummy
     dummies = {}
-    for idx, det in enumerate(detections):
-        if det['type'] in ['phone', 'date', 'aadhaar', 'text'] and det['pii']:
-            pii_type = det['pii'][0][1]  # First PII type
-            dummy = generate_dummy(pii_type)
-            dummies[idx] = dummy
+    with span("dummies"):
+        for idx, det in enumerate(detections):
+            if det['type'] in ['phone', 'date', 'aadhaar', 'text'] and det['pii']:
+                value, pii_type = det['pii'][0]  # First PII hit
+                dummy = generate_dummy(pii_type, value, pseudonymizer)
+                dummies[idx] = dummy
     
-    return detections, links, dummies, img  # Return img for pipeline
\ No newline at end of file
+    return detections, links, dummies
\ No newline at end of file
@@ -0,0 +1,71 @@
+import os
+import cv2
+import numpy as np
+
+# Denoising presets, cheapest first
+PRESETS = ["none", "bilateral", "nlmeans"]
+NOISE_THRESHOLDS = {"bilateral": 2.0, "nlmeans": 5.0}  # Estimated noise sigma at which each preset kicks in
+NOISE_SAMPLE_SIDE = 1500  # Noise is estimated on a subsampled grid no longer than this
+
+DEFAULT_PRESET = os.getenv("MIRRORMASK_PREPROCESS", "auto")
+DEFAULT_DENOISE_SCALE = float(os.getenv("MIRRORMASK_DENOISE_SCALE", "1.0"))
+
+def estimate_noise(gray):
+    """
+    Cheap noise sigma estimate (grey levels). The Laplacian-style residual cancels
+    flat regions and smooth gradients; its median absolute value ignores text edges,
+    so clean digital pages come out near 0 and grainy scans well above it.
+    """
+    step = max(1, int(np.ceil(max(gray.shape[:2]) / NOISE_SAMPLE_SIDE)))
+    sample = np.ascontiguousarray(gray[::step, ::step]).astype(np.float32)
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    residual = cv2.filter2D(sample, -1, kernel)[1:-1, 1:-1]
+    if residual.size == 0:
+        return 0.0
+    return float(np.median(np.abs(residual)) / 0.6745 / 6.0)  # MAD -> sigma, /6 = kernel L2 norm
+
+def choose_preset(noise):
+    preset = "none"
+    for name in PRESETS[1:]:
+        if noise >= NOISE_THRESHOLDS[name]:
+            preset = name
+    return preset
+
+def _denoise(gray, preset):
+    if preset == "bilateral":
+        return cv2.bilateralFilter(gray, 5, 40, 5)
+    if preset == "nlmeans":
+        return cv2.fastNlMeansDenoising(gray, h=10)
+    return gray
+
+def denoise(gray, preset, scale=1.0):
+    """
+    Apply a preset. With scale < 1 the filter runs on a downscaled copy that is
+    resized back, which cuts NL-means cost roughly by scale^2 on high-DPI scans.
+    """
+    if preset == "none":
+        return gray
+    if scale >= 1.0:
+        return _denoise(gray, preset)
+    height, width = gray.shape[:2]
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return cv2.resize(_denoise(small, preset), (width, height), interpolation=cv2.INTER_LINEAR)
+
+def preprocess_page(img, preset=DEFAULT_PRESET, denoise_scale=DEFAULT_DENOISE_SCALE):
+    """
+    Grayscale, denoise and binarize a page once for OCR. Region re-OCR slices the
+    returned array instead of preprocessing its crop again.
+    Args:
+        img: BGR page.
+        preset: "auto" (picked from estimate_noise) or one of PRESETS.
+        denoise_scale: Denoise a copy downscaled by this factor (1.0 = full resolution).
+    Returns:
+        (binarized page, preset used)
+    """
+    if preset != "auto" and preset not in PRESETS:
+        raise ValueError(f"Unknown preprocessing preset {preset!r}; use 'auto' or one of {PRESETS}")
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    if preset == "auto":
+        preset = choose_preset(estimate_noise(gray))
+    gray = denoise(gray, preset, denoise_scale)
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2), preset
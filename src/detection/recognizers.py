@@ -0,0 +1,105 @@
+import os
+import re
+
+# Aadhaar acceptance: "checksum" (default) = the Verhoeff checksum must pass, as every
+# issued Aadhaar does; "context" = checksum passes or the text carries an Aadhaar/UID
+# label (opt in for synthetic and test documents, whose random numbers rarely checksum);
+# "off" = any 12-digit group. "strict" is accepted as an alias of "checksum".
+AADHAAR_CHECK = os.getenv("MIRRORMASK_AADHAAR_CHECK", "checksum")
+
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+
+# One alternation, scanned once per line. Order matters where patterns can start at
+# the same position: the 12-digit Aadhaar is tried before the 10-digit phone.
+RECOGNIZER_RE = re.compile(r"""
+    (?P<AADHAAR>(?<![\d])\d{4}[ -]?\d{4}[ -]?\d{4}(?![\d]))
+  | (?P<PHONE>(?<![\d+])(?:\+91[ -]?|0)?(?:\d[ -]?){9}\d(?![\d]))
+  | (?P<PAN>\b[A-Z]{5}[0-9]{4}[A-Z]\b)
+  | (?P<DATE>(?<![\d])(?:\d{1,2}[-/.]\d{1,2}[-/.](?:\d{4}|\d{2})|\d{4}[-/.]\d{1,2}[-/.]\d{1,2})(?![\d])
+      | \b\d{1,2}(?:st|nd|rd|th)?[ -]""" + _MONTH + r"""[ ,-]*\d{4}\b
+      | \b""" + _MONTH + r"""[ -]\d{1,2}(?:st|nd|rd|th)?,?[ ]\d{4}\b)
+  | (?P<PINCODE>(?<![\d])[1-9]\d{2}[ ]?\d{3}(?![\d]))
+""", re.VERBOSE | re.IGNORECASE)
+
+AADHAAR_CONTEXT_RE = re.compile(r"aadh?aa?r|\buid", re.IGNORECASE)
+PINCODE_CONTEXT_RE = re.compile(r"\bpin\b|pin ?code|postal|,", re.IGNORECASE)
+PAN_STRICT_RE = re.compile(r"^[A-Z]{5}[0-9]{4}[A-Z]$")  # PAN is upper case; IGNORECASE above is for months
+
+# Verhoeff tables (dihedral group D5)
+_VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 2, 3, 4, 0, 6, 7, 8, 9, 5], [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7], [4, 0, 1, 2, 3, 9, 5, 6, 7, 8], [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2], [7, 6, 5, 9, 8, 2, 1, 0, 4, 3], [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0]
+]
+_VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 5, 7, 6, 2, 8, 3, 0, 9, 4], [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7], [9, 4, 5, 3, 1, 2, 6, 8, 7, 0], [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5], [7, 0, 4, 6, 9, 1, 3, 2, 5, 8]
+]
+
+def verhoeff_valid(digits):
+    check = 0
+    for i, digit in enumerate(reversed(digits)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[i % 8][int(digit)]]
+    return check == 0
+
+def _digits(text):
+    return "".join(ch for ch in text if ch.isdigit())
+
+def _accept(pii_type, match_text, text, aadhaar_check):
+    if pii_type == "AADHAAR":
+        if aadhaar_check == "off":
+            return True
+        if verhoeff_valid(_digits(match_text)):
+            return True
+        return aadhaar_check == "context" and bool(AADHAAR_CONTEXT_RE.search(text))
+    if pii_type == "PAN":
+        return bool(PAN_STRICT_RE.match(match_text))
+    if pii_type == "PINCODE":
+        return bool(PINCODE_CONTEXT_RE.search(text))  # A bare 6-digit number is too common on its own
+    return True
+
+def scan(text, aadhaar_check=None):
+    """
+    Find structured PII (Aadhaar, PAN, phone, dates, pincode) anywhere in text with one
+    pass of the combined pattern, so IDs split over several OCR words still match.
+    Returns:
+        [(matched text, type, start_char, end_char), ...] in text order.
+    """
+    aadhaar_check = aadhaar_check or AADHAAR_CHECK
+    hits = []
+    for match in RECOGNIZER_RE.finditer(text):
+        pii_type = match.lastgroup
+        matched = match.group().strip(" -,")
+        start = match.start() + match.group().index(matched)
+        if _accept(pii_type, matched, text, aadhaar_check):
+            hits.append((matched, pii_type, start, start + len(matched)))
+    return hits
+
+def line_spans(line, hits):
+    """
+    Turn character-span hits on an OCR line (see PageOCR.lines) into merged boxes over
+    the words they cover. Overlapping hits keep the first one.
+    Returns:
+        [{"text", "type", "words", "abs_bbox"}, ...]
+    """
+    spans = []
+    taken = []
+    for text, pii_type, start, end in hits:
+        if any(start < t_end and end > t_start for t_start, t_end in taken):
+            continue
+        words = [w for w, (ws, we) in zip(line['words'], line['offsets']) if ws < end and we > start]
+        if not words:
+            continue
+        taken.append((start, end))
+        spans.append({
+            "text": text,
+            "type": pii_type,
+            "words": words,
+            "abs_bbox": [
+                min(w['abs_bbox'][0] for w in words), min(w['abs_bbox'][1] for w in words),
+                max(w['abs_bbox'][2] for w in words), max(w['abs_bbox'][3] for w in words)
+            ]
+        })
+    return spans
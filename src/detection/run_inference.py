@@ -1,5 +1,12 @@
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from ultralytics import YOLO
 import json
+import numpy as np
+from src.detection.evaluation import CLASS_NAMES, label_path, load_labels, match, detection_map
 
 def run_inference(model_path="runs/detect/signverod_finetune4/weights/best.pt", data_yaml="src/detection/data.yaml"):
     # Load model
@@ -11,53 +18,127 @@ def run_inference(model_path="runs/detect/signverod_finetune4/weights/best.pt",
     
     # Run validation with true metrics
     results = model.val(data=data_yaml, conf=0.1, iou=0.45, verbose=True)
+    metrics = extract_metrics(results)
     
-    # Extract metrics
+    # Save metrics to file
+    with open("inference_metrics.json", "w") as f:
+        json.dump(metrics, f, indent=4)
+    
+    print("True validation metrics saved to inference_metrics.json")
+    return metrics
+
+def extract_metrics(results):
     metrics = {
         "precision": float(results.box.mp),  # Mean Precision across all classes
         "recall": float(results.box.mr),     # Mean Recall across all classes
         "mAP_0.5": float(results.box.map50), # mAP at IoU=0.5 across all classes
         "mAP_0.5:0.95": float(results.box.map),  # mAP at IoU=0.5:0.95 across all classes
         "per_class": {
-            "signature": {
-                "precision": float(results.box.p[0]) if len(results.box.p) > 0 else 0.0,
-                "recall": float(results.box.r[0]) if len(results.box.r) > 0 else 0.0,
-                "mAP_0.5": float(results.box.ap50[0]) if len(results.box.ap50) > 0 else 0.0
-            },
-            "initials": {
-                "precision": float(results.box.p[1]) if len(results.box.p) > 1 else 0.0,
-                "recall": float(results.box.r[1]) if len(results.box.r) > 1 else 0.0,
-                "mAP_0.5": float(results.box.ap50[1]) if len(results.box.ap50) > 1 else 0.0
-            },
-            "phone": {
-                "precision": float(results.box.p[2]) if len(results.box.p) > 2 else 0.0,
-                "recall": float(results.box.r[2]) if len(results.box.r) > 2 else 0.0,
-                "mAP_0.5": float(results.box.ap50[2]) if len(results.box.ap50) > 2 else 0.0
-            },
-            "date": {
-                "precision": float(results.box.p[3]) if len(results.box.p) > 3 else 0.0,
-                "recall": float(results.box.r[3]) if len(results.box.r) > 3 else 0.0,
-                "mAP_0.5": float(results.box.ap50[3]) if len(results.box.ap50) > 3 else 0.0
-            },
-            "aadhar": {
-                "precision": float(results.box.p[4]) if len(results.box.p) > 4 else 0.0,
-                "recall": float(results.box.r[4]) if len(results.box.r) > 4 else 0.0,
-                "mAP_0.5": float(results.box.ap50[4]) if len(results.box.ap50) > 4 else 0.0
-            },
-            "photo": {
-                "precision": float(results.box.p[5]) if len(results.box.p) > 5 else 0.0,
-                "recall": float(results.box.r[5]) if len(results.box.r) > 5 else 0.0,
-                "mAP_0.5": float(results.box.ap50[5]) if len(results.box.ap50) > 5 else 0.0
-            }
+            name: {
+                "precision": float(results.box.p[i]) if len(results.box.p) > i else 0.0,
+                "recall": float(results.box.r[i]) if len(results.box.r) > i else 0.0,
+                "mAP_0.5": float(results.box.ap50[i]) if len(results.box.ap50) > i else 0.0
+            } for i, name in enumerate(CLASS_NAMES)
         }
     }
-    
-    # Save metrics to file
-    with open("inference_metrics.json", "w") as f:
-        json.dump(metrics, f, indent=4)
-    
-    print("True validation metrics saved to inference_metrics.json")
     return metrics
 
+AGREEMENT_CONF = 0.25  # Boxes at the serving threshold, as the pipeline would use them
+
+def agreement(predictions, reference):
+    """
+    Share of the reference backend's boxes (at AGREEMENT_CONF) that the other backend
+    also finds with the same class at IoU >= 0.5, and the share of its own boxes that
+    match a reference box; 1.0/1.0 means identical detections for the pipeline.
+    """
+    matched = total_ref = total_own = 0
+    for (boxes, classes, confs), (ref_boxes, ref_classes, ref_confs) in zip(predictions, reference):
+        own, ref = confs >= AGREEMENT_CONF, ref_confs >= AGREEMENT_CONF
+        hits = match(boxes[own], classes[own], confs[own], ref_boxes[ref], ref_classes[ref])
+        matched += int(hits.sum())  # One-to-one matching: each hit pairs one box from each side
+        total_own += int(own.sum())
+        total_ref += int(ref.sum())
+    return {
+        "box_recall_vs_torch": matched / total_ref if total_ref else 1.0,
+        "box_precision_vs_torch": matched / total_own if total_own else 1.0
+    }
+
+def evaluate_serving(weights, images, conf=0.1, iou=0.45):
+    """
+    Accuracy and CPU latency of one backend through the serving path (model_registry +
+    tiling.predict_boxes, i.e. OnnxModel.predict/onnxruntime for the ONNX backends, not
+    ultralytics' own ONNX wrapper). Each timed prediction is also the one scored, so
+    accuracy and latency describe the same code.
+    Returns:
+        (metrics dict, per-image (boxes, classes, confs) predictions)
+    """
+    import cv2
+    from src.detection.model_registry import get_model
+    from src.detection.tiling import predict_boxes
+    model = get_model(weights, warmup=True)
+    latencies, predictions, truths = [], [], []
+    for path in images:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        start = time.perf_counter()
+        boxes, classes, confs, _ = predict_boxes(model, img, conf=conf, iou=iou, tile_size=None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        predictions.append((np.asarray(boxes, dtype=float).reshape(-1, 4), np.asarray(classes).astype(int),
+                            np.asarray(confs, dtype=float)))
+        truths.append(load_labels(label_path(path), img.shape[1], img.shape[0]))
+    lat = np.array(latencies)
+    metrics = detection_map(predictions, truths)
+    metrics.update({
+        "images": len(predictions),
+        "latency_ms_mean": float(lat.mean()) if len(lat) else 0.0,
+        "latency_ms_p50": float(np.percentile(lat, 50)) if len(lat) else 0.0,
+        "latency_ms_p95": float(np.percentile(lat, 95)) if len(lat) else 0.0
+    })
+    return metrics, predictions
+
+def compare_backends(model_path="runs/detect/signverod_finetune4/weights/best.pt", data_yaml="src/detection/data.yaml",
+                     backends=("torch", "onnx", "onnx-int8"), max_images=None, out="backend_metrics.json"):
+    """
+    mAP, agreement with the torch model and CPU latency for each exported backend of
+    model_path, side by side, all measured on the same validation images through the
+    serving path. Backends without an exported file are skipped.
+    """
+    from src.detection.model_registry import backend_weights
+    from src.detection.export_onnx import val_images
+    images = val_images(data_yaml)[:max_images]
+    report, predictions = {}, {}
+    for backend in backends:
+        weights = backend_weights(model_path, backend)
+        if not os.path.exists(weights):
+            print(f"Skipping {backend}: {weights} not found (see export_onnx.py)")
+            continue
+        metrics, predictions[backend] = evaluate_serving(weights, images)
+        report[backend] = {"weights": weights, "size_mb": os.path.getsize(weights) / 1e6, **metrics}
+    if "torch" in report:
+        base = report["torch"]
+        for backend, r in report.items():
+            r["mAP_0.5_delta"] = r["mAP_0.5"] - base["mAP_0.5"]
+            r["speedup"] = base["latency_ms_mean"] / r["latency_ms_mean"] if r["latency_ms_mean"] else 0.0
+            r.update(agreement(predictions[backend], predictions["torch"]))
+
+    print(f"{'backend':<10} {'mAP50':>7} {'mAP50-95':>9} {'agree':>6} {'mean ms':>8} {'p95 ms':>8} {'MB':>7}")
+    for backend, r in report.items():
+        agree = f"{r['box_recall_vs_torch']:6.3f}" if "box_recall_vs_torch" in r else f"{'-':>6}"
+        print(f"{backend:<10} {r['mAP_0.5']:7.4f} {r['mAP_0.5:0.95']:9.4f} {agree} {r['latency_ms_mean']:8.1f} "
+              f"{r['latency_ms_p95']:8.1f} {r['size_mb']:7.1f}")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Backend comparison saved to {out}")
+    return report
+
 if __name__ == "__main__":
-    run_inference()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Validation metrics for the fine-tuned detector.")
+    parser.add_argument("--backends", nargs="+", choices=["torch", "onnx", "onnx-int8"],
+                        help="Compare mAP, agreement and CPU latency across exported backends instead")
+    parser.add_argument("--max-images", type=int, default=None, help="Validation images to use (default: all)")
+    args = parser.parse_args()
+    if args.backends:
+        compare_backends(backends=args.backends, max_images=args.max_images)
+    else:
+        run_inference()
\ No newline at end of file
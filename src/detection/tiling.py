@@ -0,0 +1,120 @@
+import math
+import numpy as np
+
+MODEL_IMGSZ = 640      # YOLO input size used in training (train_yolo.py)
+PAGE_LONG_SIDE_IN = 11.69  # A4 long side in inches, used to estimate scan DPI
+TARGET_DPI = 150       # Effective resolution each tile should keep after resizing to MODEL_IMGSZ
+TILE_OVERLAP = 0.2
+
+def estimate_dpi(shape):
+    return max(shape[:2]) / PAGE_LONG_SIDE_IN
+
+def auto_tile_size(shape, imgsz=MODEL_IMGSZ, target_dpi=TARGET_DPI):
+    """
+    Pick a tile size (px) that keeps ~target_dpi after YOLO's resize, or None when
+    whole-page prediction already does. Tile size grows with scan DPI, so an A4 page
+    is about a dozen tiles at both 300 and 600 DPI.
+    """
+    dpi = estimate_dpi(shape)
+    if dpi <= target_dpi:
+        return None  # Low-resolution page: tiling would only upsample
+    tile = int(imgsz * dpi / target_dpi)
+    if tile >= 0.8 * max(shape[:2]):
+        return None
+    return max(imgsz, tile)
+
+def make_tiles(height, width, tile, overlap=TILE_OVERLAP):
+    """
+    Overlapping (x1, y1, x2, y2) windows covering the page; the last row/column is
+    aligned to the page edge rather than padded.
+    """
+    stride = max(1, int(tile * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile:
+            return [0]
+        n = math.ceil((length - tile) / stride) + 1
+        return [min(i * stride, length - tile) for i in range(n)]
+
+    return [(x, y, min(x + tile, width), min(y + tile, height)) for y in starts(height) for x in starts(width)]
+
+def merge_boxes(boxes, classes, confs, iou=0.45, containment=0.8):
+    """
+    Class-wise NMS for boxes gathered from several tiles. Besides plain IoU, the
+    partial copies an object leaves at a tile seam are merged: a same-class box mostly
+    inside the kept one is dropped, and when the kept box is mostly inside a suppressed
+    one (a fragment that outscored the complete box), the kept box grows to their union,
+    so the whole object is still covered.
+    Returns:
+        (indices of the boxes to keep, highest confidence first; copy of boxes with the
+        kept ones grown)
+    """
+    boxes = np.array(boxes, copy=True)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp), boxes
+    areas = np.maximum(0, boxes[:, 2] - boxes[:, 0]) * np.maximum(0, boxes[:, 3] - boxes[:, 1])
+    keep = []
+    for cls in np.unique(classes):
+        order = np.where(classes == cls)[0]
+        order = order[np.argsort(-confs[order])]
+        while len(order):
+            best, rest = order[0], order[1:]
+            keep.append(best)
+            if not len(rest):
+                break
+            iw = np.clip(np.minimum(boxes[best, 2], boxes[rest, 2]) - np.maximum(boxes[best, 0], boxes[rest, 0]), 0, None)
+            ih = np.clip(np.minimum(boxes[best, 3], boxes[rest, 3]) - np.maximum(boxes[best, 1], boxes[rest, 1]), 0, None)
+            inter = iw * ih
+            overlap = inter / np.maximum(areas[best] + areas[rest] - inter, 1e-9)
+            rest_inside = inter / np.maximum(areas[rest], 1e-9) > containment
+            best_inside = (inter / np.maximum(areas[best], 1e-9) > containment) & (areas[rest] > areas[best])
+            grow = rest[best_inside]
+            if len(grow):
+                boxes[best, :2] = np.minimum(boxes[best, :2], boxes[grow, :2].min(axis=0))
+                boxes[best, 2:] = np.maximum(boxes[best, 2:], boxes[grow, 2:].max(axis=0))
+                areas[best] = (boxes[best, 2] - boxes[best, 0]) * (boxes[best, 3] - boxes[best, 1])
+            order = rest[(overlap <= iou) & ~rest_inside & ~best_inside]
+    keep = np.array(keep, dtype=np.intp)
+    return keep[np.argsort(-confs[keep])], boxes
+
+def _numpy(values):
+    # torch tensors from ultralytics, plain arrays from the ONNX backend
+    return values.cpu().numpy() if hasattr(values, "cpu") else np.asarray(values)
+
+def _unpack(result):
+    return _numpy(result.boxes.xyxy), _numpy(result.boxes.cls), _numpy(result.boxes.conf)
+
+def predict_boxes(model, img, conf=0.25, iou=0.45, tile_size="auto"):
+    """
+    Run YOLO on a page, whole or tiled.
+    Args:
+        model: YOLO model.
+        img: BGR page.
+        conf, iou: YOLO thresholds (iou is reused for the cross-tile merge).
+        tile_size: "auto" (from page resolution), None/0 for whole-page, or a size in px.
+    Returns:
+        (boxes xyxy float array, class ids, confidences, class names dict).
+    """
+    height, width = img.shape[:2]
+    if tile_size == "auto":
+        tile_size = auto_tile_size(img.shape)
+    if not tile_size:
+        result = model.predict(img, conf=conf, iou=iou, verbose=False)[0]
+        return (*_unpack(result), result.names)
+
+    # All tiles plus a downscaled full page (for objects larger than a tile) in one batch
+    windows = make_tiles(height, width, tile_size)
+    crops = [img[y1:y2, x1:x2] for x1, y1, x2, y2 in windows] + [img]
+    windows.append((0, 0, width, height))
+    results = model.predict(crops, conf=conf, iou=iou, verbose=False)
+    all_boxes, all_classes, all_confs = [], [], []
+    for (x1, y1, _, _), result in zip(windows, results):
+        boxes, classes, confs = _unpack(result)
+        all_boxes.append(boxes + np.array([x1, y1, x1, y1], dtype=boxes.dtype))
+        all_classes.append(classes)
+        all_confs.append(confs)
+    boxes = np.concatenate(all_boxes) if all_boxes else np.empty((0, 4))
+    classes = np.concatenate(all_classes) if all_classes else np.empty(0)
+    confs = np.concatenate(all_confs) if all_confs else np.empty(0)
+    keep, boxes = merge_boxes(boxes, classes, confs, iou=iou)
+    return boxes[keep], classes[keep], confs[keep], results[0].names
@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+
+def load_image(source):
+    """
+    Decode an image once into a BGR ndarray.
+    Args:
+        source: File path, encoded image bytes, or an already-decoded BGR ndarray
+                (returned as-is, no copy).
+    Returns:
+        BGR ndarray.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        img = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Could not decode image bytes")
+        return img
+    img = cv2.imread(source)
+    if img is None:
+        raise ValueError(f"Image not found: {source}")
+    return img
+
+def encode_image(img, ext=".png"):
+    """
+    Encode a BGR ndarray to bytes in the format given by ext (".png", ".jpg", ...).
+    """
+    ok, buf = cv2.imencode(ext, img)
+    if not ok:
+        raise ValueError(f"Could not encode image as {ext}")
+    return buf.tobytes()
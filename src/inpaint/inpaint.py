@@ -2,6 +2,30 @@ import cv2
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 import os
+from functools import lru_cache
+from src.image_io import load_image
+from src.telemetry import span
+
+MASK_PADDING = 10  # Add padding to ensure full PII coverage
+INPAINT_RADIUS = 3
+ROI_CONTEXT = 2 * INPAINT_RADIUS + 2  # Untouched border each crop keeps so the fill sees its surroundings
+DOWNSCALE_FACTOR = 4
+INPAINT_ENGINES = ["telea", "fill", "downscale"]
+
+def mask_rects(img_shape, detections):
+    """
+    Padded, clipped (x1, y1, x2, y2) rectangles to inpaint, one per detection.
+    x2/y2 are exclusive (slice ends): the box's own last row and column, which the
+    filled cv2.rectangle of create_mask includes, are inside the rectangle.
+    """
+    rects = []
+    for det in detections:
+        x1, y1, x2, y2 = det['abs_bbox']
+        x1, y1 = max(0, x1 - MASK_PADDING), max(0, y1 - MASK_PADDING)
+        x2, y2 = min(img_shape[1], x2 + MASK_PADDING + 1), min(img_shape[0], y2 + MASK_PADDING + 1)
+        if x2 > x1 and y2 > y1:
+            rects.append((x1, y1, x2, y2))
+    return rects
 
 def create_mask(img_shape, detections):
     """
@@ -9,58 +33,214 @@ def create_mask(img_shape, detections):
     White (255) where PII needs to be inpainted, black (0) elsewhere.
     """
     mask = np.zeros(img_shape[:2], dtype=np.uint8)
-    for det in detections:
-        x1, y1, x2, y2 = det['abs_bbox']
-        padding = 10  # Add padding to ensure full PII coverage
-        x1, y1, x2, y2 = max(0, x1 - padding), max(0, y1 - padding), min(img_shape[1], x2 + padding), min(img_shape[0], y2 + padding)
-        cv2.rectangle(mask, (x1, y1), (x2, y2), 255, -1)  # White for inpainting
+    for x1, y1, x2, y2 in mask_rects(img_shape, detections):
+        cv2.rectangle(mask, (x1, y1), (x2 - 1, y2 - 1), 255, -1)  # White for inpainting (inclusive corners)
     return mask
 
-def inpaint_and_replace(image_path, detections, dummies, output_path, mode="Standard"):
+def group_rects(rects, gap=ROI_CONTEXT):
     """
-    Inpaint PII regions using OpenCV and overlay dummy text for text-based PII.
+    Group rectangles whose context borders touch (connected components of the mask).
+    A group is inpainted as one crop, so no crop ever borrows pixels from another
+    component's unredacted PII.
+    """
+    if not rects:
+        return []
+    r = np.asarray(rects, dtype=np.int64)
+    touch = ((r[:, None, 0] - gap < r[None, :, 2] + gap) & (r[None, :, 0] - gap < r[:, None, 2] + gap) &
+             (r[:, None, 1] - gap < r[None, :, 3] + gap) & (r[None, :, 1] - gap < r[:, None, 3] + gap))
+    groups, seen = [], np.zeros(len(rects), dtype=bool)
+    for start in range(len(rects)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        stack, members = [start], []
+        while stack:
+            i = stack.pop()
+            members.append(i)
+            for j in np.nonzero(touch[i] & ~seen)[0]:
+                seen[j] = True
+                stack.append(j)
+        groups.append([rects[i] for i in members])
+    return groups
+
+def _fill(crop, mask):
+    # Documents are mostly flat paper: paint the component with the median of its surroundings
+    ring = crop[mask == 0]
+    color = np.median(ring, axis=0).astype(crop.dtype) if len(ring) else 255
+    out = crop.copy()
+    out[mask > 0] = color
+    return out
+
+def _downscale(crop, mask):
+    h, w = mask.shape
+    if min(h, w) < DOWNSCALE_FACTOR * 8:
+        return cv2.inpaint(crop, mask, inpaintRadius=INPAINT_RADIUS, flags=cv2.INPAINT_TELEA)
+    size = (max(1, w // DOWNSCALE_FACTOR), max(1, h // DOWNSCALE_FACTOR))
+    small = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+    small_mask = (cv2.resize(mask, size, interpolation=cv2.INTER_AREA) > 0).astype(np.uint8) * 255
+    small = cv2.inpaint(small, small_mask, inpaintRadius=INPAINT_RADIUS, flags=cv2.INPAINT_TELEA)
+    return cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+def _telea(crop, mask):
+    return cv2.inpaint(crop, mask, inpaintRadius=INPAINT_RADIUS, flags=cv2.INPAINT_TELEA)
+
+ENGINE_FUNCS = {"telea": _telea, "fill": _fill, "downscale": _downscale}
+
+def inpaint_regions(img, detections, engine="telea"):
+    """
+    Inpaint PII regions crop by crop instead of over the full frame.
+    Each connected group of padded boxes is cut out with a small context border,
+    inpainted with the chosen engine and written back in place; pixels outside the
+    mask are never touched.
     Args:
-        image_path: Path to input image.
-        detections: List of PII detections from pii_detection_pipeline.
-        dummies: Dict mapping detection indices to dummy text (e.g., fake names).
-        output_path: Path to save redacted image.
-        mode: "Standard" (use dummies) or "Legal" (use "[Redacted]").
+        img: BGR page (not modified).
+        detections: Detections with 'abs_bbox'.
+        engine: "telea" (OpenCV TELEA, best quality), "fill" (median background fill,
+                fastest), or "downscale" (TELEA at 1/4 resolution, upsampled back).
     Returns:
-        Path to the redacted image.
+        New BGR array with the PII regions filled.
     """
-    # Load image
-    img_cv = cv2.imread(image_path)
-    if img_cv is None:
-        raise ValueError(f"Image not found: {image_path}")
+    if engine not in ENGINE_FUNCS:
+        raise ValueError(f"Unknown inpaint engine {engine!r}. Use one of {INPAINT_ENGINES}.")
+    inpaint_fn = ENGINE_FUNCS[engine]
+    height, width = img.shape[:2]
+    out = img.copy()
+    for group in group_rects(mask_rects(img.shape, detections)):
+        gx1 = max(0, min(r[0] for r in group) - ROI_CONTEXT)
+        gy1 = max(0, min(r[1] for r in group) - ROI_CONTEXT)
+        gx2 = min(width, max(r[2] for r in group) + ROI_CONTEXT)
+        gy2 = min(height, max(r[3] for r in group) + ROI_CONTEXT)
+        mask = np.zeros((gy2 - gy1, gx2 - gx1), dtype=np.uint8)
+        for x1, y1, x2, y2 in group:
+            mask[y1 - gy1:y2 - gy1, x1 - gx1:x2 - gx1] = 255
+        crop = np.ascontiguousarray(img[gy1:gy2, gx1:gx2])
+        filled = inpaint_fn(crop, mask)
+        region = out[gy1:gy2, gx1:gx2]
+        region[mask > 0] = filled[mask > 0]
+    return out
 
-    # Create mask for all PII regions
-    mask = create_mask(img_cv.shape, detections)
-    
-    # Inpaint using OpenCV (TELEA algorithm for smooth document results)
-    inpainted_cv = cv2.inpaint(img_cv, mask, inpaintRadius=3, flags=cv2.INPAINT_TELEA)
-    
-    # Convert to PIL for text overlay
-    inpainted_pil = Image.fromarray(cv2.cvtColor(inpainted_cv, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(inpainted_pil)
-    
-    # Load font (use project's handwritten font for realism)
-    font_path = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')), 
-                            'data', 'assets', 'IndieFlower-Regular.ttf')
+FONT_PATH = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')),
+                         'data', 'assets', 'IndieFlower-Regular.ttf')
+
+@lru_cache(maxsize=None)
+def load_font(size=20):
+    # Load font once per process (use project's handwritten font for realism)
     try:
-        font = ImageFont.truetype(font_path, 20)  # Size 20 for document text
+        return ImageFont.truetype(FONT_PATH, size)
     except Exception as e:
         print(f"Font load failed: {e}. Using default font.")
-        font = ImageFont.load_default()
-    
-    # Overlay dummy text for text-based PII
+        return ImageFont.load_default()
+
+def draw_text(img, xy, text, font, fill=(0, 0, 0)):
+    """
+    Draw text onto a BGR ndarray in place. Only the crop under the text goes through
+    PIL, so the full page never makes the BGR->RGB->PIL->BGR round trip.
+    fill is in BGR order.
+    """
+    x, y = xy
+    left, top, right, bottom = font.getbbox(text)
+    x1, y1 = max(0, x + left), max(0, y + top)
+    x2, y2 = min(img.shape[1], x + right + 1), min(img.shape[0], y + bottom + 1)
+    if x2 <= x1 or y2 <= y1:
+        return img
+    crop = Image.fromarray(img[y1:y2, x1:x2])
+    ImageDraw.Draw(crop).text((x - x1, y - y1), text, fill=fill, font=font)
+    img[y1:y2, x1:x2] = np.asarray(crop)
+    return img
+
+OVERLAY_TYPES = ['phone', 'date', 'aadhaar', 'text']  # Detections that get replacement text drawn over them
+
+def region_crops(img, detections):
+    """
+    Original pixels under each detection's padded mask rectangle, so a detection can be
+    switched off later without keeping (or re-decoding) the whole original page.
+    Returns:
+        {detection index: ((x1, y1, x2, y2), pixels)}
+    """
+    crops = {}
     for idx, det in enumerate(detections):
-        if idx in dummies and det['type'] in ['phone', 'date', 'aadhaar', 'text']:
+        rects = mask_rects(img.shape, [det])
+        if rects:
+            x1, y1, x2, y2 = rects[0]
+            crops[idx] = (rects[0], img[y1:y2, x1:x2].copy())
+    return crops
+
+def restore_regions(img, crops, disabled):
+    """
+    Put the original pixels back under disabled detections, in place. Pixels that an
+    enabled detection also covers stay redacted.
+    """
+    keep = [rect for idx, (rect, _) in crops.items() if idx not in disabled]
+    for idx in disabled:
+        if idx not in crops:
+            continue
+        (x1, y1, x2, y2), pixels = crops[idx]
+        restore = np.ones((y2 - y1, x2 - x1), dtype=bool)
+        for kx1, ky1, kx2, ky2 in keep:
+            ix1, iy1, ix2, iy2 = max(x1, kx1), max(y1, ky1), min(x2, kx2), min(y2, ky2)
+            if ix2 > ix1 and iy2 > iy1:
+                restore[iy1 - y1:iy2 - y1, ix1 - x1:ix2 - x1] = False
+        img[y1:y2, x1:x2][restore] = pixels[restore]
+    return img
+
+def draw_overlay(img, detections, dummies, mode="Standard", disabled=()):
+    """
+    Draw the replacement text for text-based PII onto img in place: the dummy in
+    "Standard" mode, "[Redacted]" in "Legal" mode.
+    """
+    font = load_font(20)  # Size 20 for document text
+    for idx, det in enumerate(detections):
+        if idx in dummies and idx not in disabled and det['type'] in OVERLAY_TYPES:
             x1, y1, _, _ = det['abs_bbox']
             overlay_text = dummies[idx] if mode == "Standard" else "[Redacted]"
-            draw.text((x1, y1), overlay_text, fill=(0, 0, 0), font=font)
+            draw_text(img, (x1, y1), overlay_text, font)
+    return img
+
+def render_overlay(base, detections, dummies, mode="Standard", crops=None, disabled=()):
+    """
+    Redacted page from an inpainted base layer (see inpaint_regions) without inpainting
+    again: switching mode, editing dummies or toggling detections only redraws text.
+    Args:
+        base: Inpainted BGR page (not modified).
+        detections, dummies: As for inpaint_and_replace.
+        mode: "Standard" or "Legal".
+        crops: region_crops() of the original page; needed only when disabling detections.
+        disabled: Indices of detections to leave unredacted.
+    Returns:
+        New BGR array.
+    """
+    out = base.copy()
+    if disabled:
+        restore_regions(out, crops or {}, disabled)
+    return draw_overlay(out, detections, dummies, mode, disabled)
+
+def inpaint_and_replace(image, detections, dummies, output_path=None, mode="Standard", engine="telea"):
+    """
+    Inpaint PII regions using OpenCV and overlay dummy text for text-based PII.
+    Args:
+        image: Path to input image, or decoded BGR ndarray (not modified).
+        detections: List of PII detections from pii_detection_pipeline.
+        dummies: Dict mapping detection indices to dummy text (e.g., fake names).
+        output_path: Path to save redacted image. If None, the array is returned instead.
+        mode: "Standard" (use dummies) or "Legal" (use "[Redacted]").
+        engine: Inpainting engine, see inpaint_regions.
+    Returns:
+        Path to the redacted image, or the redacted BGR ndarray if output_path is None.
+    """
+    img_cv = load_image(image)
+
+    # Inpaint only padded crops around the PII regions (TELEA by default for smooth document results)
+    with span("inpaint"):
+        inpainted_cv = inpaint_regions(img_cv, detections, engine=engine)
+    
+    # Overlay dummy text for text-based PII
+    with span("overlay"):
+        draw_overlay(inpainted_cv, detections, dummies, mode)
+    
+    if output_path is None:
+        return inpainted_cv
     
     # Save final image
-    final_cv = cv2.cvtColor(np.array(inpainted_pil), cv2.COLOR_RGB2BGR)
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    cv2.imwrite(output_path, final_cv)
-    return output_path
\ No newline at end of file
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    cv2.imwrite(output_path, inpainted_cv)
+    return output_path
@@ -0,0 +1,177 @@
+import io
+import zlib
+import numpy as np
+
+RENDER_DPI = 200  # Used only for pages that aren't a single scanned image
+
+def is_pdf(source):
+    if isinstance(source, str):
+        return source.lower().endswith(".pdf")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:5]) == b"%PDF-"
+    return False
+
+def _open(source):
+    import pikepdf
+    if isinstance(source, str):
+        return pikepdf.open(source)
+    return pikepdf.open(io.BytesIO(bytes(source)))
+
+FAST_PATH_OPERATORS = {"q", "Q", "cm", "Do", "gs"}  # Anything else (text, paths, inline images) needs a real render
+COVER_TOLERANCE = 1.0  # Points of slack when checking that the image covers the page
+
+def _multiply(m, n):
+    # PDF matrices [a b c d e f]; m applied first, then n
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return [a * a2 + b * c2, a * b2 + b * d2, c * a2 + d * c2, c * b2 + d * d2,
+            e * a2 + f * c2 + e2, e * b2 + f * d2 + f2]
+
+def _image_placement(page, name):
+    """
+    The CTM the single image is drawn with, or None when the content stream does
+    anything besides placing that one image (text, vector drawing, other XObjects).
+    """
+    import pikepdf
+    ctm, stack, placement = [1, 0, 0, 1, 0, 0], [], None
+    for operands, operator in pikepdf.parse_content_stream(page):
+        op = str(operator)
+        if op not in FAST_PATH_OPERATORS:
+            return None
+        if op == "q":
+            stack.append(ctm)
+        elif op == "Q":
+            ctm = stack.pop() if stack else ctm
+        elif op == "cm":
+            ctm = _multiply([float(v) for v in operands], ctm)
+        elif op == "Do":
+            if placement is not None or str(operands[0]) != name:
+                return None
+            placement = ctm
+    return placement
+
+def _scanned_image(page):
+    """
+    A scanned page is one image XObject drawn upright over the whole page and nothing
+    else; extract it at native resolution, no re-render. None for any other page.
+    """
+    import pikepdf
+    images = list(page.images.items())
+    if len(images) != 1 or int(page.obj.get("/Rotate", 0)) % 360 != 0:
+        return None
+    name, image = images[0]
+    placement = _image_placement(page, name)
+    if placement is None:
+        return None
+    a, b, c, d, e, f = placement
+    x0, y0, x1, y1 = [float(v) for v in page.mediabox]
+    if abs(b) > 1e-6 or abs(c) > 1e-6 or a <= 0 or d <= 0:
+        return None  # Rotated, skewed or flipped placement
+    if (e > x0 + COVER_TOLERANCE or f > y0 + COVER_TOLERANCE
+            or e + a < x1 - COVER_TOLERANCE or f + d < y1 - COVER_TOLERANCE):
+        return None  # Doesn't cover the page: the margins are part of the rendering
+    pil = pikepdf.PdfImage(image).as_pil_image().convert("RGB")
+    return np.ascontiguousarray(np.asarray(pil)[:, :, ::-1])  # RGB -> BGR
+
+def _open_renderer(source, index):
+    try:
+        import pypdfium2
+    except ImportError:
+        raise ValueError(f"Page {index + 1} is not a single scanned image; install pypdfium2 to render it")
+    return pypdfium2.PdfDocument(source if isinstance(source, str) else bytes(source))
+
+def _render(doc, index):
+    pil = doc[index].render(scale=RENDER_DPI / 72).to_pil().convert("RGB")
+    return np.ascontiguousarray(np.asarray(pil)[:, :, ::-1])
+
+def page_count(source):
+    with _open(source) as pdf:
+        return len(pdf.pages)
+
+def iter_pages(source):
+    """
+    Rasterize a PDF lazily, one page at a time.
+    Yields:
+        (BGR ndarray, (width_pt, height_pt)) per page; only the current page is decoded.
+    """
+    renderer = None  # Opened on the first page that needs it, then shared by the rest
+    try:
+        with _open(source) as pdf:
+            for index, page in enumerate(pdf.pages):
+                box = [float(v) for v in page.mediabox]
+                size = (box[2] - box[0], box[3] - box[1])
+                img = _scanned_image(page)
+                if img is None:
+                    if renderer is None:
+                        renderer = _open_renderer(source, index)
+                    img = _render(renderer, index)
+                yield img, size
+    finally:
+        if renderer is not None:
+            renderer.close()
+
+def encode_page(img, page_format="jpeg", quality=90):
+    """
+    Compress a BGR page for PdfWriter: ("jpeg", JPEG bytes) or ("flate", zlib RGB bytes).
+    Runs in the page worker, so compression is parallel too.
+    """
+    import cv2
+    if page_format == "jpeg":
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return "jpeg", buf.tobytes(), img.shape[1], img.shape[0]
+    rgb = np.ascontiguousarray(img[:, :, ::-1])
+    return "flate", zlib.compress(rgb.tobytes(), 6), img.shape[1], img.shape[0]
+
+class PdfWriter:
+    """
+    Minimal incremental PDF writer for image-only pages.
+    Each page's objects are written to the stream as soon as it is added, so only
+    one encoded page is ever held in memory. The page tree and xref go out on close().
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 3  # 1 = catalog, 2 = page tree (written last)
+        self.stream.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write_object(self, obj_id, body, data=None):
+        self.offsets[obj_id] = self.stream.tell()
+        self.stream.write(f"{obj_id} 0 obj\n".encode())
+        self.stream.write(body)
+        if data is not None:
+            self.stream.write(b"\nstream\n")
+            self.stream.write(data)
+            self.stream.write(b"\nendstream")
+        self.stream.write(b"\nendobj\n")
+
+    def add_page(self, encoded, size_pt):
+        kind, data, width_px, height_px = encoded
+        width_pt, height_pt = size_pt
+        image_id, content_id, page_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+        image_filter = "/DCTDecode" if kind == "jpeg" else "/FlateDecode"
+        self._write_object(image_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {width_px} /Height {height_px} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter {image_filter} /Length {len(data)} >>"
+        ).encode(), data)
+        content = f"q {width_pt:.2f} 0 0 {height_pt:.2f} 0 0 cm /Im0 Do Q".encode()
+        self._write_object(content_id, f"<< /Length {len(content)} >>".encode(), content)
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width_pt:.2f} {height_pt:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_offset = self.stream.tell()
+        self.stream.write(f"xref\n0 {self.next_id}\n0000000000 65535 f \n".encode())
+        for obj_id in range(1, self.next_id):
+            self.stream.write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode())
+        self.stream.write(f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
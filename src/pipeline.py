@@ -1,47 +1,167 @@
 import json
+import uuid
 from datetime import datetime
-import pymongo
 from dotenv import load_dotenv
 import os
-from src.detection.pii_detection_pipeline import detect_and_link_pii
-from src.inpaint.inpaint import inpaint_and_replace
+from src.detection.model_registry import model_info, DEFAULT_MODEL_PATH
+from src.resources import get_audits_collection
+from src.audit.sink import AuditSink
+from src.pdf import is_pdf, iter_pages, encode_page, PdfWriter
+from src import telemetry
 
-# Initialize MongoDB
 load_dotenv()
-MONGODB_URI = os.getenv("MONGODB_URI")
-if not MONGODB_URI:
-    raise ValueError("MONGODB_URI not set in .env")
-client = pymongo.MongoClient(MONGODB_URI)
-db = client["mirrormask_db"]
-audits_collection = db["audits"]
+# MongoDB is connected by the sink's background thread on first write, not at import
+audit_sink = AuditSink(get_audits_collection)
 
-def run_pipeline(input_path, output_path, doc_id=None, mode="Standard"):
+def init_worker(model_path=DEFAULT_MODEL_PATH):
+    """
+    Process-pool initializer: load and warm up YOLO and spaCy once per worker.
+    """
+    from src.detection.model_registry import preload
+    from src.resources import get_nlp, get_faker
+    from src.pseudonym import dummy_pool
+    preload((model_path,))
+    get_nlp()
+    get_faker()
+    dummy_pool.fill(tables=True)  # Pools and keyed tables fill in the background while the worker waits for work
+
+def run_pipeline(source, output_path=None, doc_id=None, mode="Standard", model_path=DEFAULT_MODEL_PATH, output_format=".png",
+                 pdf_workers=None, page=None, source_doc_id=None, inpaint_engine="telea", log_audit=True, user=None,
+                 keep_layers=None, pseudonymizer=None):
     """
     Run the full MirrorMask pipeline: detect PII, inpaint, replace with dummies, and log audit.
+    The input is decoded once and the same BGR buffer is shared by detection and inpainting.
     Args:
-        input_path: Path to input image.
-        output_path: Path to save redacted image.
-        doc_id: Unique identifier for the document (defaults to filename).
+        source: Path to input image or PDF, encoded image/PDF bytes, or a decoded BGR ndarray.
+        output_path: Path to save redacted image. If None, the result stays in memory.
+        doc_id: Unique identifier for the document (defaults to filename, or a random id).
         mode: "Standard" (dummy replacement) or "Legal" ([Redacted] placeholder).
+        model_path: YOLO weights to use (shared via model_registry).
+        output_format: Encoding used when returning bytes (in-memory mode with bytes input).
+        pdf_workers: Page worker processes for PDF input (see run_pdf_pipeline).
+        page, source_doc_id: Set when this image is one page of a PDF; recorded in the audit.
+        inpaint_engine: "telea", "fill" or "downscale" (see inpaint.inpaint_regions).
+        log_audit: Hand the audit to audit_sink. Bulk callers (src/batch.py) pass False
+                   and write the returned audits themselves.
+        user: API user the document was redacted for; recorded in the audit (None from the CLI).
+        keep_layers: Directory to save the detections and inpainted base layer in (see
+                     save_layers), for later re-rendering with render_pipeline. Images only.
+        pseudonymizer: Real value -> dummy mapping (see src/pseudonym.py); defaults to
+                       default_pseudonymizer(). PDFs share one across all their pages.
     Returns:
-        Tuple of (redacted image path, audit log dict).
+        Tuple of (redacted result, audit log dict). The result is output_path when given,
+        otherwise encoded bytes for bytes input or a BGR ndarray for ndarray input.
+        PDFs return PDF bytes (or output_path) and a summary audit with one entry per page.
     """
+    if is_pdf(source):
+        return run_pdf_pipeline(source, output_path, doc_id=doc_id, mode=mode, model_path=model_path, workers=pdf_workers,
+                                inpaint_engine=inpaint_engine, log_audit=log_audit, user=user)
+    
     if not doc_id:
-        doc_id = os.path.basename(input_path)
+        doc_id = os.path.basename(source) if isinstance(source, str) else uuid.uuid4().hex
     
-    # Step 1: Detect and link PII, generate dummies
-    detections, links, dummies, _ = detect_and_link_pii(input_path)
+    # Every stage below records a span; timings end up in the audit record
+    with telemetry.trace() as timings, telemetry.span("total"):
+        # Steps 1-2: decode once, detect and link PII, generate dummies, inpaint the base layer
+        layers = prepare_layers(source, doc_id=doc_id, model_path=model_path, inpaint_engine=inpaint_engine,
+                                pseudonymizer=pseudonymizer)
+        if keep_layers:
+            save_layers(layers, keep_layers)
+        
+        # Step 3: Replace with dummies (or [Redacted]) over the base layer
+        redacted_img = render_layers(layers, mode)
+        bytes_input = isinstance(source, (bytes, bytearray, memoryview))
+        result = _emit(redacted_img, output_path, output_format if bytes_input else None)
     
-    # Convert integer keys to strings for MongoDB
-    dummies_str_keys = {str(k): v for k, v in dummies.items()}
-    links_str_keys = {str(k): v for k, v in links.items()}
+    # Step 4: Create audit log
+    audit = build_audit(layers, mode, output_path, timings, user=user)
+    if page is not None:
+        audit["page"] = page
+        audit["source_doc_id"] = source_doc_id
+    
+    # Hand off to the background writer: MongoDB insert and local backup happen off the request path
+    # (its write latency is tracked by the sink as mirrormask_audit_write_seconds)
+    if log_audit:
+        with telemetry.span("audit"):
+            audit_sink.submit(audit)
     
-    # Step 2: Inpaint and replace with dummies
-    redacted_path = inpaint_and_replace(input_path, detections, dummies, output_path, mode=mode)
+    return result, audit
+
+def prepare_layers(source, doc_id=None, model_path=DEFAULT_MODEL_PATH, inpaint_engine="telea", pseudonymizer=None):
+    """
+    Everything about one image that doesn't depend on the redaction mode: detections,
+    links, dummies and the inpainted base layer. render_layers turns these into a
+    redacted page in milliseconds, so a mode switch, a dummy edit or a detection
+    toggle never reruns detection, OCR, NER or inpainting.
+    Returns:
+        Dict with doc_id, base (inpainted BGR), crops (original pixels under each
+        detection, see inpaint.region_crops), detections, links, dummies,
+        inpaint_engine and model_path.
+    """
+    # Heavy stages (OpenCV, tesseract, spaCy, YOLO) are imported on first use
+    from src.detection.pii_detection_pipeline import detect_and_link_pii
+    from src.inpaint.inpaint import inpaint_regions, region_crops
+    
+    # Decoded once (and timed as "decode") inside detection; every stage below reuses that array
+    detections, links, dummies, img = detect_and_link_pii(source, model_path=model_path, pseudonymizer=pseudonymizer)
+    # Inpaint only padded crops around the PII regions (TELEA by default for smooth document results)
+    with telemetry.span("inpaint"):
+        base = inpaint_regions(img, detections, engine=inpaint_engine)
+    return {
+        "doc_id": doc_id or (os.path.basename(source) if isinstance(source, str) else uuid.uuid4().hex),
+        "base": base,
+        "crops": region_crops(img, detections),
+        "detections": detections,
+        "links": links,
+        "dummies": dummies,
+        "inpaint_engine": inpaint_engine,
+        "model_path": model_path
+    }
+
+def render_layers(layers, mode="Standard", dummies=None, disabled=()):
+    """
+    Redacted BGR page from prepare_layers output: only the text overlay is redrawn.
+    Args:
+        mode: "Standard" (dummies) or "Legal" ([Redacted]).
+        dummies: Edited dummy values {detection index: text}, merged over the generated ones.
+        disabled: Detection indices to leave unredacted.
+    """
+    from src.inpaint.inpaint import render_overlay
+    with telemetry.span("overlay"):
+        return render_overlay(layers["base"], layers["detections"], _merged_dummies(layers, dummies), mode,
+                              layers["crops"], set(disabled))
+
+def _merged_dummies(layers, dummies):
+    return {**layers["dummies"], **{int(k): v for k, v in (dummies or {}).items()}}
+
+def _emit(redacted_img, output_path, output_format):
+    # Output path -> written file; output_format -> encoded bytes; otherwise the array itself
+    with telemetry.span("encode"):
+        if output_path:
+            import cv2
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            cv2.imwrite(output_path, redacted_img)
+            return output_path
+        if output_format:
+            from src.image_io import encode_image
+            return encode_image(redacted_img, output_format)
+        return redacted_img
+
+def build_audit(layers, mode, output_path, timings, user=None, dummies=None, disabled=()):
+    """
+    JSON-serializable audit record of one rendering of layers.
+    """
+    detections = layers["detections"]
+    # Convert integer keys to strings for MongoDB
+    dummies_str_keys = {str(k): v for k, v in _merged_dummies(layers, dummies).items()}
+    links_str_keys = {str(k): v for k, v in layers["links"].items()}
+    telemetry.count("mirrormask_documents_total", mode=mode)
+    for det in detections:
+        telemetry.count("mirrormask_detections_total", type=det["type"])
     
-    # Step 3: Create audit log (JSON-serializable)
     audit = {
-        "doc_id": doc_id,
+        "doc_id": layers["doc_id"],
+        "user": user,
         "timestamp": datetime.now().isoformat(),
         "detections": [
             {
@@ -53,28 +173,188 @@ def run_pipeline(input_path, output_path, doc_id=None, mode="Standard"):
                 "pii": det["pii"]
             } for det in detections
         ],  # Deep copy to avoid numpy types
+        "pii_types": pii_types(detections),
         "links": links_str_keys,
         "dummies_used": dummies_str_keys,
         "redaction_mode": mode,
-        "output_path": redacted_path
+        "inpaint_engine": layers["inpaint_engine"],
+        "model": model_info(layers["model_path"]),  # Actual weights used, flags fallbacks
+        "output_path": output_path,
+        "timings_ms": {stage: round(ms, 2) for stage, ms in timings.items()}
     }
+    if disabled:
+        audit["disabled_detections"] = sorted(disabled)
+    return audit
+
+def render_pipeline(layers, output_path=None, mode="Standard", dummies=None, disabled=(), output_format=None,
+                    user=None, log_audit=True, rerender=True):
+    """
+    Render a document prepared earlier (prepare_layers / load_layers) with a mode,
+    edited dummies or detections switched off, and log the audit of that version.
+    rerender marks the audit as a re-rendering of an already redacted document.
+    Returns:
+        Tuple of (output_path, encoded bytes when output_format is given, or BGR ndarray; audit).
+    """
+    with telemetry.trace() as timings, telemetry.span("total"):
+        redacted_img = render_layers(layers, mode, dummies, disabled)
+        result = _emit(redacted_img, output_path, output_format)
+    audit = build_audit(layers, mode, output_path, timings, user=user, dummies=dummies, disabled=disabled)
+    audit["rerender"] = rerender
+    if log_audit:
+        with telemetry.span("audit"):
+            audit_sink.submit(audit)
+    return result, audit
+
+def _json_default(value):
+    # numpy scalars and arrays in detections
+    return value.tolist() if hasattr(value, "tolist") else str(value)
+
+def save_layers(layers, directory):
+    """
+    Persist prepare_layers output: base.png (lossless), crops.npz and layers.json.
+    """
+    import cv2
+    import numpy as np
+    os.makedirs(directory, exist_ok=True)
+    cv2.imwrite(os.path.join(directory, "base.png"), layers["base"])
+    arrays = {}
+    for idx, (rect, pixels) in layers["crops"].items():
+        arrays[f"rect_{idx}"] = np.asarray(rect)
+        arrays[f"pixels_{idx}"] = pixels
+    np.savez(os.path.join(directory, "crops.npz"), **arrays)
+    meta = {k: layers[k] for k in ("doc_id", "detections", "inpaint_engine", "model_path")}
+    meta["links"] = {str(k): v for k, v in layers["links"].items()}
+    meta["dummies"] = {str(k): v for k, v in layers["dummies"].items()}
+    with open(os.path.join(directory, "layers.json"), "w") as f:
+        json.dump(meta, f, default=_json_default)
+
+def load_layers(directory):
+    """
+    Inverse of save_layers.
+    """
+    import cv2
+    import numpy as np
+    with open(os.path.join(directory, "layers.json")) as f:
+        layers = json.load(f)
+    layers["links"] = {int(k): v for k, v in layers["links"].items()}
+    layers["dummies"] = {int(k): v for k, v in layers["dummies"].items()}
+    layers["base"] = cv2.imread(os.path.join(directory, "base.png"))
+    if layers["base"] is None:
+        raise ValueError(f"No saved layers in {directory}")
+    with np.load(os.path.join(directory, "crops.npz")) as arrays:
+        layers["crops"] = {int(key[len("pixels_"):]): (tuple(int(v) for v in arrays[f"rect_{key[len('pixels_'):]}"]), arrays[key])
+                           for key in arrays.files if key.startswith("pixels_")}
+    return layers
+
+def pii_types(detections):
+    # Flat, indexable list of what was found: visual classes (signature, photo, ...) plus
+    # the entity types of text hits (NAME, AADHAAR, ...); see src/audit/query.py
+    types = {det["type"] for det in detections if det["type"] != "text"}
+    types.update(pii_type for det in detections for _, pii_type in det["pii"])
+    return sorted(types)
+
+def _sum_timings(audits):
+    totals = {}
+    for audit in audits:
+        for stage, ms in audit.get("timings_ms", {}).items():
+            totals[stage] = round(totals.get(stage, 0.0) + ms, 2)
+    return totals
+
+def _redact_page(img, doc_id, mode, model_path, page, page_format, inpaint_engine, log_audit, user, pseudonym_key):
+    # Page worker: redact one rasterized page and return it compressed for PdfWriter.
+    # Every page of the document runs in the keyed scope of pseudonym_key, so a value
+    # gets the same dummy on every page, whichever worker process redacts it.
+    from src.pseudonym import keyed_pseudonymizer
+    redacted_img, audit = run_pipeline(img, doc_id=f"{doc_id}_p{page:04d}", mode=mode, model_path=model_path,
+                                       page=page, source_doc_id=doc_id, inpaint_engine=inpaint_engine,
+                                       log_audit=log_audit, user=user, pseudonymizer=keyed_pseudonymizer(pseudonym_key))
+    return encode_page(redacted_img, page_format), audit
+
+def run_pdf_pipeline(source, output_path=None, doc_id=None, mode="Standard", model_path=DEFAULT_MODEL_PATH,
+                     workers=None, page_format="jpeg", inpaint_engine="telea", log_audit=True, user=None):
+    """
+    Redact a multi-page PDF with bounded memory.
+    Pages are rasterized lazily, redacted on a pool of worker processes and written to
+    the output PDF in order as they complete. At most 2 x workers pages are in flight,
+    so peak memory depends on the worker count, not the page count.
+    Args:
+        source: PDF path or bytes.
+        output_path: Path for the redacted PDF. If None, PDF bytes are returned.
+        doc_id: Document id (defaults to filename or a random id); pages get <doc_id>_pNNNN.
+        mode: "Standard" or "Legal".
+        model_path: YOLO weights.
+        workers: Page worker processes (default: min(4, CPUs)); 1 runs pages in-process.
+        page_format: "jpeg" (compact) or "flate" (lossless) page images.
+        inpaint_engine: Inpainting engine for every page.
+        log_audit: Submit each page audit to audit_sink (see run_pipeline).
+        user: Recorded in the summary and every page audit.
+    Returns:
+        Tuple of (output_path or PDF bytes, summary audit with per-page audits).
+    """
+    import io
+    import multiprocessing
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
     
-    # Store in MongoDB
-    try:
-        audits_collection.insert_one(audit.copy())  # Use copy to avoid modifying original
-        print(f"Audit inserted to MongoDB for {doc_id}")
-    except Exception as e:
-        print(f"MongoDB insert failed: {e}. Saving locally only.")
+    if not doc_id:
+        doc_id = os.path.basename(source) if isinstance(source, str) else uuid.uuid4().hex
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    # One mapping for the whole document: the batch key when set, else a random key for this PDF
+    pseudonym_key = os.getenv("MIRRORMASK_PSEUDONYM_KEY") or os.urandom(32)
+    
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        out = open(output_path, "wb")
+    else:
+        out = io.BytesIO()
+    writer = PdfWriter(out)
+    page_audits = []
+    
+    def write(encoded, size, page_audit):
+        writer.add_page(encoded, size)
+        page_audits.append(page_audit)
     
-    # Save local JSON backup
-    audit_dir = "audit"
-    os.makedirs(audit_dir, exist_ok=True)
-    audit_path = os.path.join(audit_dir, f"{doc_id}_audit.json")
     try:
-        with open(audit_path, "w") as f:
-            json.dump(audit, f, indent=4)
-        print(f"Audit saved locally: {audit_path}")
-    except Exception as e:
-        print(f"Failed to save audit JSON: {e}")
+        if workers <= 1:
+            for page, (img, size) in enumerate(iter_pages(source), start=1):
+                encoded, page_audit = _redact_page(img, doc_id, mode, model_path, page, page_format, inpaint_engine,
+                                                   log_audit, user, pseudonym_key)
+                del img
+                write(encoded, size, page_audit)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=init_worker, initargs=(model_path,))
+            try:
+                in_flight = deque()
+                for page, (img, size) in enumerate(iter_pages(source), start=1):
+                    if len(in_flight) >= 2 * workers:
+                        future, done_size = in_flight.popleft()
+                        encoded, page_audit = future.result()
+                        write(encoded, done_size, page_audit)
+                    in_flight.append((executor.submit(_redact_page, img, doc_id, mode, model_path, page, page_format,
+                                                      inpaint_engine, log_audit, user, pseudonym_key), size))
+                    del img
+                while in_flight:
+                    future, done_size = in_flight.popleft()
+                    encoded, page_audit = future.result()
+                    write(encoded, done_size, page_audit)
+            finally:
+                executor.shutdown(cancel_futures=True)
+        writer.close()
+    finally:
+        if output_path:
+            out.close()
     
-    return redacted_path, audit
\ No newline at end of file
+    audit = {
+        "doc_id": doc_id,
+        "user": user,
+        "timestamp": datetime.now().isoformat(),
+        "page_count": len(page_audits),
+        "pii_types": sorted({t for page_audit in page_audits for t in page_audit["pii_types"]}),
+        "redaction_mode": mode,
+        "output_path": output_path,
+        "timings_ms": _sum_timings(page_audits),
+        "pages": page_audits
+    }
+    return (output_path if output_path else out.getvalue()), audit
@@ -0,0 +1,239 @@
+import hashlib
+import hmac
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from src.resources import get_faker
+
+POOL_SIZE = 256       # Dummies kept ready per PII type
+REFILL_BELOW = 64     # Background top-up starts when a pool drops under this
+KEYED_CACHE_SIZE = 100_000  # Keyed mappings kept per process (they can always be recomputed)
+KEYED_TABLE_SIZE = 4096     # Distinct dummies per PII type that keyed scopes draw from
+KEYED_TABLE_SEED = 20240601  # Same seed in every process, so every process builds the same tables
+KEYED_SCOPES = 8            # Keyed Pseudonymizers kept per process (batch key, in-flight PDFs)
+
+GENERATORS = {
+    "NAME": lambda fake: fake.name(),
+    "ADDRESS": lambda fake: fake.address().replace('\n', ', '),
+    "PHONE": lambda fake: fake.numerify('##########'),
+    "DATE": lambda fake: fake.date(pattern='%d-%m-%Y'),
+    "AADHAAR": lambda fake: fake.numerify('#### #### ####'),
+    "PAN": lambda fake: fake.bothify('?????####?', letters='ABCDEFGHIJKLMNOPQRSTUVWXYZ'),
+    "PINCODE": lambda fake: fake.numerify('%#####')
+}
+
+NON_DIGIT_RE = re.compile(r"\D")
+NON_ALNUM_RE = re.compile(r"[^0-9A-Za-z]")
+SPACES_RE = re.compile(r"\s+")
+
+def normalize(value, pii_type):
+    """
+    Canonical form of a real value, so "JOHN  DOE" and "John Doe", or "98765 43210"
+    and "9876543210", get the same pseudonym.
+    """
+    if pii_type in ("PHONE", "AADHAAR", "DATE", "PINCODE"):
+        return NON_DIGIT_RE.sub("", value)
+    if pii_type == "PAN":
+        return NON_ALNUM_RE.sub("", value).upper()
+    return SPACES_RE.sub(" ", value).strip(" .,;:").casefold()
+
+class DummyPool:
+    """
+    Pre-generated dummies per PII type. take() pops a ready value; when a pool runs
+    low a daemon thread tops it up with its own Faker instance, so Faker's slow name
+    and address providers stay off the detection path.
+    table() is the keyed counterpart: a fixed list of distinct dummies, generated once
+    from a constant seed, so every process indexes the same values.
+    """
+
+    def __init__(self, size=POOL_SIZE, refill_below=REFILL_BELOW, table_size=KEYED_TABLE_SIZE):
+        self.size = size
+        self.refill_below = refill_below
+        self.table_size = table_size
+        self.pools = {pii_type: deque() for pii_type in GENERATORS}
+        self.tables = {}
+        self.refilling = set()
+        self.lock = threading.Lock()
+        self.table_lock = threading.Lock()
+        self.fake = None
+
+    def _refill(self, pii_type):
+        try:
+            if self.fake is None:
+                from faker import Faker
+                self.fake = Faker()
+            pool, generate = self.pools[pii_type], GENERATORS[pii_type]
+            while len(pool) < self.size:
+                pool.append(generate(self.fake))
+        finally:
+            with self.lock:
+                self.refilling.discard(pii_type)
+
+    def _refill_async(self, pii_type):
+        with self.lock:
+            if pii_type in self.refilling:
+                return
+            self.refilling.add(pii_type)
+        threading.Thread(target=self._refill, args=(pii_type,), name=f"dummy-pool-{pii_type}", daemon=True).start()
+
+    def fill(self, tables=False):
+        """
+        Start filling every pool (and with tables, building every keyed table) in the
+        background (call at worker startup).
+        """
+        for pii_type in GENERATORS:
+            self._refill_async(pii_type)
+        if tables:
+            threading.Thread(target=lambda: [self.table(t) for t in GENERATORS], name="dummy-tables", daemon=True).start()
+
+    def table(self, pii_type):
+        """
+        Deterministic, duplicate-free dummies for pii_type (built on first use).
+        """
+        table = self.tables.get(pii_type)
+        if table is not None:
+            return table
+        with self.table_lock:
+            if pii_type not in self.tables:
+                from faker import Faker
+                fake = Faker()
+                fake.seed_instance(KEYED_TABLE_SEED)
+                generate = GENERATORS[pii_type]
+                self.tables[pii_type] = list(dict.fromkeys(generate(fake) for _ in range(self.table_size)))
+            return self.tables[pii_type]
+
+    def take(self, pii_type):
+        pool = self.pools[pii_type]
+        try:
+            value = pool.popleft()
+        except IndexError:
+            value = None
+        if len(pool) < self.refill_below:
+            self._refill_async(pii_type)
+        if value is None:
+            value = GENERATORS[pii_type](get_faker())  # Pool empty: generate inline this once
+        return value
+
+# Process-wide pool shared by every Pseudonymizer
+dummy_pool = DummyPool()
+
+class Pseudonymizer:
+    """
+    Keyed, stable, one-to-one mapping from real PII values to dummies.
+    The mapping is indexed by HMAC(key, type|normalized value), so it never holds the
+    real values. Two scopes:
+      - document (default): random key, dummies drawn from dummy_pool; one instance
+        per document keeps every repeat of a value consistent within it.
+      - keyed: the HMAC picks the dummy's slot in dummy_pool.table(), so the same value
+        maps to the same dummy in every document, worker and run that shares the key
+        (e.g. a whole batch, legal bundle, or the pages of one PDF).
+    A reverse map keeps two real values from sharing a dummy within an instance. Across
+    processes, keyed dummies agree except when two values hash to the same slot and
+    the processes saw them in a different order (rare: tables hold KEYED_TABLE_SIZE).
+    """
+
+    def __init__(self, key=None, keyed=False, pool=None):
+        if keyed and not key:
+            raise ValueError("A keyed Pseudonymizer needs a key")
+        self.key = key.encode() if isinstance(key, str) else (key or os.urandom(32))
+        self.keyed = keyed
+        self.pool = pool or dummy_pool
+        self.mapping = OrderedDict()  # digest -> (pii_type, dummy)
+        self.owners = {}  # (pii_type, dummy) -> digest, the reverse map
+        self.lock = threading.Lock()
+        self.fake = None
+
+    @property
+    def scope(self):
+        # Cache-key component: keyed mappings differ per key, document ones are interchangeable
+        return "keyed:" + hashlib.sha256(self.key).hexdigest()[:12] if self.keyed else "document"
+
+    def digest(self, value, pii_type):
+        message = f"{pii_type}|{normalize(value, pii_type)}".encode()
+        return hmac.new(self.key, message, hashlib.sha256).hexdigest()
+
+    def _free(self, pii_type, dummy, digest):
+        return self.owners.get((pii_type, dummy), digest) == digest
+
+    def _keyed_dummy(self, pii_type, digest):
+        # Linear probing from the HMAC's slot; a taken slot is skipped, never shared
+        table = self.pool.table(pii_type)
+        start = int(digest[:16], 16)
+        for i in range(len(table)):
+            dummy = table[(start + i) % len(table)]
+            if self._free(pii_type, dummy, digest):
+                return dummy
+        # Table exhausted in this scope: fall back to a Faker seeded from the HMAC
+        if self.fake is None:
+            from faker import Faker
+            self.fake = Faker()
+        for attempt in range(100):
+            self.fake.seed_instance(int(digest[:16], 16) + attempt)
+            dummy = GENERATORS[pii_type](self.fake)
+            if self._free(pii_type, dummy, digest):
+                return dummy
+        return dummy
+
+    def _pooled_dummy(self, pii_type, digest):
+        for _ in range(5):
+            dummy = self.pool.take(pii_type)
+            if self._free(pii_type, dummy, digest):
+                return dummy
+        return dummy
+
+    def pseudonym(self, value, pii_type):
+        if pii_type not in GENERATORS:
+            return "[Redacted]"
+        digest = self.digest(value, pii_type)
+        with self.lock:
+            entry = self.mapping.get(digest)
+            if entry is not None:
+                self.mapping.move_to_end(digest)
+                return entry[1]
+            dummy = self._keyed_dummy(pii_type, digest) if self.keyed else self._pooled_dummy(pii_type, digest)
+            self.mapping[digest] = (pii_type, dummy)
+            self.owners[(pii_type, dummy)] = digest
+            if self.keyed and len(self.mapping) > KEYED_CACHE_SIZE:
+                _, evicted = self.mapping.popitem(last=False)  # Keyed dummies are recomputable
+                del self.owners[evicted]
+        return dummy
+
+_keyed_pseudonymizers = OrderedDict()
+_keyed_lock = threading.Lock()
+
+def keyed_pseudonymizer(key):
+    """
+    Shared keyed Pseudonymizer for key, so every page or document using the key in
+    this process also shares the reverse map.
+    """
+    key = key.encode() if isinstance(key, str) else key
+    with _keyed_lock:
+        pseudonymizer = _keyed_pseudonymizers.get(key)
+        if pseudonymizer is None:
+            pseudonymizer = _keyed_pseudonymizers[key] = Pseudonymizer(key, keyed=True)
+            if len(_keyed_pseudonymizers) > KEYED_SCOPES:
+                _keyed_pseudonymizers.popitem(last=False)
+        _keyed_pseudonymizers.move_to_end(key)
+        return pseudonymizer
+
+def default_pseudonymizer():
+    """
+    Pseudonymizer for one document. With MIRRORMASK_PSEUDONYM_KEY set, every document
+    in the process (and every process with that key) shares one keyed mapping instead.
+    """
+    key = os.getenv("MIRRORMASK_PSEUDONYM_KEY")
+    if not key:
+        return Pseudonymizer()
+    return keyed_pseudonymizer(key)
+
+def generate_dummy(pii_type, value=None, pseudonymizer=None):
+    """
+    Dummy for a PII value. With value, the same (normalized) value always gets the
+    same dummy from pseudonymizer; without, a fresh pooled dummy.
+    """
+    if pii_type not in GENERATORS:
+        return "[Redacted]"
+    if value is None:
+        return dummy_pool.take(pii_type)
+    return (pseudonymizer or default_pseudonymizer()).pseudonym(value, pii_type)
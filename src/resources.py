@@ -0,0 +1,44 @@
+import os
+import threading
+from functools import wraps
+
+def lazy_resource(factory):
+    """
+    Create the resource on first call, then return the same instance for the rest of
+    the process. Thread-safe, so concurrent first calls don't load it twice.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    get.loaded = lambda: bool(instance)
+    return get
+
+@lazy_resource
+def get_nlp():
+    import spacy
+    # Only NER is used; tagger/parser/lemmatizer are excluded so they never run or load
+    return spacy.load("en_core_web_sm", exclude=["tagger", "parser", "attribute_ruler", "lemmatizer"])
+
+@lazy_resource
+def get_faker():
+    from faker import Faker
+    return Faker()
+
+@lazy_resource
+def get_audits_collection():
+    import pymongo
+    from dotenv import load_dotenv
+    load_dotenv()
+    mongodb_uri = os.getenv("MONGODB_URI")
+    if not mongodb_uri:
+        raise ValueError("MONGODB_URI not set in .env")
+    client = pymongo.MongoClient(mongodb_uri)
+    return client["mirrormask_db"]["audits"]
@@ -0,0 +1,155 @@
+import contextlib
+import os
+import threading
+import time
+
+# MIRRORMASK_TELEMETRY=0 turns spans and counters into no-ops
+ENABLED = os.getenv("MIRRORMASK_TELEMETRY", "1") != "0"
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Seconds
+
+METRIC_HELP = {
+    "mirrormask_stage_seconds": ("histogram", "Wall time per pipeline stage"),
+    "mirrormask_audit_write_seconds": ("histogram", "MongoDB insert_many latency per audit batch"),
+    "mirrormask_documents_total": ("counter", "Documents redacted"),
+    "mirrormask_detections_total": ("counter", "Detections by type"),
+    "mirrormask_cache_lookups_total": ("counter", "Detection cache lookups by result"),
+    "mirrormask_queue_depth": ("gauge", "Jobs running or waiting in the API queue")
+}
+
+_local = threading.local()
+_NULL_SPAN = contextlib.nullcontext()
+
+class Registry:
+    """
+    Process-local counters and histograms. snapshot() is a plain picklable dict, so
+    worker processes can ship theirs to the API process to be merged in render().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, buckets=STAGE_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(buckets):
+                if seconds <= bound:
+                    hist["counts"][i] += 1
+                    break
+            hist["sum"] += seconds
+            hist["count"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {k: dict(v, counts=list(v["counts"])) for k, v in self.histograms.items()}
+            }
+
+registry = Registry()
+
+@contextlib.contextmanager
+def _span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = getattr(_local, "timings", None)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed * 1000
+        registry.observe("mirrormask_stage_seconds", elapsed, stage=name)
+
+def span(name):
+    """
+    Time a stage: `with span("yolo"): ...`. The duration goes into the stage histogram
+    and, inside trace(), into that trace's timings. Disabled, this returns a shared
+    no-op context, so the cost is one function call.
+    """
+    return _span(name) if ENABLED else _NULL_SPAN
+
+@contextlib.contextmanager
+def trace():
+    """
+    Collect the spans of one document on this thread.
+    Yields:
+        {stage: milliseconds} filled in as spans finish (empty when disabled).
+    """
+    previous = getattr(_local, "timings", None)
+    timings = {}
+    _local.timings = timings if ENABLED else None
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+def count(name, value=1, **labels):
+    if ENABLED:
+        registry.inc(name, value, **labels)
+
+def observe(name, seconds, **labels):
+    if ENABLED:
+        registry.observe(name, seconds, **labels)
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+def render(snapshots, gauges=None):
+    """
+    Merge registry snapshots (this process and the workers') into Prometheus text format.
+    Args:
+        snapshots: Iterable of Registry.snapshot() dicts.
+        gauges: Optional {name: value} for point-in-time values such as queue depth.
+    """
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for key, value in snap["counters"].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, hist in snap["histograms"].items():
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = dict(hist, counts=list(hist["counts"]))
+                continue
+            merged["counts"] = [a + b for a, b in zip(merged["counts"], hist["counts"])]
+            merged["sum"] += hist["sum"]
+            merged["count"] += hist["count"]
+
+    lines = []
+    declared = set()
+
+    def declare(name, default_type):
+        if name not in declared:
+            declared.add(name)
+            kind, text = METRIC_HELP.get(name, (default_type, name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        declare(name, "counter")
+        lines.append(f"{name}{_labels(labels)} {value}")
+    for (name, labels), hist in sorted(histograms.items()):
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, n in zip(hist["buckets"], hist["counts"]):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {hist['count']}")
+        lines.append(f"{name}_sum{_labels(labels)} {hist['sum']}")
+        lines.append(f"{name}_count{_labels(labels)} {hist['count']}")
+    for name, value in sorted((gauges or {}).items()):
+        declare(name, "gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,2 @@
+# test_db.py is a manual MongoDB connectivity script (runs at import), not a pytest module
+collect_ignore = ["test_db.py"]
@@ -0,0 +1,75 @@
+import pytest
+from src.audit.query import encode_cursor, decode_cursor, build_filter, build_projection, find_page, InvalidQuery
+
+def test_cursor_round_trip():
+    record = {"timestamp": "2026-01-02T03:04:05.123456", "_id": "abc123", "doc_id": "x"}
+    cursor = encode_cursor(record)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor  # Safe in a query string
+    assert decode_cursor(cursor) == {"$or": [
+        {"timestamp": {"$lt": "2026-01-02T03:04:05.123456"}},
+        {"timestamp": "2026-01-02T03:04:05.123456", "_id": {"$lt": "abc123"}}
+    ]}
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor!", "e30", ""])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+def test_filter_combines_clauses():
+    assert build_filter() == {}
+    assert build_filter(user="user1") == {"user": "user1"}
+    assert build_filter(user="user1", pii_type="AADHAAR", since="2026-01-01") == {"$and": [
+        {"user": "user1"}, {"timestamp": {"$gte": "2026-01-01T00:00:00"}}, {"pii_types": "AADHAAR"}
+    ]}
+
+def test_filter_rejects_bad_timestamp():
+    with pytest.raises(ValueError, match="since"):
+        build_filter(since="yesterday")
+
+def test_projection_always_keeps_cursor_fields():
+    assert build_projection(None) is None
+    assert build_projection("doc_id, pii_types") == {"doc_id": 1, "pii_types": 1, "_id": 1, "timestamp": 1}
+
+class FakeCursor:
+    def __init__(self, records):
+        self.records = records
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self.records.sort(key=lambda r: str(r[key]), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        return iter(self.records[:n])
+
+class FakeCollection:
+    def __init__(self, records):
+        self.records = records
+
+    def find(self, filters, projection=None):
+        return FakeCursor([dict(r) for r in self.records])
+
+def test_object_id_cursor_round_trip():
+    bson = pytest.importorskip("bson")
+    oid = bson.ObjectId("65f1a2b3c4d5e6f708192a3b")
+    after = decode_cursor(encode_cursor({"timestamp": "2026-01-01T00:00:00", "_id": oid}))
+    assert after["$or"][1]["_id"] == {"$lt": oid}  # Compared as an ObjectId, like the stored value
+
+def test_find_page_stringifies_ids():
+    class ObjectIdLike:  # Stands in for bson.ObjectId: not JSON-serializable
+        def __init__(self, hex_id):
+            self.hex_id = hex_id
+
+        def __str__(self):
+            return self.hex_id
+
+    ids = ["65f1a2b3c4d5e6f708192a3b", "65f1a2b3c4d5e6f708192a3c", "65f1a2b3c4d5e6f708192a3d"]
+    collection = FakeCollection([{"_id": ObjectIdLike(i), "timestamp": f"2026-01-0{n + 1}T00:00:00"} for n, i in enumerate(ids)])
+    records, cursor = find_page(collection, {}, limit=2)
+    assert [r["_id"] for r in records] == [ids[2], ids[1]]
+    assert cursor == encode_cursor({"timestamp": "2026-01-02T00:00:00", "_id": ids[1]})
+
+def test_invalid_query_is_a_value_error():
+    with pytest.raises(InvalidQuery):
+        decode_cursor("%%%")
+    assert issubclass(InvalidQuery, ValueError)
@@ -0,0 +1,56 @@
+import glob
+import os
+import time
+import pytest
+from src.audit.store import AuditLog, _read_index
+
+def records(n, prefix="doc"):
+    return [{"doc_id": f"{prefix}{i}", "n": i} for i in range(n)]
+
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_round_trip_across_rotated_segments(tmp_path, compression):
+    log = AuditLog(str(tmp_path), max_bytes=200, compression=compression)
+    for record in records(20):
+        log.append(record)
+    log.close()
+    assert len(glob.glob(str(tmp_path / "audit-*.idx"))) > 1
+    assert list(log.iter_records()) == records(20)
+    if compression == "gzip":
+        assert not glob.glob(str(tmp_path / "audit-*.jsonl"))  # Raw segments replaced by .jsonl.gz
+
+def test_find_uses_index_and_keeps_every_version(tmp_path):
+    log = AuditLog(str(tmp_path), max_bytes=300, compression="gzip")
+    log.append_many(records(10))
+    log.append({"doc_id": "doc3", "n": "again"})
+    assert [r["n"] for r in log.find("doc3")] == [3, "again"]  # Active segment, plain offsets
+    log.close()
+    assert [r["n"] for r in log.find("doc3")] == [3, "again"]  # Compressed blocks
+    assert log.find("missing") == []
+
+def test_index_points_into_compressed_segment(tmp_path):
+    log = AuditLog(str(tmp_path), compression="gzip")
+    log.append_many(records(3))
+    log.close()
+    (index_path,) = glob.glob(str(tmp_path / "audit-*.idx"))
+    header, entries = _read_index(index_path)
+    assert header["segment"].endswith(".jsonl.gz")
+    assert [entry[0] for entry in entries] == ["doc0", "doc1", "doc2"]
+    assert all(entry[2] > 0 for entry in entries)  # Block length set once compressed
+
+def test_orphaned_raw_segment_is_closed_by_next_writer(tmp_path, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(os, "getpid", lambda: 1)  # Another process...
+        crashed = AuditLog(str(tmp_path), compression="gzip")
+        crashed.append_many(records(2, "old"))
+    crashed.file.close()  # ...killed without close()
+    crashed.index_file.close()
+    old = time.time() - 3600
+    for path in glob.glob(str(tmp_path / "audit-*")):
+        os.utime(path, (old, old))
+
+    log = AuditLog(str(tmp_path), compression="gzip", orphan_age=60)
+    log.append({"doc_id": "new"})
+    assert not glob.glob(str(tmp_path / "audit-*-1-*.jsonl"))
+    assert glob.glob(str(tmp_path / "audit-*-1-*.jsonl.gz"))
+    assert [r["n"] for r in log.find("old1")] == [1]
+    log.close()
@@ -0,0 +1,27 @@
+import numpy as np
+from src.detection.evaluation import load_labels, label_path, match, detection_map
+
+GT = (np.array([[0, 0, 10, 10], [20, 20, 40, 40]], dtype=float), np.array([0, 1]))
+
+def test_load_labels_to_pixels(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("1 0.5 0.5 0.2 0.4\n")
+    boxes, classes = load_labels(str(path), 100, 50)
+    assert boxes.tolist() == [[40, 15, 60, 35]]
+    assert classes.tolist() == [1]
+    boxes, classes = load_labels(str(tmp_path / "missing.txt"), 100, 50)
+    assert boxes.shape == (0, 4) and classes.shape == (0,)
+
+def test_label_path_defaults_to_sibling_labels_dir():
+    assert label_path("/d/val/images/x.png") == "/d/val/labels/x.txt"
+
+def test_match_is_one_to_one_and_confidence_first():
+    boxes = np.array([[0, 0, 10, 10], [1, 0, 10, 10], [20, 20, 40, 40]], dtype=float)
+    hits = match(boxes, np.array([0, 0, 0]), np.array([0.5, 0.9, 0.8]), *GT)
+    assert hits.tolist() == [False, True, False]  # Duplicate loses to the higher score; wrong class never matches
+
+def test_detection_map():
+    perfect = [(GT[0].copy(), GT[1].copy(), np.array([0.9, 0.8]))]
+    assert detection_map(perfect, [GT]) == {"mAP_0.5": 1.0, "mAP_0.5:0.95": 1.0}
+    half = [(np.array([[0, 0, 10, 10], [50, 50, 60, 60]], dtype=float), np.array([0, 1]), np.array([0.9, 0.8]))]
+    assert detection_map(half, [GT]) == {"mAP_0.5": 0.5, "mAP_0.5:0.95": 0.5}
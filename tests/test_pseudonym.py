@@ -0,0 +1,21 @@
+from src.pseudonym import Pseudonymizer, DummyPool, keyed_pseudonymizer
+
+def test_document_scope_is_stable_per_normalized_value():
+    p = Pseudonymizer()
+    assert p.pseudonym("John  Doe", "NAME") == p.pseudonym("john doe", "NAME")
+    assert p.pseudonym("98765 43210", "PHONE") == p.pseudonym("9876543210", "PHONE")
+
+def test_keyed_scope_agrees_across_instances():
+    a, b = Pseudonymizer("secret", keyed=True), Pseudonymizer("secret", keyed=True)
+    assert a.pseudonym("Asha Rao", "NAME") == b.pseudonym("Asha Rao", "NAME")
+    assert a.pseudonym("Asha Rao", "NAME") in a.pool.table("NAME")
+    assert keyed_pseudonymizer("secret") is keyed_pseudonymizer(b"secret")
+
+def test_keyed_scope_stays_one_to_one_when_slots_collide():
+    pool = DummyPool()
+    pool.tables["PINCODE"] = ["111111", "222222"]
+    p = Pseudonymizer("k", keyed=True, pool=pool)
+    dummies = [p.pseudonym(str(100000 + i), "PINCODE") for i in range(5)]
+    assert len(set(dummies)) == 5
+    assert set(dummies[:2]) == {"111111", "222222"}  # Table first, Faker fallback once it is exhausted
+    assert p.pseudonym("100003", "PINCODE") == dummies[3]
@@ -0,0 +1,45 @@
+from src.detection.recognizers import verhoeff_valid, scan, line_spans
+
+VALID_AADHAAR = "2341 2341 2346"    # Passes the Verhoeff checksum
+INVALID_AADHAAR = "2341 2341 2345"  # Last digit off by one
+
+def test_verhoeff_accepts_valid_numbers():
+    assert verhoeff_valid("2363")  # Textbook example: 236 with check digit 3
+    assert verhoeff_valid(VALID_AADHAAR.replace(" ", ""))
+
+def test_verhoeff_rejects_single_digit_errors_and_transpositions():
+    assert not verhoeff_valid("2364")
+    assert not verhoeff_valid(INVALID_AADHAAR.replace(" ", ""))
+    assert not verhoeff_valid("3241 2341 2346".replace(" ", ""))
+
+def test_aadhaar_with_valid_checksum_needs_no_context():
+    assert scan(f"No. {VALID_AADHAAR}", aadhaar_check="checksum") == [(VALID_AADHAAR, "AADHAAR", 4, 18)]
+
+def test_aadhaar_with_bad_checksum_needs_context():
+    text = f"Ref {INVALID_AADHAAR}"
+    assert [hit[1] for hit in scan(text, aadhaar_check="context")] != ["AADHAAR"]
+    assert scan(f"Aadhaar: {INVALID_AADHAAR}", aadhaar_check="context")[0][:2] == (INVALID_AADHAAR, "AADHAAR")
+    assert scan(f"UID {INVALID_AADHAAR}", aadhaar_check="context")[0][1] == "AADHAAR"
+
+def test_aadhaar_checksum_ignores_context_and_off_accepts_anything():
+    assert all(hit[1] != "AADHAAR" for hit in scan(f"Aadhaar: {INVALID_AADHAAR}", aadhaar_check="checksum"))
+    assert scan(f"Ref {INVALID_AADHAAR}", aadhaar_check="off")[0][1] == "AADHAAR"
+
+def test_pincode_needs_address_context():
+    assert scan("Pin 560001") == [("560001", "PINCODE", 4, 10)]
+    assert scan("PIN code: 560 001")[0][:2] == ("560 001", "PINCODE")
+    assert scan("Koramangala, Bengaluru 560034")[0][:2] == ("560034", "PINCODE")
+    assert scan("Invoice 560001") == []
+
+def test_line_spans_merge_words_of_one_hit():
+    words = [{"text": t, "abs_bbox": [x, 10, x + 40, 30]} for t, x in (("Aadhaar:", 0), ("2341", 50), ("2341", 100), ("2346", 150))]
+    line = {"words": words, "offsets": [(0, 8), (9, 13), (14, 18), (19, 23)]}
+    spans = line_spans(line, scan("Aadhaar: " + VALID_AADHAAR))
+    assert len(spans) == 1
+    assert spans[0]["type"] == "AADHAAR"
+    assert spans[0]["abs_bbox"] == [50, 10, 190, 30]
+
+def test_aadhaar_default_is_checksum_only():
+    assert scan(f"Ref {VALID_AADHAAR}")[0][1] == "AADHAAR"
+    assert all(hit[1] != "AADHAAR" for hit in scan(f"Aadhaar: {INVALID_AADHAAR}"))
+    assert scan(f"Aadhaar: {INVALID_AADHAAR}", aadhaar_check="strict") == scan(f"Aadhaar: {INVALID_AADHAAR}", aadhaar_check="checksum")
@@ -0,0 +1,47 @@
+import numpy as np
+from src.detection.tiling import merge_boxes, make_tiles
+
+def test_iou_duplicates_keep_highest_score():
+    boxes = np.array([[0, 0, 100, 50], [200, 0, 300, 50], [1, 0, 101, 50]], dtype=np.float32)
+    keep, merged = merge_boxes(boxes, np.array([0, 0, 0]), np.array([0.6, 0.7, 0.9]))
+    assert keep.tolist() == [2, 1]
+    assert merged[2].tolist() == [1, 0, 101, 50]  # Same-size duplicate: suppressed, not merged
+
+def test_near_duplicate_slightly_larger_box_is_covered():
+    boxes = np.array([[0, 0, 100, 50], [2, 1, 101, 51]], dtype=np.float32)
+    keep, merged = merge_boxes(boxes, np.array([0, 0]), np.array([0.6, 0.9]))
+    assert keep.tolist() == [1]
+    assert merged[1].tolist() == [0, 0, 101, 51]
+
+def test_lower_scoring_fragment_is_dropped():
+    boxes = np.array([[0, 0, 200, 50], [150, 0, 200, 50]], dtype=np.float32)
+    keep, merged = merge_boxes(boxes, np.array([0, 0]), np.array([0.9, 0.5]))
+    assert keep.tolist() == [0]
+    assert merged[0].tolist() == [0, 0, 200, 50]
+
+def test_fragment_outscoring_complete_box_grows_to_cover_it():
+    # A seam fragment scores higher than the whole-page box of the same signature
+    boxes = np.array([[0, 0, 200, 50], [150, 0, 200, 50]], dtype=np.float32)
+    keep, merged = merge_boxes(boxes, np.array([0, 0]), np.array([0.5, 0.9]))
+    assert keep.tolist() == [1]
+    assert merged[1].tolist() == [0, 0, 200, 50]
+
+def test_classes_are_merged_separately():
+    boxes = np.array([[0, 0, 200, 50], [150, 0, 200, 50]], dtype=np.float32)
+    keep, _ = merge_boxes(boxes, np.array([0, 1]), np.array([0.5, 0.9]))
+    assert sorted(keep.tolist()) == [0, 1]
+
+def test_containment_one_is_plain_nms():
+    boxes = np.array([[0, 0, 200, 50], [150, 0, 200, 50]], dtype=np.float32)
+    keep, merged = merge_boxes(boxes, np.array([0, 0]), np.array([0.5, 0.9]), containment=1.0)
+    assert sorted(keep.tolist()) == [0, 1]
+    assert np.array_equal(merged, boxes)
+
+def test_empty_input():
+    keep, merged = merge_boxes(np.empty((0, 4)), np.empty(0), np.empty(0))
+    assert len(keep) == 0 and len(merged) == 0
+
+def test_tiles_cover_page_edges():
+    tiles = make_tiles(1000, 700, 400)
+    assert max(t[2] for t in tiles) == 700
+    assert max(t[3] for t in tiles) == 1000